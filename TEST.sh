@@ -52,6 +52,11 @@ from src.executor import execute_agentic_pipeline
 print("Dry-run successful: pipeline functions imported.")
 EOF
 
+# 7. Run the search pipeline tests against the local Serper stub
+# (tests/conftest.py supplies dummy keys; no Gemini or Serper calls are made)
+echo "Running pipeline tests against the Serper stub..."
+python3 -m pytest -q tests
+
 echo "--------------------------------------------------"
 echo "GradPath smoke test PASSED."
 echo "--------------------------------------------------"
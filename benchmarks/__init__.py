@@ -0,0 +1 @@
+"""Offline benchmarks for GradPath (run from the repo root with python -m benchmarks.<name>)."""
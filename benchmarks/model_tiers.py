@@ -0,0 +1,315 @@
+"""
+Latency and quality of each Gemini model tier, per pipeline stage.
+
+Usage:
+    python -m benchmarks.model_tiers
+    python -m benchmarks.model_tiers --models gemini-2.0-flash-lite,gemini-2.0-flash \\
+        --stages classifier,planner --repeat 3 --json tiers.json
+
+Runs the recorded cases in benchmarks/fixtures/stage_cases.json through the
+real stage code (prompts, schemas, fallbacks) once per model, with that model
+routed to the stage. Report stages (writer, deep_dive, comparison) are fed
+recorded search results, so no Serper calls are made.
+
+Quality is the fraction of a case's checks that pass: the right query type
+or readiness decision, query counts and key terms for plans, required facts
+and links for reports. A stage that silently fell back (template follow-ups,
+fallback plan, a coordinator decision made from the profile) scores 0 for
+that case. Template plans are turned off so every planner case reaches the
+model. For each stage the fastest model within --tolerance of the best
+quality is suggested as its routing.
+"""
+
+import argparse
+import io
+import json
+import os
+import re
+import statistics
+import time
+from contextlib import contextmanager, nullcontext, redirect_stdout
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import src.planner
+from src.config import GEMINI_FAST_MODEL_NAME, GEMINI_MODEL_NAME, GEMINI_REPORT_MODEL_NAME, STAGE_SETTINGS
+from src.executor import (
+    COMPARISON_PROMPT,
+    DEEP_DIVE_PROMPT,
+    build_writer_prompt,
+    check_if_ready_to_search,
+    classify_query,
+    clean_response_text,
+    generate_followup_questions,
+    template_followup_questions,
+)
+from src.llm import generate_text
+from src.memory import InMemoryProfileStore
+from src.planner import plan_from_user_input
+from src.turn_context import TurnContext, turn_scope
+from src.usage import usage_ledger
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "stage_cases.json")
+STAGES = ["classifier", "coordinator", "planner", "followups", "writer", "deep_dive", "comparison"]
+LINK_RE = re.compile(r"\]\((https?://[^)\s]+)\)|https?://\S+")
+
+
+@contextmanager
+def routed(stage: str, model: str) -> Iterator[None]:
+    """Route stage to model for the duration of the block."""
+    settings = STAGE_SETTINGS.setdefault(stage, {})
+    previous = settings.get("model")
+    settings["model"] = model
+    try:
+        yield
+    finally:
+        if previous is None:
+            settings.pop("model", None)
+        else:
+            settings["model"] = previous
+
+
+@contextmanager
+def overridden(module: ModuleType, name: str, value: Any) -> Iterator[None]:
+    """Set a module-level setting for the duration of the block."""
+    previous = getattr(module, name)
+    setattr(module, name, value)
+    try:
+        yield
+    finally:
+        setattr(module, name, previous)
+
+
+def _seeded_store(session_id: str, profile: Dict[str, Any]) -> InMemoryProfileStore:
+    store = InMemoryProfileStore()
+    if profile:
+        store.update_profile(session_id, **profile)
+    return store
+
+
+def _format_results(results: List[Dict[str, Any]]) -> str:
+    return "\n\n".join(
+        "".join(f"{key.title()}: {r[key]}\n" for key in ("university", "title", "url", "snippet") if key in r).strip()
+        for r in results
+    )
+
+
+def _mention_checks(text: str, expect: Dict[str, Any]) -> List[bool]:
+    lowered = text.lower()
+    checks = [m.lower() in lowered for m in expect.get("mentions", [])]
+    if "min_links" in expect:
+        checks.append(len(LINK_RE.findall(text)) >= expect["min_links"])
+    if expect.get("table"):
+        checks.append(bool(re.search(r"^\s*\|.*\|\s*$", text, re.MULTILINE)))
+    return checks
+
+
+# Each runner executes one case and returns its pass/fail checks
+def run_classifier(case: Dict[str, Any], session_id: str) -> List[bool]:
+    result = classify_query(case["input"]["message"])
+    expect = case["expect"]
+    found = " ".join(result.get("universities") or []).lower()
+    return [result.get("query_type") == expect["query_type"]] + [
+        u.lower() in found for u in expect.get("universities", [])
+    ]
+
+
+def run_coordinator(case: Dict[str, Any], session_id: str) -> List[bool]:
+    store = _seeded_store(session_id, case["input"]["profile"])
+    decision = check_if_ready_to_search(case["input"]["message"], session_id, store)
+    if decision.get("fallback"):
+        # Decided from the profile because the model's output was unusable
+        return [False]
+    return [bool(decision.get("ready_to_search")) == case["expect"]["ready_to_search"]]
+
+
+def run_planner(case: Dict[str, Any], session_id: str) -> List[bool]:
+    store = _seeded_store(session_id, case["input"]["profile"])
+    # Template plans skip the model, which would make every model score alike
+    with overridden(src.planner, "TEMPLATE_PLANNER_ENABLED", False):
+        plan = plan_from_user_input(case["input"]["message"], session_id, store)
+    if (plan.get("notes_for_search") or "").startswith("Fallback plan"):
+        return [False]
+    expect = case["expect"]
+    queries = [q.lower() for q in plan.get("search_queries", [])]
+    return [expect["min_queries"] <= len(queries) <= expect["max_queries"]] + [
+        any(term in q for q in queries) for term in expect.get("terms", [])
+    ]
+
+
+def run_followups(case: Dict[str, Any], session_id: str) -> List[bool]:
+    profile, candidates = case["input"]["profile"], case["input"]["candidates"]
+    questions = generate_followup_questions(profile, "new_search", f"Found {len(candidates)} programs", candidates)
+    if questions == template_followup_questions(profile, candidates):
+        return [False]
+    expect = case["expect"]
+    return [
+        expect["min_questions"] <= len(questions) <= expect["max_questions"],
+        all(q.strip().endswith("?") for q in questions),
+    ]
+
+
+def run_writer(case: Dict[str, Any], session_id: str) -> List[bool]:
+    data = case["input"]
+    prompt = build_writer_prompt(data["profile"], data["plan"], data["candidates"])
+    return _mention_checks(clean_response_text(generate_text(prompt, stage="writer")), case["expect"])
+
+
+def run_deep_dive(case: Dict[str, Any], session_id: str) -> List[bool]:
+    data = case["input"]
+    prompt = DEEP_DIVE_PROMPT.format(
+        university_query=f"{data['degree']} {data['field']} at {' and '.join(data['universities'])}",
+        search_results=_format_results(data["results"]),
+    )
+    return _mention_checks(clean_response_text(generate_text(prompt, stage="deep_dive")), case["expect"])
+
+
+def run_comparison(case: Dict[str, Any], session_id: str) -> List[bool]:
+    data = case["input"]
+    prompt = COMPARISON_PROMPT.format(
+        universities=", ".join(data["universities"]),
+        aspects=", ".join(data["aspects"]),
+        search_results=_format_results(data["results"]),
+    )
+    return _mention_checks(clean_response_text(generate_text(prompt, stage="comparison")), case["expect"])
+
+
+RUNNERS: Dict[str, Callable[[Dict[str, Any], str], List[bool]]] = {
+    "classifier": run_classifier,
+    "coordinator": run_coordinator,
+    "planner": run_planner,
+    "followups": run_followups,
+    "writer": run_writer,
+    "deep_dive": run_deep_dive,
+    "comparison": run_comparison,
+}
+
+
+def run_case(case: Dict[str, Any], model: str, run_id: str, verbose: bool) -> Dict[str, Any]:
+    """Run one case on one model and measure it."""
+    stage = case["stage"]
+    session_id = f"bench-{stage}-{run_id}"
+    ctx = TurnContext(session_id=session_id)
+    ctx.usage = usage_ledger.begin_turn(session_id)
+    record: Dict[str, Any] = {"stage": stage, "case": case["name"], "model": model, "error": None}
+
+    started = time.perf_counter()
+    try:
+        with turn_scope(ctx), routed(stage, model), (nullcontext() if verbose else redirect_stdout(io.StringIO())):
+            checks = RUNNERS[stage](case, session_id)
+    except Exception as e:
+        checks = [False]
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["latency_seconds"] = time.perf_counter() - started
+
+    stage_usage = ctx.usage.stages.get(stage)
+    record["quality"] = sum(checks) / len(checks) if checks else 0.0
+    record["calls"] = stage_usage.calls if stage_usage else 0
+    record["output_tokens"] = stage_usage.output_tokens if stage_usage else 0
+    usage_ledger.forget(session_id)
+    return record
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct * (len(ordered) - 1))))]
+
+
+def summarize(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One row per (stage, model)."""
+    rows = []
+    for stage in STAGES:
+        models = list(dict.fromkeys(r["model"] for r in records if r["stage"] == stage))
+        for model in models:
+            runs = [r for r in records if r["stage"] == stage and r["model"] == model]
+            latencies = [r["latency_seconds"] for r in runs]
+            rows.append({
+                "stage": stage,
+                "model": model,
+                "runs": len(runs),
+                "p50_seconds": round(statistics.median(latencies), 3),
+                "p90_seconds": round(_percentile(latencies, 0.9), 3),
+                "quality": round(statistics.mean(r["quality"] for r in runs), 3),
+                "calls_per_run": round(statistics.mean(r["calls"] for r in runs), 2),
+                "output_tokens": round(statistics.mean(r["output_tokens"] for r in runs)),
+                "errors": sum(1 for r in runs if r["error"]),
+            })
+    return rows
+
+
+def suggest_routing(rows: List[Dict[str, Any]], tolerance: float) -> Dict[str, str]:
+    """Fastest model per stage whose quality is within tolerance of the best."""
+    routing = {}
+    for stage in STAGES:
+        stage_rows = [r for r in rows if r["stage"] == stage]
+        if not stage_rows:
+            continue
+        best = max(r["quality"] for r in stage_rows)
+        eligible = [r for r in stage_rows if r["quality"] >= best - tolerance]
+        routing[stage] = min(eligible, key=lambda r: r["p50_seconds"])["model"]
+    return routing
+
+
+def print_report(rows: List[Dict[str, Any]], routing: Dict[str, str]) -> None:
+    header = f"{'stage':<12} {'model':<28} {'runs':>4} {'p50 s':>7} {'p90 s':>7} {'quality':>8} {'calls':>6} {'out tok':>8} {'errors':>6}"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(
+            f"{r['stage']:<12} {r['model']:<28} {r['runs']:>4} {r['p50_seconds']:>7.2f} {r['p90_seconds']:>7.2f} "
+            f"{r['quality']:>8.2f} {r['calls_per_run']:>6.2f} {r['output_tokens']:>8} {r['errors']:>6}"
+        )
+    print("\nSuggested routing:")
+    for stage, model in routing.items():
+        configured = STAGE_SETTINGS.get(stage, {}).get("model", GEMINI_MODEL_NAME)
+        note = "" if model == configured else f"   (currently {configured})"
+        print(f"  GEMINI_MODEL_{stage.upper()}={model}{note}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    default_models = ",".join(dict.fromkeys([GEMINI_FAST_MODEL_NAME, GEMINI_MODEL_NAME, GEMINI_REPORT_MODEL_NAME]))
+    parser = argparse.ArgumentParser(description="Benchmark Gemini model tiers per pipeline stage.")
+    parser.add_argument("--models", default=default_models, help="Comma-separated models to compare")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated stages to run")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case and model")
+    parser.add_argument("--fixtures", default=FIXTURES_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.05, help="Quality a faster model may give up")
+    parser.add_argument("--json", dest="json_path", help="Also write per-run records and the summary here")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline logs")
+    args = parser.parse_args(argv)
+
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in RUNNERS]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+
+    with open(args.fixtures, "r", encoding="utf-8") as f:
+        cases = [c for c in json.load(f)["cases"] if c["stage"] in stages]
+
+    records = []
+    total = len(cases) * len(models) * args.repeat
+    for case in cases:
+        for model in models:
+            for i in range(args.repeat):
+                record = run_case(case, model, f"{len(records)}", args.verbose)
+                records.append(record)
+                status = f"ERROR {record['error']}" if record["error"] else f"quality {record['quality']:.2f}"
+                print(
+                    f"[{len(records)}/{total}] {case['stage']}/{case['name']} on {model}: "
+                    f"{record['latency_seconds']:.2f}s, {status}"
+                )
+
+    rows = summarize(records)
+    routing = suggest_routing(rows, args.tolerance)
+    print()
+    print_report(rows, routing)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"summary": rows, "routing": routing, "runs": records}, f, indent=2)
+        print(f"\n[INFO] Wrote {len(records)} runs to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
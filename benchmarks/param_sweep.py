@@ -0,0 +1,342 @@
+"""
+Quality vs cost of the retrieval settings, swept over recorded conversations.
+
+Usage:
+    python -m benchmarks.param_sweep
+    python -m benchmarks.param_sweep --set search_results=3,5,8 --set writer_candidates=15,30
+    python -m benchmarks.param_sweep --mode grid --set search_results=3,5 --set planner_max_queries=4,7 \\
+        --conversations intake.jsonl --repeat 2 --json sweep.json
+
+Each configuration runs every conversation through the real pipeline
+(execute_agentic_pipeline) in a fresh session, with the search, zero-result
+and report caches cleared first, so configurations don't warm each other up.
+Searches go to SERPER_SEARCH_URL: point it at the local stub
+(python -m src.tools.serper_stub) to check the mechanics without spending
+searches, but only real Serper results make the quality columns meaningful.
+Set PAGE_FETCH_ENABLED=false to keep deep dives off the network.
+
+In axis mode (the default) each swept setting is varied alone around the
+configured defaults; grid mode runs the cartesian product.
+
+Per configuration it reports, averaged per turn: latency, Gemini calls,
+upstream searches and tokens; and per conversation the retrieval-quality
+proxy: distinct sites among the search results (hosts other than the
+aggregators in src.ranking.AGGREGATOR_DOMAINS), the share of
+the conversation's expected program domains that were retrieved, and the
+share linked from the answers. Configurations no other one beats on
+coverage, tokens, searches and latency at once are starred.
+
+--conversations also takes a src.batch input file (JSONL of session_id and
+message); those conversations have no expected domains, so only the
+site count is reported for them.
+"""
+
+import argparse
+import io
+import itertools
+import json
+import os
+import re
+import statistics
+import time
+import uuid
+from contextlib import contextmanager, nullcontext, redirect_stdout
+from typing import Any, Dict, Iterator, List, Optional, Set
+from urllib.parse import urlparse
+
+import src.config
+import src.executor
+import src.planner
+from src.batch import load_turns
+from src.executor import execute_agentic_pipeline
+from src.memory import InMemoryProfileStore
+from src.ranking import AGGREGATOR_DOMAINS
+from src.report_cache import report_cache
+from src.tools.search import search_cache, zero_result_cache
+from src.usage import usage_ledger
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "conversations.json")
+LINK_RE = re.compile(r"\]\((https?://[^)\s]+)\)|(https?://[^\s)>\]]+)")
+
+# Swept name -> config setting it overrides
+PARAMETERS = {
+    "search_results": "SEARCH_RESULTS_PER_QUERY",
+    "planner_max_queries": "PLANNER_MAX_QUERIES",
+    "writer_candidates": "WRITER_CANDIDATE_LIMIT",
+    "deep_dive_queries": "DEEP_DIVE_MAX_QUERIES",
+    "deep_dive_compact_queries": "DEEP_DIVE_COMPACT_QUERIES",
+    "deep_dive_results": "DEEP_DIVE_RESULTS_PER_QUERY",
+    "deep_dive_context": "DEEP_DIVE_RESULT_LIMIT",
+    "comparison_queries": "COMPARISON_MAX_QUERIES",
+    "comparison_results": "COMPARISON_RESULTS_PER_QUERY",
+    "comparison_budget": "COMPARISON_RESULT_BUDGET",
+}
+DEFAULT_SWEEP = {
+    "search_results": [3, 5, 8],
+    "planner_max_queries": [4, 7],
+    "writer_candidates": [15, 30],
+    "deep_dive_context": [15, 30],
+}
+# Modules that import the settings by name
+_SETTING_MODULES = (src.config, src.executor, src.planner)
+
+
+@contextmanager
+def overridden(settings: Dict[str, int]) -> Iterator[None]:
+    """
+    Apply config overrides (by swept name) for the duration of the block.
+
+    The planner is only asked for at most PLANNER_MAX_QUERIES queries, so
+    when that setting is swept, model plans are also cut to it here to keep
+    the model's answer from blurring the comparison.
+    """
+    previous = []
+    for name, value in settings.items():
+        attr = PARAMETERS[name]
+        for module in _SETTING_MODULES:
+            if hasattr(module, attr):
+                previous.append((module, attr, getattr(module, attr)))
+                setattr(module, attr, value)
+
+    if "planner_max_queries" in settings:
+        limit = settings["planner_max_queries"]
+        plan_from_user_input = src.planner.plan_from_user_input
+
+        def capped_plan(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+            plan = plan_from_user_input(*args, **kwargs)
+            plan["search_queries"] = (plan.get("search_queries") or [])[:limit]
+            return plan
+
+        previous.append((src.planner, "plan_from_user_input", plan_from_user_input))
+        src.planner.plan_from_user_input = capped_plan
+    try:
+        yield
+    finally:
+        for module, attr, value in reversed(previous):
+            setattr(module, attr, value)
+
+
+@contextmanager
+def recording_searches(results: List[Dict[str, Any]]) -> Iterator[None]:
+    """Collect every search result the executor receives in the block."""
+    original = src.executor.search_many
+
+    def search_many(
+        queries: List[str],
+        num_results: int = 5,
+        keep_terms: Optional[List[str]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        batches = original(queries, num_results=num_results, keep_terms=keep_terms)
+        for batch in batches:
+            results.extend(batch)
+        return batches
+
+    src.executor.search_many = search_many
+    try:
+        yield
+    finally:
+        src.executor.search_many = original
+
+
+def _host(url: str) -> str:
+    host = (urlparse(url).netloc or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _is_aggregator(host: str) -> bool:
+    return any(host == agg or host.endswith("." + agg) for agg in AGGREGATOR_DOMAINS)
+
+
+def _covered(hosts: Set[str], domains: List[str]) -> float:
+    if not domains:
+        return 0.0
+    hit = [d for d in domains if any(h == d or h.endswith("." + d) for h in hosts)]
+    return len(hit) / len(domains)
+
+
+def load_conversations(path: str) -> List[Dict[str, Any]]:
+    """Fixture JSON with expectations, or a src.batch JSONL input file."""
+    if path.endswith(".jsonl"):
+        return [
+            {"name": session_id, "messages": messages, "expect": {}}
+            for session_id, messages in load_turns(path).items()
+        ]
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["conversations"]
+
+
+def run_conversation(conversation: Dict[str, Any], verbose: bool) -> Dict[str, Any]:
+    """Run one conversation in a fresh session and measure it."""
+    session_id = f"sweep-{uuid.uuid4().hex[:12]}"
+    store = InMemoryProfileStore()
+    retrieved: List[Dict[str, Any]] = []
+    answers: List[str] = []
+    record: Dict[str, Any] = {"conversation": conversation["name"], "error": None}
+
+    started = time.perf_counter()
+    try:
+        with recording_searches(retrieved), (nullcontext() if verbose else redirect_stdout(io.StringIO())):
+            for message in conversation["messages"]:
+                answers.append(execute_agentic_pipeline(message, session_id, store))
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - started
+
+    turns = usage_ledger.turns(session_id)
+    usage_ledger.forget(session_id)
+    linked = {_host(m[0] or m[1]) for answer in answers for m in LINK_RE.findall(answer)}
+    retrieved_hosts = {_host(r.get("url") or "") for r in retrieved}
+    domains = conversation.get("expect", {}).get("domains", [])
+    record.update(
+        turns=len(turns),
+        seconds=elapsed,
+        gemini_calls=sum(s["calls"] for t in turns for s in t["stages"].values()),
+        searches=sum(t["searches"] for t in turns),
+        tokens=sum(t["total_tokens"] for t in turns),
+        # Any host but a listing site counts: university domains follow no
+        # pattern in many countries (utoronto.ca, tum.de)
+        sites=len({h for h in retrieved_hosts if h and not _is_aggregator(h)}),
+        retrieved_coverage=_covered(retrieved_hosts, domains),
+        answer_coverage=_covered(linked, domains),
+        has_expectations=bool(domains),
+    )
+    return record
+
+
+def run_config(
+    settings: Dict[str, int],
+    conversations: List[Dict[str, Any]],
+    repeat: int,
+    verbose: bool,
+) -> Dict[str, Any]:
+    """Run all conversations under one configuration and summarize them."""
+    records = []
+    with overridden(settings):
+        for _ in range(repeat):
+            for conversation in conversations:
+                search_cache.clear()
+                zero_result_cache.clear()
+                report_cache.clear()
+                records.append(run_conversation(conversation, verbose))
+
+    turns = max(1, sum(r["turns"] for r in records))
+    labelled = [r for r in records if r["has_expectations"]]
+    return {
+        "settings": settings,
+        "conversations": len(records),
+        "errors": sum(1 for r in records if r["error"]),
+        "seconds_per_turn": round(sum(r["seconds"] for r in records) / turns, 3),
+        "gemini_calls_per_turn": round(sum(r["gemini_calls"] for r in records) / turns, 2),
+        "searches_per_turn": round(sum(r["searches"] for r in records) / turns, 2),
+        "tokens_per_turn": round(sum(r["tokens"] for r in records) / turns),
+        "sites": round(statistics.mean(r["sites"] for r in records), 1),
+        "retrieved_coverage": round(statistics.mean(r["retrieved_coverage"] for r in labelled), 3) if labelled else None,
+        "answer_coverage": round(statistics.mean(r["answer_coverage"] for r in labelled), 3) if labelled else None,
+        "runs": records,
+    }
+
+
+def build_configs(sweep: Dict[str, List[int]], mode: str) -> List[Dict[str, int]]:
+    """Override sets to run: one per value per setting (axis), or the product (grid)."""
+    if mode == "grid":
+        names = list(sweep)
+        return [dict(zip(names, values)) for values in itertools.product(*(sweep[n] for n in names))]
+
+    configs: List[Dict[str, int]] = [{}]
+    for name, values in sweep.items():
+        default = getattr(src.config, PARAMETERS[name])
+        configs.extend({name: v} for v in values if v != default)
+    return configs
+
+
+def mark_pareto(rows: List[Dict[str, Any]]) -> None:
+    """Flag rows that no other row beats on coverage, tokens, searches and latency at once."""
+    def key(r: Dict[str, Any]) -> tuple:
+        quality = r["retrieved_coverage"] if r["retrieved_coverage"] is not None else r["sites"]
+        return (-quality, r["tokens_per_turn"], r["searches_per_turn"], r["seconds_per_turn"])
+
+    for row in rows:
+        mine = key(row)
+        row["pareto"] = not any(
+            other is not row and all(o <= m for o, m in zip(key(other), mine)) and key(other) != mine
+            for other in rows
+        )
+
+
+def _label(settings: Dict[str, int]) -> str:
+    return ", ".join(f"{k}={v}" for k, v in settings.items()) or "defaults"
+
+
+def print_report(rows: List[Dict[str, Any]]) -> None:
+    width = max(len("settings"), *(len(_label(r["settings"])) for r in rows))
+    header = (
+        f"  {'settings':<{width}} {'s/turn':>7} {'calls':>6} {'search':>7} {'tokens':>8} "
+        f"{'sites':>5} {'retr':>5} {'answer':>6} {'err':>4}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        retr = "-" if r["retrieved_coverage"] is None else f"{r['retrieved_coverage']:.2f}"
+        answer = "-" if r["answer_coverage"] is None else f"{r['answer_coverage']:.2f}"
+        print(
+            f"{'*' if r['pareto'] else ' '} {_label(r['settings']):<{width}} {r['seconds_per_turn']:>7.2f} "
+            f"{r['gemini_calls_per_turn']:>6.2f} {r['searches_per_turn']:>7.2f} {r['tokens_per_turn']:>8} "
+            f"{r['sites']:>5.1f} {retr:>5} {answer:>6} {r['errors']:>4}"
+        )
+    defaults = {name: getattr(src.config, attr) for name, attr in PARAMETERS.items()}
+    print(f"\n* = not beaten on coverage, tokens, searches and latency at once. Defaults: {_label(defaults)}")
+
+
+def parse_sweep(values: Optional[List[str]], parser: argparse.ArgumentParser) -> Dict[str, List[int]]:
+    if not values:
+        return dict(DEFAULT_SWEEP)
+    sweep: Dict[str, List[int]] = {}
+    for item in values:
+        name, _, raw = item.partition("=")
+        if name not in PARAMETERS or not raw:
+            parser.error(f"--set expects NAME=V1,V2 with NAME one of: {', '.join(PARAMETERS)}")
+        try:
+            sweep[name] = [int(v) for v in raw.split(",") if v.strip()]
+        except ValueError:
+            parser.error(f"--set {name}: values must be integers")
+    return sweep
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Sweep retrieval settings over recorded conversations.")
+    parser.add_argument("--set", dest="sweep", action="append", metavar="NAME=V1,V2",
+                        help=f"Setting to sweep (repeatable): {', '.join(PARAMETERS)}")
+    parser.add_argument("--mode", choices=["axis", "grid"], default="axis")
+    parser.add_argument("--conversations", default=FIXTURES_PATH, help="Fixture JSON or src.batch JSONL")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per conversation and configuration")
+    parser.add_argument("--json", dest="json_path", help="Also write per-configuration results here")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline logs")
+    args = parser.parse_args(argv)
+
+    sweep = parse_sweep(args.sweep, parser)
+    conversations = load_conversations(args.conversations)
+    configs = build_configs(sweep, args.mode)
+    turns = sum(len(c["messages"]) for c in conversations) * len(configs) * args.repeat
+    print(f"[INFO] {len(configs)} configurations x {len(conversations)} conversations = {turns} turns")
+
+    rows = []
+    for i, settings in enumerate(configs, 1):
+        row = run_config(settings, conversations, args.repeat, args.verbose)
+        rows.append(row)
+        print(
+            f"[{i}/{len(configs)}] {_label(settings)}: {row['seconds_per_turn']:.2f}s/turn, "
+            f"{row['tokens_per_turn']} tokens/turn, {row['errors']} errors"
+        )
+
+    mark_pareto(rows)
+    print()
+    print_report(rows)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\n[INFO] Wrote {len(rows)} configurations to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
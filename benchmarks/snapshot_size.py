@@ -0,0 +1,135 @@
+"""
+Size and speed of session snapshots.
+
+Usage:
+    python -m benchmarks.snapshot_size
+    python -m benchmarks.snapshot_size --queries 4,8,16 --messages 10,50 --repeat 200
+
+Builds sessions of increasing size from Serper-shaped results (the local
+stub's fake_search_result), captures them with capture_session, and
+reports for each: the plain JSON size, the snapshot size (zlib) and the
+uncompressed snapshot size, pickle for comparison, and the mean time to
+encode, decode and restore.
+"""
+
+import argparse
+import itertools
+import json
+import pickle
+import statistics
+import time
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List, Optional
+
+from src.chat_history import ChatHistoryStore
+from src.memory import InMemoryProfileStore
+from src.snapshot import capture_session, decode_snapshot, encode_snapshot, restore_session
+from src.tools.search import extract_program_candidates, search_cache, search_cache_key
+from src.tools.serper_stub import fake_search_result
+
+PROFILE = {
+    "gpa": "3.6/4.0",
+    "toefl": "104",
+    "field_of_study": "Computer Science",
+    "degree_level": "MS",
+    "preferred_countries": "Canada, Germany",
+    "funding_needs": "full funding (RA/TA)",
+    "intake_term": "Fall 2026",
+}
+RESULTS_PER_QUERY = 5
+
+
+def build_session(
+    session_id: str,
+    queries: int,
+    messages: int,
+    store: InMemoryProfileStore,
+    history: ChatHistoryStore,
+) -> None:
+    """Fill the store, search cache and history as a real session would."""
+    store.update_profile(session_id, **PROFILE)
+    plan_queries = [f"funded MS computer science {topic} {i}" for i, topic in zip(range(queries), itertools.cycle(
+        ["Canada", "Germany", "thesis", "scholarship", "no GRE", "research assistantship"]
+    ))]
+    candidates: List[Dict[str, Any]] = []
+    for q in plan_queries:
+        raw = fake_search_result({"q": q, "num": RESULTS_PER_QUERY})
+        search_cache.set(search_cache_key(q, RESULTS_PER_QUERY), raw)
+        candidates.extend(extract_program_candidates(raw))
+    plan = {"high_level_goal": "Funded MS in CS", "search_queries": plan_queries}
+    store.set_last_results(session_id, plan, candidates)
+
+    history.create_session(session_id, "Funded MS in CS")
+    for i in range(messages):
+        role = "user" if i % 2 == 0 else "assistant"
+        content = (
+            f"Question {i}: which of these programs fund international students?"
+            if role == "user"
+            else "Here are the programs that match your profile:\n\n" + "\n".join(
+                f"{n}. **[{c['title']}]({c['url']})** - {c['snippet']}" for n, c in enumerate(candidates[:10], 1)
+            )
+        )
+        history.append_message(session_id, role, content)
+
+
+def mean_ms(fn: Callable[[], Any], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return statistics.mean(times) * 1000
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark session snapshot size and speed.")
+    parser.add_argument("--queries", default="2,6,12", help="Comma-separated plan sizes (queries per session)")
+    parser.add_argument("--messages", default="4,20,60", help="Comma-separated history lengths")
+    parser.add_argument("--repeat", type=int, default=100, help="Timing repetitions")
+    parser.add_argument("--json", dest="json_path", help="Also write the rows here")
+    args = parser.parse_args(argv)
+
+    store = InMemoryProfileStore()
+    history = ChatHistoryStore(":memory:")
+    rows = []
+    for n_queries in [int(q) for q in args.queries.split(",")]:
+        for n_messages in [int(m) for m in args.messages.split(",")]:
+            session_id = f"bench-{n_queries}q-{n_messages}m"
+            build_session(session_id, n_queries, n_messages, store, history)
+            snapshot = capture_session(session_id, store, history)
+            data = encode_snapshot(snapshot)
+            target = InMemoryProfileStore()
+            rows.append({
+                "queries": n_queries,
+                "messages": n_messages,
+                "candidates": len(snapshot.candidates),
+                "json_bytes": len(json.dumps(asdict(snapshot)).encode("utf-8")),
+                "pickle_bytes": len(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL)),
+                "uncompressed_bytes": len(encode_snapshot(snapshot, compress=False)),
+                "snapshot_bytes": len(data),
+                "encode_ms": round(mean_ms(lambda: encode_snapshot(snapshot), args.repeat), 3),
+                "decode_ms": round(mean_ms(lambda: decode_snapshot(data), args.repeat), 3),
+                "restore_ms": round(mean_ms(lambda: restore_session(decode_snapshot(data), target), args.repeat), 3),
+            })
+
+    header = (
+        f"{'queries':>7} {'msgs':>5} {'cands':>6} {'json B':>9} {'pickle B':>9} "
+        f"{'raw B':>9} {'snap B':>8} {'ratio':>6} {'enc ms':>7} {'dec ms':>7} {'rest ms':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(
+            f"{r['queries']:>7} {r['messages']:>5} {r['candidates']:>6} {r['json_bytes']:>9} {r['pickle_bytes']:>9} "
+            f"{r['uncompressed_bytes']:>9} {r['snapshot_bytes']:>8} {r['json_bytes'] / r['snapshot_bytes']:>6.1f} "
+            f"{r['encode_ms']:>7.3f} {r['decode_ms']:>7.3f} {r['restore_ms']:>8.3f}"
+        )
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\n[INFO] Wrote {len(rows)} rows to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
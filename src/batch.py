@@ -0,0 +1,217 @@
+"""
+Batch/offline advising over a JSONL file of conversation turns.
+
+Usage:
+    python -m src.batch intake.jsonl results.jsonl --concurrency 8
+    python -m src.batch intake.jsonl results.jsonl --concurrency 32 --processes 8
+
+Each input line is {"session_id": "...", "message": "..."}. Turns of the same
+session run in file order on one worker (the profile memory builds up turn
+by turn); different sessions run concurrently, up to --concurrency at once.
+With --processes N the turns run on a WorkerPool of N processes (sessions
+sharded by consistent hash) instead of threads in this process.
+
+Results are written as one JSONL line per turn with the response, timing and
+usage. A session's lines are only written once all its turns have finished,
+so the output file doubles as the checkpoint: rerunning with the same output
+path skips every session already in it.
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from .memory import profile_store
+from .usage import usage_ledger
+from .worker_pool import WorkerPool, run_turn
+
+TurnRunner = Callable[[str, str], Dict[str, Any]]
+
+
+def load_turns(input_path: str) -> "OrderedDict[str, List[str]]":
+    """Group input messages by session, keeping file order within each session."""
+    sessions: "OrderedDict[str, List[str]]" = OrderedDict()
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                session_id = str(record["session_id"])
+                message = str(record["message"])
+            except (json.JSONDecodeError, KeyError) as e:
+                print(f"[WARN] Skipping malformed input line {line_no}: {e}")
+                continue
+            sessions.setdefault(session_id, []).append(message)
+    return sessions
+
+
+def load_completed_sessions(output_path: str) -> Set[str]:
+    """Sessions already present in the output file (the checkpoint)."""
+    completed: Set[str] = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                completed.add(json.loads(line)["session_id"])
+            except (json.JSONDecodeError, KeyError):
+                # A torn last line from an interrupted run; that session reruns
+                continue
+    return completed
+
+
+def _drop_torn_tail(output_path: str) -> None:
+    """Cut a partial last line so resumed records don't get glued onto it."""
+    if not os.path.exists(output_path):
+        return
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def run_session(
+    session_id: str,
+    messages: List[str],
+    run: TurnRunner = run_turn,
+) -> List[Dict[str, Any]]:
+    """
+    Run one session's turns in order and return a result record per turn.
+
+    Args:
+        run: Runs one turn and returns worker_pool.run_turn's result dict;
+            in-process by default, or through a WorkerPool.
+    """
+    results: List[Dict[str, Any]] = []
+    final_profile: Optional[Dict[str, Any]] = None
+    for turn_index, message in enumerate(messages):
+        outcome = run(session_id, message)
+        if outcome["error"]:
+            print(f"[WARN] Batch turn {session_id}#{turn_index} failed: {outcome['error']}")
+        results.append({
+            "session_id": session_id,
+            "turn_index": turn_index,
+            "message": message,
+            "response": outcome["response"],
+            "error": outcome["error"],
+            "elapsed_seconds": outcome["elapsed_seconds"],
+            "usage": outcome["usage"],
+        })
+        final_profile = outcome["profile"]
+
+    for record in results:
+        record["final_profile"] = final_profile
+    return results
+
+
+def _forget_in_process(session_id: str) -> None:
+    profile_store.forget(session_id)
+    usage_ledger.forget(session_id)
+
+
+def run_batch(
+    input_path: str,
+    output_path: str,
+    concurrency: int = 4,
+    limit: Optional[int] = None,
+    processes: int = 0,
+) -> Dict[str, Any]:
+    """
+    Run every not-yet-completed session from input_path, appending results
+    to output_path.
+
+    Args:
+        concurrency: Sessions in flight at once.
+        processes: Worker processes to run turns on (0 = this process).
+
+    Returns:
+        Summary counters for the run.
+    """
+    sessions = load_turns(input_path)
+    completed = load_completed_sessions(output_path)
+    pending = [(sid, msgs) for sid, msgs in sessions.items() if sid not in completed]
+    if limit is not None:
+        pending = pending[:limit]
+
+    print(
+        f"[INFO] {len(sessions)} sessions in input, {len(completed)} already done, "
+        f"running {len(pending)} with concurrency {concurrency}"
+    )
+
+    summary = {"sessions": 0, "turns": 0, "errors": 0, "searches": 0, "total_tokens": 0}
+    write_lock = threading.Lock()
+    started = time.perf_counter()
+
+    workers: Optional[WorkerPool] = WorkerPool(num_workers=processes) if processes > 0 else None
+    if workers is not None:
+        run: TurnRunner = lambda sid, message: workers.submit(sid, message).result()
+        forget: Callable[[str], None] = workers.forget
+    else:
+        run, forget = run_turn, _forget_in_process
+
+    _drop_torn_tail(output_path)
+    try:
+        with open(output_path, "a", encoding="utf-8") as out, \
+                ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch") as pool:
+            futures = {pool.submit(run_session, sid, msgs, run): sid for sid, msgs in pending}
+            for future in as_completed(futures):
+                session_id = futures[future]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    print(f"[ERROR] Session {session_id} crashed: {e}")
+                    summary["errors"] += 1
+                    continue
+
+                with write_lock:
+                    for record in results:
+                        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    os.fsync(out.fileno())
+
+                summary["sessions"] += 1
+                summary["turns"] += len(results)
+                summary["errors"] += sum(1 for r in results if r["error"])
+                summary["searches"] += sum(r["usage"]["searches"] for r in results if r["usage"])
+                summary["total_tokens"] += sum(r["usage"]["total_tokens"] for r in results if r["usage"])
+                print(f"[INFO] Finished session {session_id} ({summary['sessions']}/{len(pending)})")
+
+                # Batch sessions never come back; free their in-memory state
+                forget(session_id)
+    finally:
+        if workers is not None:
+            summary["workers"] = workers.stats()["workers"]
+            workers.shutdown()
+
+    summary["elapsed_seconds"] = round(time.perf_counter() - started, 1)
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run GradPath over a JSONL file of conversation turns")
+    parser.add_argument("input", help="JSONL with one {session_id, message} object per line")
+    parser.add_argument("output", help="JSONL results file (also used as the resume checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Sessions processed in parallel")
+    parser.add_argument("--limit", type=int, default=None, help="Only run this many pending sessions")
+    parser.add_argument("--processes", type=int, default=0, help="Worker processes (0 = run in this process)")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(
+        args.input,
+        args.output,
+        concurrency=args.concurrency,
+        limit=args.limit,
+        processes=args.processes,
+    )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
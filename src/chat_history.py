@@ -0,0 +1,163 @@
+"""
+Persistent chat history for the Streamlit front end.
+
+Sessions and messages live in a local SQLite database instead of
+st.session_state, so history survives a browser refresh and reruns only load
+what they render: one page of session titles for the sidebar and a bounded
+window of the current session's most recent messages.
+
+Every session belongs to an owner (one per browser); listing, counting and
+deleting only ever see the caller's own sessions. Sessions from before owners
+existed belong to nobody.
+"""
+
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    owner TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id);
+CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at);
+"""
+
+# Created after the owner column is added to databases that predate it
+OWNER_INDEX = "CREATE INDEX IF NOT EXISTS idx_sessions_owner ON sessions(owner, updated_at)"
+
+DEFAULT_TITLE = "New Chat"
+
+
+class ChatHistoryStore:
+    """
+    SQLite-backed store of chat sessions and their messages.
+
+    A single connection is shared across Streamlit's script threads and
+    guarded by a lock; SQLite's WAL mode keeps readers from blocking writers.
+    """
+
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(SCHEMA)
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(sessions)")}
+            if "owner" not in columns:
+                self._conn.execute("ALTER TABLE sessions ADD COLUMN owner TEXT NOT NULL DEFAULT ''")
+            self._conn.execute(OWNER_INDEX)
+
+    # --- Sessions ---
+
+    def create_session(self, session_id: str, title: str = DEFAULT_TITLE, owner: str = "") -> Dict[str, Any]:
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO sessions (id, title, created_at, updated_at, owner) VALUES (?, ?, ?, ?, ?)",
+                (session_id, title, now, now, owner),
+            )
+        return {"id": session_id, "title": title, "created_at": now, "updated_at": now, "owner": owner}
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list_sessions(self, owner: str, limit: int, offset: int = 0) -> List[Dict[str, Any]]:
+        """One page of the owner's sessions, most recently active first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM sessions WHERE owner = ? ORDER BY updated_at DESC, id LIMIT ? OFFSET ?",
+                (owner, limit, offset),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def count_sessions(self, owner: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions WHERE owner = ?", (owner,)).fetchone()[0]
+
+    def most_recent_session_id(self, owner: str) -> Optional[str]:
+        page = self.list_sessions(owner, limit=1)
+        return page[0]["id"] if page else None
+
+    def set_title(self, session_id: str, title: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE sessions SET title = ? WHERE id = ?", (title, session_id))
+
+    def delete_session(self, session_id: str, owner: str) -> bool:
+        """Delete one of the owner's sessions; returns False if it isn't theirs."""
+        with self._lock, self._conn:
+            deleted = self._conn.execute(
+                "DELETE FROM sessions WHERE id = ? AND owner = ?", (session_id, owner)
+            ).rowcount
+            if deleted:
+                self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+        return bool(deleted)
+
+    # --- Messages ---
+
+    def append_message(self, session_id: str, role: str, content: str) -> int:
+        """Store a message and bump the session's activity time; returns its id."""
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                (session_id, role, content, now),
+            )
+            self._conn.execute("UPDATE sessions SET updated_at = ? WHERE id = ?", (now, session_id))
+            return cur.lastrowid
+
+    def get_messages(
+        self,
+        session_id: str,
+        limit: int,
+        before_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        The `limit` most recent messages (older than before_id, if given),
+        returned in chronological order.
+        """
+        query = "SELECT id, role, content, created_at FROM messages WHERE session_id = ?"
+        params: List[Any] = [session_id]
+        if before_id is not None:
+            query += " AND id < ?"
+            params.append(before_id)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(r) for r in reversed(rows)]
+
+    def count_messages(self, session_id: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+
+    def first_user_message(self, session_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content FROM messages WHERE session_id = ? AND role = 'user' ORDER BY id LIMIT 1",
+                (session_id,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
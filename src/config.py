@@ -1,4 +1,6 @@
 import os
+from typing import Any, Dict
+
 from dotenv import load_dotenv
 
 # Load .env file if present
@@ -15,6 +17,36 @@ if not GEMINI_API_KEY:
 # Setting default model name if not provided
 GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-2.0-flash")
 
+# --- Per-stage model routing ---
+# Short structured calls run on the fast tier; long-form reports on the
+# report tier (benchmarks/model_tiers.py compares tiers per stage). Each
+# stage can be overridden with GEMINI_MODEL_<STAGE>, <STAGE>_MAX_OUTPUT_TOKENS
+# and <STAGE>_TEMPERATURE, e.g. GEMINI_MODEL_PLANNER=gemini-2.0-flash.
+GEMINI_FAST_MODEL_NAME = os.getenv("GEMINI_FAST_MODEL_NAME", "gemini-2.0-flash-lite")
+GEMINI_REPORT_MODEL_NAME = os.getenv("GEMINI_REPORT_MODEL_NAME", GEMINI_MODEL_NAME)
+
+
+def _stage_settings(stage: str, model: str, max_output_tokens: int, temperature: float) -> Dict[str, Any]:
+    key = stage.upper()
+    return {
+        "model": os.getenv(f"GEMINI_MODEL_{key}", model),
+        "max_output_tokens": int(os.getenv(f"{key}_MAX_OUTPUT_TOKENS", str(max_output_tokens))),
+        "temperature": float(os.getenv(f"{key}_TEMPERATURE", str(temperature))),
+    }
+
+
+# Stages missing here use GEMINI_MODEL_NAME with the model's default settings
+STAGE_SETTINGS: Dict[str, Dict[str, Any]] = {
+    "classifier": _stage_settings("classifier", GEMINI_FAST_MODEL_NAME, 256, 0.0),
+    "coordinator": _stage_settings("coordinator", GEMINI_FAST_MODEL_NAME, 512, 0.1),
+    "planner": _stage_settings("planner", GEMINI_FAST_MODEL_NAME, 2048, 0.2),
+    "followups": _stage_settings("followups", GEMINI_FAST_MODEL_NAME, 256, 0.7),
+    "personalization": _stage_settings("personalization", GEMINI_FAST_MODEL_NAME, 400, 0.4),
+    "writer": _stage_settings("writer", GEMINI_REPORT_MODEL_NAME, 8192, 0.4),
+    "deep_dive": _stage_settings("deep_dive", GEMINI_REPORT_MODEL_NAME, 8192, 0.3),
+    "comparison": _stage_settings("comparison", GEMINI_REPORT_MODEL_NAME, 8192, 0.3),
+}
+
 # --- Serper.dev configuration (for Google search) ---
 SERPER_API_KEY = os.getenv("SERPER_API_KEY")
 if not SERPER_API_KEY:
@@ -23,9 +55,158 @@ if not SERPER_API_KEY:
         "Create a .env file and add SERPER_API_KEY=your_key_here."
     )
 
-SERPER_SEARCH_URL = "https://google.serper.dev/search"
+# Overridable so a local stub server (src/tools/serper_stub.py) can stand in
+SERPER_SEARCH_URL = os.getenv("SERPER_SEARCH_URL", "https://google.serper.dev/search")
+
+# Turns with at least this many queries send them as one batched request
+SERPER_BATCH_MIN_QUERIES = int(os.getenv("SERPER_BATCH_MIN_QUERIES", "2"))
+# Serper caps the number of queries in a single batch payload
+SERPER_BATCH_MAX_QUERIES = 100
 
 # General app settings
 APP_NAME = "GradPath"
 MIN_PROGRAM_RESULTS = 5
 MAX_PROGRAM_RESULTS = 10
+
+# Retrieval sizes: these drive searches, prompt size and report quality
+# together; benchmarks/param_sweep.py measures the trade-off on recorded
+# conversations.
+# Queries per search plan (the planner is asked for MIN-MAX, template plans stop at MAX)
+PLANNER_MIN_QUERIES = int(os.getenv("PLANNER_MIN_QUERIES", "5"))
+PLANNER_MAX_QUERIES = int(os.getenv("PLANNER_MAX_QUERIES", "7"))
+# Results requested per query for a new search
+SEARCH_RESULTS_PER_QUERY = int(os.getenv("SEARCH_RESULTS_PER_QUERY", "5"))
+# Number of ranked candidates handed to the writer
+WRITER_CANDIDATE_LIMIT = int(os.getenv("WRITER_CANDIDATE_LIMIT", "30"))
+# Deep dives: queries (full set, or compact when pages are fetched), results
+# per query, and search results quoted in the report prompt
+DEEP_DIVE_MAX_QUERIES = int(os.getenv("DEEP_DIVE_MAX_QUERIES", "10"))
+DEEP_DIVE_COMPACT_QUERIES = int(os.getenv("DEEP_DIVE_COMPACT_QUERIES", "6"))
+DEEP_DIVE_RESULTS_PER_QUERY = int(os.getenv("DEEP_DIVE_RESULTS_PER_QUERY", "8"))
+DEEP_DIVE_RESULT_LIMIT = int(os.getenv("DEEP_DIVE_RESULT_LIMIT", "30"))
+
+# Shared cache of generated deep-dive / comparison reports
+REPORT_CACHE_TTL_SECONDS = int(os.getenv("REPORT_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "256"))
+
+# Comparison retrieval budgets, shared evenly across the compared universities
+COMPARISON_MAX_QUERIES = int(os.getenv("COMPARISON_MAX_QUERIES", "6"))
+COMPARISON_RESULTS_PER_QUERY = int(os.getenv("COMPARISON_RESULTS_PER_QUERY", "5"))
+COMPARISON_RESULT_BUDGET = int(os.getenv("COMPARISON_RESULT_BUDGET", "15"))
+
+# Process-wide cache of raw Serper results, keyed on query + result count
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", str(60 * 60)))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2048"))
+
+# Speculative prefetch of likely follow-up turns (off by default)
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "false").lower() in {"1", "true", "yes"}
+PREFETCH_REPORTS = os.getenv("PREFETCH_REPORTS", "false").lower() in {"1", "true", "yes"}
+PREFETCH_TOP_UNIVERSITIES = int(os.getenv("PREFETCH_TOP_UNIVERSITIES", "2"))
+PREFETCH_SESSION_BUDGET = int(os.getenv("PREFETCH_SESSION_BUDGET", "30"))  # searches per session
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "2"))
+
+# Follow-up questions are generated alongside the writer; once the writer
+# is done we wait at most this long before using template follow-ups
+FOLLOWUP_GRACE_SECONDS = float(os.getenv("FOLLOWUP_GRACE_SECONDS", "0.5"))
+
+# Streamlit chat history (SQLite) and how much of it each rerun loads
+CHAT_HISTORY_DB_PATH = os.getenv("CHAT_HISTORY_DB_PATH", "gradpath_chats.db")
+CHAT_RESIDENT_MESSAGES = int(os.getenv("CHAT_RESIDENT_MESSAGES", "40"))
+CHAT_SESSIONS_PAGE_SIZE = int(os.getenv("CHAT_SESSIONS_PAGE_SIZE", "10"))
+
+# Usage budgets (0 = unlimited). Exceeding them degrades the answer
+# (fewer searches, shorter reports, cached answers) instead of failing.
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", "0"))
+TURN_TOKEN_BUDGET = int(os.getenv("TURN_TOKEN_BUDGET", "0"))
+SESSION_SEARCH_BUDGET = int(os.getenv("SESSION_SEARCH_BUDGET", "0"))
+TURN_SEARCH_BUDGET = int(os.getenv("TURN_SEARCH_BUDGET", "0"))
+# Per-turn breakdowns kept per session in the usage ledger
+USAGE_TURNS_KEPT = int(os.getenv("USAGE_TURNS_KEPT", "50"))
+
+# HTTP service (python -m src.server)
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8080"))
+# Pipeline runs in flight at once; further requests wait up to the queue timeout
+SERVER_MAX_CONCURRENCY = int(os.getenv("SERVER_MAX_CONCURRENCY", "8"))
+SERVER_QUEUE_TIMEOUT_SECONDS = float(os.getenv("SERVER_QUEUE_TIMEOUT_SECONDS", "10"))
+# On shutdown, in-flight turns get this long to finish
+SERVER_SHUTDOWN_GRACE_SECONDS = float(os.getenv("SERVER_SHUTDOWN_GRACE_SECONDS", "60"))
+
+# Multi-process worker pool (src/worker_pool.py); sessions are sharded by
+# consistent hash so each session's profile memory stays in one process
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", str(os.cpu_count() or 2)))
+WORKER_RESTART = os.getenv("WORKER_RESTART", "true").lower() in {"1", "true", "yes"}
+
+# Per-turn profiling (src/profiling.py): "off", "cprofile" (deterministic,
+# pstats file) or "sample" (stack sampler, collapsed-stack file for flame graphs)
+PROFILE_MODE = os.getenv("PROFILE_MODE", "off").lower()
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0.05"))  # fraction of turns profiled
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+# Page fetching for deep dives (src/tools/fetch.py)
+PAGE_FETCH_ENABLED = os.getenv("PAGE_FETCH_ENABLED", "true").lower() in {"1", "true", "yes"}
+PAGE_FETCH_WORKERS = int(os.getenv("PAGE_FETCH_WORKERS", "8"))
+PAGE_FETCH_PER_DOMAIN = int(os.getenv("PAGE_FETCH_PER_DOMAIN", "2"))  # concurrent requests per domain
+PAGE_FETCH_DOMAIN_DELAY = float(os.getenv("PAGE_FETCH_DOMAIN_DELAY", "0.5"))  # seconds between requests
+PAGE_FETCH_MAX_BYTES = int(os.getenv("PAGE_FETCH_MAX_BYTES", str(1_500_000)))
+PAGE_FETCH_TIMEOUT = float(os.getenv("PAGE_FETCH_TIMEOUT", "8"))
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", ".page_cache")  # empty = no disk cache
+PAGE_CACHE_TTL_SECONDS = int(os.getenv("PAGE_CACHE_TTL_SECONDS", str(7 * 24 * 60 * 60)))
+# Pages fetched per deep dive, excerpt size per page, and how long to wait for them
+DEEP_DIVE_FETCH_PAGES = int(os.getenv("DEEP_DIVE_FETCH_PAGES", "6"))
+DEEP_DIVE_PAGE_CHARS = 1800
+DEEP_DIVE_FETCH_SECONDS = float(os.getenv("DEEP_DIVE_FETCH_SECONDS", "12"))
+
+# Queries that returned zero results are remembered (with the relaxed form
+# that worked, if any) and retried through a relaxation ladder
+ZERO_RESULT_CACHE_TTL_SECONDS = int(os.getenv("ZERO_RESULT_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+ZERO_RESULT_CACHE_MAX_ENTRIES = int(os.getenv("ZERO_RESULT_CACHE_MAX_ENTRIES", "1024"))
+QUERY_RELAXATION_MAX_STEPS = int(os.getenv("QUERY_RELAXATION_MAX_STEPS", "3"))
+
+# Per-turn latency budget (0 = no deadline). Stages before the report get
+# timeouts from what is left minus the report reserve and are skipped (with
+# their fallbacks) once fewer than DEADLINE_MIN_STAGE_SECONDS remain; the
+# report itself always runs, with at least DEADLINE_REPORT_MIN_SECONDS.
+TURN_DEADLINE_SECONDS = float(os.getenv("TURN_DEADLINE_SECONDS", "45"))
+DEADLINE_REPORT_RESERVE_SECONDS = float(os.getenv("DEADLINE_REPORT_RESERVE_SECONDS", "15"))
+DEADLINE_REPORT_MIN_SECONDS = float(os.getenv("DEADLINE_REPORT_MIN_SECONDS", "10"))
+DEADLINE_MIN_STAGE_SECONDS = float(os.getenv("DEADLINE_MIN_STAGE_SECONDS", "2"))
+# Upper bounds for single upstream calls, with or without a deadline
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+SERPER_TIMEOUT_SECONDS = float(os.getenv("SERPER_TIMEOUT_SECONDS", "20"))
+SERPER_BATCH_TIMEOUT_SECONDS = float(os.getenv("SERPER_BATCH_TIMEOUT_SECONDS", "30"))
+
+# Upstream call scheduling (src/scheduler.py): concurrent calls per upstream
+# in this process (0 = unlimited) and how long a queued call waits before
+# it moves up one priority class
+SCHEDULER_GEMINI_CONCURRENCY = int(os.getenv("SCHEDULER_GEMINI_CONCURRENCY", "8"))
+SCHEDULER_SERPER_CONCURRENCY = int(os.getenv("SCHEDULER_SERPER_CONCURRENCY", "8"))
+SCHEDULER_AGING_SECONDS = float(os.getenv("SCHEDULER_AGING_SECONDS", "10"))
+
+# Session snapshots (src/snapshot.py)
+SNAPSHOT_COMPRESSION_LEVEL = int(os.getenv("SNAPSHOT_COMPRESSION_LEVEL", "6"))
+SNAPSHOT_MAX_MESSAGES = int(os.getenv("SNAPSHOT_MAX_MESSAGES", "200"))
+
+# Template planner (src/planner.py): with a complete profile and a message
+# that adds nothing the profile doesn't already say, the search plan is
+# built from templates instead of by the planner model
+TEMPLATE_PLANNER_ENABLED = os.getenv("TEMPLATE_PLANNER_ENABLED", "true").lower() in {"1", "true", "yes"}
+TEMPLATE_PLAN_MAX_COUNTRIES = int(os.getenv("TEMPLATE_PLAN_MAX_COUNTRIES", "2"))
+
+# Memory accounting (src/memtrack.py): "off", "stages" (tracemalloc peak and
+# net growth per pipeline stage, recorded with each turn's usage) or
+# "snapshots" (also the allocation sites that grew most over each turn).
+# Resident memory per session is estimated on demand in every mode.
+MEMTRACK_MODE = os.getenv("MEMTRACK_MODE", "off").lower()
+MEMTRACK_FRAMES = int(os.getenv("MEMTRACK_FRAMES", "1"))  # stack frames kept per allocation
+MEMTRACK_TOP_N = int(os.getenv("MEMTRACK_TOP_N", "10"))  # allocation sites kept per turn
+
+# Conversation context (src/conversation.py): a rolling summary of older
+# turns, the last few turns and the universities mentioned, added to the
+# classifier, coordinator and planner prompts within a fixed token budget
+CONVERSATION_CONTEXT_ENABLED = os.getenv("CONVERSATION_CONTEXT_ENABLED", "true").lower() in {"1", "true", "yes"}
+CONVERSATION_CONTEXT_TOKENS = int(os.getenv("CONVERSATION_CONTEXT_TOKENS", "400"))  # whole block
+CONVERSATION_SUMMARY_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "150"))  # rolling summary
+CONVERSATION_RECENT_TURNS = int(os.getenv("CONVERSATION_RECENT_TURNS", "3"))  # kept as-is, newest last
+CONVERSATION_MAX_ENTITIES = int(os.getenv("CONVERSATION_MAX_ENTITIES", "10"))  # universities remembered
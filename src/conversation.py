@@ -0,0 +1,262 @@
+"""
+Bounded conversation context for the pre-report prompts.
+
+Each stage used to see only the current message and the flat profile, so
+the coordinator re-asked for details given a few turns back and "tell me
+more about the second school" had nothing to resolve against. Sending the
+whole chat history instead would grow every prompt with the session.
+
+A ConversationContext per session keeps:
+
+    recent     the last CONVERSATION_RECENT_TURNS turns: the student's
+               message and a gist of the answer (the programs listed, the
+               universities compared, or the question asked back)
+    summary    one line per older turn, folded in as turns leave the recent
+               window; the oldest lines are dropped once the summary passes
+               CONVERSATION_SUMMARY_TOKENS
+    entities   universities mentioned so far (most recent last) and the
+               last numbered list shown, for "the second one" / "it"
+
+render() packs these into at most CONVERSATION_CONTEXT_TOKENS, giving up
+the summary before recent turns and recent turns before entities, so the
+classifier, coordinator and planner prompts grow by a fixed amount however
+long the session runs. The summary is extractive rather than written by the
+model, so keeping it costs no extra call. Tokens are estimated at
+CHARS_PER_TOKEN characters each.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .config import (
+    CONVERSATION_CONTEXT_ENABLED,
+    CONVERSATION_CONTEXT_TOKENS,
+    CONVERSATION_MAX_ENTITIES,
+    CONVERSATION_RECENT_TURNS,
+    CONVERSATION_SUMMARY_TOKENS,
+)
+
+CHARS_PER_TOKEN = 4
+# Budgets for one side of a recent turn and of a summary line
+TURN_MESSAGE_TOKENS = 40
+SUMMARY_MESSAGE_TOKENS = 20
+
+_MARKDOWN_RE = re.compile(r"[*_`#>|]+")
+_LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_ORDINALS = {
+    "first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5,
+    "sixth": 6, "seventh": 7, "eighth": 8, "ninth": 9, "tenth": 10, "last": -1,
+}
+# "the second one/school/...", or a bare "the second" ending the phrase; not
+# "the first intake" or "the last deadline"
+_ORDINAL_RE = re.compile(
+    r"\bthe\s+(" + "|".join(_ORDINALS) + r"|\d{1,2}(?:st|nd|rd|th))"
+    r"(?=\s+(?:one|school|university|uni|program|programme|option|college|choice)s?\b|\s*(?:[.,;:!?)]|$))"
+    r"|(?:#|\bnumber\s+|\bno\.\s*)(\d{1,2})\b",
+    re.IGNORECASE,
+)
+_PRONOUN_RE = re.compile(
+    r"\b(?:it|its|there|(?:that|this)\s+(?:one|school|university|program|programme|college))\b",
+    re.IGNORECASE,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def clip(text: str, max_tokens: int) -> str:
+    """Text on one line, cut at a word boundary to fit max_tokens."""
+    text = " ".join(text.split())
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit - 1]
+    if " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut + "…"
+
+
+def _plain(text: str) -> str:
+    return _MARKDOWN_RE.sub("", _LINK_RE.sub(r"\1", text)).strip()
+
+
+def listed_universities(response: str) -> List[str]:
+    """
+    Universities in the order they appear in the answer's program table
+    (the writer's "| # | ... | University | ..." layout), or [] without one.
+    """
+    names: List[str] = []
+    column: Optional[int] = None
+    for line in response.splitlines():
+        line = line.strip()
+        if not line.startswith("|"):
+            if column is not None and names:
+                break
+            continue
+        cells = [c.strip() for c in line.strip("|").split("|")]
+        if column is None:
+            lowered = [c.lower() for c in cells]
+            if "university" in lowered:
+                column = lowered.index("university")
+            continue
+        if len(cells) <= column or set(cells[column]) <= set("-: "):
+            continue
+        name = _plain(cells[column])
+        if name and name.lower() not in {n.lower() for n in names}:
+            names.append(name)
+    return names
+
+
+@dataclass
+class ConversationTurn:
+    number: int
+    user: str
+    reply: str
+    query_type: Optional[str] = None
+
+    def line(self, max_tokens: int) -> str:
+        kind = f" ({self.query_type})" if self.query_type else ""
+        return f"Turn {self.number}{kind}: student: {clip(self.user, max_tokens)} | GradPath: {clip(self.reply, max_tokens)}"
+
+
+@dataclass
+class ConversationContext:
+    """Rolling, token-bounded memory of one session's conversation."""
+    turns: int = 0
+    summary: List[str] = field(default_factory=list)  # one line per folded turn, oldest first
+    omitted: int = 0  # summary lines dropped to stay within budget
+    recent: List[ConversationTurn] = field(default_factory=list)
+    entities: List[str] = field(default_factory=list)  # universities, most recently mentioned last
+    last_list: List[str] = field(default_factory=list)  # last numbered list shown to the student
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ConversationContext":
+        fields = dict(data)
+        fields["recent"] = [ConversationTurn(**t) for t in fields.get("recent", [])]
+        return cls(**fields)
+
+    def add_turn(
+        self,
+        user_input: str,
+        response: str,
+        query_type: Optional[str] = None,
+        universities: Optional[List[str]] = None,
+    ) -> None:
+        """Record a finished turn: the message, a gist of the answer and its universities."""
+        universities = list(universities or [])
+        listed = listed_universities(response)
+        if listed:
+            self.last_list = listed[:CONVERSATION_MAX_ENTITIES]
+            reply = "listed " + "; ".join(f"{i}. {name}" for i, name in enumerate(listed, 1))
+        elif query_type == "compare" and len(universities) >= 2:
+            self.last_list = universities[:CONVERSATION_MAX_ENTITIES]
+            reply = "compared " + ", ".join(universities)
+        elif query_type == "deep_dive" and universities:
+            reply = "detailed report on " + ", ".join(universities)
+        else:
+            reply = _plain(next((line for line in response.splitlines() if line.strip()), ""))
+        self._mention(universities + listed)
+
+        self.turns += 1
+        self.recent.append(ConversationTurn(
+            number=self.turns,
+            user=clip(user_input, TURN_MESSAGE_TOKENS),
+            reply=clip(reply, TURN_MESSAGE_TOKENS),
+            query_type=query_type,
+        ))
+        while len(self.recent) > max(0, CONVERSATION_RECENT_TURNS):
+            self._fold(self.recent.pop(0))
+
+    def _mention(self, names: List[str]) -> None:
+        for name in names:
+            name = name.strip()
+            if not name:
+                continue
+            self.entities = [e for e in self.entities if e.lower() != name.lower()] + [name]
+        del self.entities[:-CONVERSATION_MAX_ENTITIES or None]
+
+    def _fold(self, turn: ConversationTurn) -> None:
+        self.summary.append(turn.line(SUMMARY_MESSAGE_TOKENS))
+        while len(self.summary) > 1 and estimate_tokens("\n".join(self.summary)) > CONVERSATION_SUMMARY_TOKENS:
+            self.summary.pop(0)
+            self.omitted += 1
+
+    def resolve_references(self, message: str) -> List[str]:
+        """
+        Universities the message points at by position ("the second school",
+        "#3", "the last one", from the last list shown) or by pronoun ("it",
+        "that program": the most recently mentioned one).
+        """
+        resolved: List[str] = []
+        for match in _ORDINAL_RE.finditer(message):
+            word = (match.group(1) or match.group(2)).lower()
+            position = _ORDINALS.get(word) or int(re.sub(r"\D", "", word))
+            if self.last_list and (position == -1 or 1 <= position <= len(self.last_list)):
+                resolved.append(self.last_list[position - 1 if position > 0 else -1])
+        if not resolved and self.entities and _PRONOUN_RE.search(message):
+            resolved.append(self.entities[-1])
+        return list(dict.fromkeys(resolved))
+
+    def render(self, max_tokens: int = CONVERSATION_CONTEXT_TOKENS) -> str:
+        """The context as prompt text of at most max_tokens (estimated), or "" before the first turn."""
+        if not self.turns:
+            return ""
+
+        def fits(lines: List[str]) -> bool:
+            return estimate_tokens("\n".join(lines)) <= max_tokens
+
+        # Priority: entities, then recent turns newest first, then summary newest first
+        entity_lines = []
+        if self.last_list:
+            entity_lines.append("Last list shown: " + "; ".join(f"{i}. {n}" for i, n in enumerate(self.last_list, 1)))
+        if self.entities:
+            entity_lines.append("Universities mentioned (most recent last): " + ", ".join(self.entities))
+        entity_lines = [clip(line, max_tokens // 4) for line in entity_lines]
+
+        # Recent turns that don't fit compete with the summary as short lines
+        recent_lines: List[str] = []
+        older = list(self.summary)
+        for shown, turn in enumerate(reversed(self.recent)):
+            line = turn.line(TURN_MESSAGE_TOKENS)
+            if not fits(entity_lines + recent_lines + [line]):
+                older += [t.line(SUMMARY_MESSAGE_TOKENS) for t in self.recent[:len(self.recent) - shown]]
+                break
+            recent_lines.insert(0, line)
+
+        summary_lines: List[str] = []
+        omitted = self.omitted
+        for i, line in enumerate(reversed(older)):
+            if not fits(entity_lines + recent_lines + summary_lines + [line, "(N earlier turns not shown)"]):
+                omitted += len(older) - i
+                break
+            summary_lines.insert(0, line)
+
+        # The real note can be longer than the placeholder above; make room
+        # for it by giving up the oldest lines
+        lines = summary_lines + recent_lines
+        while omitted:
+            note = f"({omitted} earlier turns not shown)"
+            if fits([note] + lines + entity_lines):
+                lines.insert(0, note)
+                break
+            if not lines:
+                break
+            lines.pop(0)
+            omitted += 1
+
+        return "\n".join(lines + entity_lines)
+
+
+def conversation_section(context: ConversationContext) -> str:
+    """Prompt section with the session's conversation so far ("" if none or disabled)."""
+    if not CONVERSATION_CONTEXT_ENABLED:
+        return ""
+    rendered = context.render()
+    if not rendered:
+        return ""
+    return f"""
+CONVERSATION SO FAR (earlier turns, summarized; oldest first):
+{rendered}
+"""
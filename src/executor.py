@@ -1,19 +1,85 @@
 import json
-from typing import Dict, Any, List
-
-import google.generativeai as genai
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, List, Optional
 
 from .config import (
-    GEMINI_API_KEY,
-    GEMINI_MODEL_NAME,
     MIN_PROGRAM_RESULTS,
     MAX_PROGRAM_RESULTS,
+    WRITER_CANDIDATE_LIMIT,
+    SERPER_BATCH_MIN_QUERIES,
+    COMPARISON_MAX_QUERIES,
+    COMPARISON_RESULTS_PER_QUERY,
+    COMPARISON_RESULT_BUDGET,
+    SEARCH_RESULTS_PER_QUERY,
+    DEEP_DIVE_MAX_QUERIES,
+    DEEP_DIVE_COMPACT_QUERIES,
+    DEEP_DIVE_RESULTS_PER_QUERY,
+    DEEP_DIVE_RESULT_LIMIT,
+    PREFETCH_ENABLED,
+    PREFETCH_REPORTS,
+    PREFETCH_TOP_UNIVERSITIES,
+    FOLLOWUP_GRACE_SECONDS,
+    PAGE_FETCH_ENABLED,
+    DEEP_DIVE_FETCH_PAGES,
+    DEEP_DIVE_PAGE_CHARS,
+    DEEP_DIVE_FETCH_SECONDS,
+    TURN_DEADLINE_SECONDS,
+    DEADLINE_REPORT_RESERVE_SECONDS,
+    SERPER_TIMEOUT_SECONDS,
+    QUERY_RELAXATION_MAX_STEPS,
+)
+from .conversation import conversation_section
+from .llm import generate_json, generate_text, stage_max_output_tokens
+from .memory import InMemoryProfileStore, StudentProfile, missing_required_fields
+from .memtrack import track_turn_memory
+from .prefetch import PrefetchTask, prefetcher
+from .profiling import profile_turn
+from .ranking import domain_prior, rank_candidates
+from .records import filter_candidates
+from .report_cache import make_report_key, report_cache
+from .schemas import CoordinatorDecision, FollowUpQuestions, QueryClassification
+from .turn_context import (
+    ProgressCallback,
+    TurnContext,
+    TurnDeadlineExceeded,
+    current_turn,
+    report_progress,
+    stage_timeout,
+    submit_in_context,
+    time_left,
+    turn_scope,
+)
+from .usage import (
+    can_afford_optional_call,
+    mark_degraded,
+    output_token_cap,
+    remaining_searches,
+    remaining_tokens,
+    usage_ledger,
+)
+from .tools.fetch import page_fetcher, target_sections
+from .tools.search import (
+    serper_program_search,
+    serper_batch_search,
+    extract_program_candidates,
+    relax_query,
+    search_cache,
+    search_cache_key,
+    zero_result_cache,
+    zero_result_key,
 )
-from .memory import InMemoryProfileStore
-from .tools.search import serper_program_search, extract_program_candidates
 
-# Configure Gemini once
-genai.configure(api_key=GEMINI_API_KEY)
+# Only the start of a cached report is sent to the personalization pass
+PERSONALIZATION_REPORT_CHARS = 4000
+
+BUDGET_EXHAUSTED_MESSAGE = (
+    "You've reached the usage limit for this chat session. "
+    "Please start a new chat or try again later."
+)
+
+# Runs follow-up generation concurrently with the writer call
+_followup_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="followups")
 
 
 QUERY_CLASSIFIER_PROMPT = """
@@ -29,6 +95,10 @@ Types:
 3. "new_search" - User wants to search for new programs or modify their search
    Examples: "I want programs in AI", "Show me PhD programs in Europe"
 
+If the message refers to universities from earlier in the conversation ("the second
+school", "that program", "both of them"), put their actual names in "universities",
+using the conversation so far when it is given.
+
 Output ONLY valid JSON:
 {
   "query_type": "deep_dive" | "compare" | "new_search",
@@ -158,6 +228,29 @@ Remember to include website links in the table AND a **References** section at t
 """
 
 
+PERSONALIZATION_PROMPT = """
+You are GradPath. A general report (below) has already been written for the student's question.
+Do NOT rewrite it. Write ONLY a short addendum that tailors it to this student.
+
+STUDENT PROFILE (JSON):
+{profile}
+
+STUDENT'S QUESTION:
+{question}
+
+REPORT (may be truncated):
+{report}
+
+Output a markdown section that starts with the heading "## 🎯 What This Means for You" followed by
+3-5 bullet points that:
+- relate the report's requirements, funding and deadlines to the student's GPA, test scores, funding needs and intake term
+- answer any specific part of their question the general report does not address
+- name one concrete next step
+
+Speak directly to the student using "you" and "your". Do not repeat links already in the report.
+"""
+
+
 FOLLOWUP_GENERATOR_PROMPT = """
 You are GradPath's follow-up question generator. After providing search results, suggest 2-3 intelligent, contextual follow-up questions to continue the conversation naturally.
 
@@ -254,6 +347,7 @@ Rules:
 - If profile already has degree_level, DON'T ask about degree level again
 - If profile already has preferred_countries, DON'T ask about location again
 - If user just provided info in current message, DON'T ask for it again
+- Details the student gave in earlier turns of the conversation count as provided; if they answered one of your questions, use the answer
 - If you have field + degree_level + location (from EITHER source), you CAN search
 - Only ask about funding/GPA as optional follow-up questions AFTER confirming required fields
 - Use 2nd person language ("you", "your")
@@ -266,7 +360,9 @@ You are GradPath, a friendly advisor helping someone find graduate programs.
 You receive:
 - Their profile (JSON) - their background and preferences
 - A search plan (JSON) with filters and search_queries
-- A list of program candidates from web search
+- A list of program candidates from web search; some carry a "facts" object
+  (GPA/test minimums, GRE policy, funding keywords, deadlines) parsed from
+  their snippet - use these for requirements and deadlines when present
 
 Your goals:
 1. SEPARATE the candidates into TWO categories:
@@ -313,6 +409,36 @@ Rules:
 """
 
 
+def fallback_coordinator_decision(profile: StudentProfile) -> Dict[str, Any]:
+    """
+    Deterministic readiness decision used when the coordinator call fails.
+
+    Marked with "fallback": True so callers (and benchmarks) can tell it
+    from a model decision.
+    """
+    missing = missing_required_fields(profile)
+    if not missing:
+        return {
+            "needs_more_info": False,
+            "missing_info": [],
+            "questions_to_ask": "",
+            "ready_to_search": True,
+            "extracted_info": {},
+            "fallback": True,
+        }
+    return {
+        "needs_more_info": True,
+        "missing_info": missing,
+        "questions_to_ask": (
+            "I'd love to help you find the perfect graduate programs! "
+            f"Could you tell me your {', '.join(missing)}?"
+        ),
+        "ready_to_search": False,
+        "extracted_info": {},
+        "fallback": True,
+    }
+
+
 def check_if_ready_to_search(
     user_input: str,
     session_id: str,
@@ -333,37 +459,19 @@ def check_if_ready_to_search(
 
 CURRENT STUDENT PROFILE (JSON):
 {json.dumps(profile_dict, indent=2)}
-
+{conversation_section(store.conversation(session_id))}
 USER'S LATEST MESSAGE:
 {user_input}
 
 Now decide: do we have enough information to search for programs?
 """
     
-    model = genai.GenerativeModel(GEMINI_MODEL_NAME)
-    response = model.generate_content(prompt)
-    
-    text = response.text.strip() if response.text else ""
-    
-    # Clean up markdown code blocks
-    if text.startswith("```"):
-        lines = text.split("\n")
-        if len(lines) > 2:
-            text = "\n".join(lines[1:-1])
-        if text.startswith("json\n"):
-            text = text[5:]
-        text = text.strip()
-    
     try:
-        decision = json.loads(text)
-    except json.JSONDecodeError:
-        # Default to asking for more info if parsing fails
-        decision = {
-            "needs_more_info": True,
-            "missing_info": ["basic requirements"],
-            "questions_to_ask": "I'd love to help you find the perfect graduate programs! Could you tell me a bit more about what you're looking for? Specifically, what field are you interested in, and do you have a GPA and location preference?",
-            "ready_to_search": False
-        }
+        decision = generate_json(prompt, CoordinatorDecision, stage="coordinator").model_dump()
+    except Exception as e:
+        # Decide from the stored profile rather than forcing a clarifying turn
+        print(f"[WARN] Coordinator output unusable, deciding from profile: {e}")
+        decision = fallback_coordinator_decision(profile)
     
     # IMPORTANT: Even if we need more info, save any extracted info to memory
     extracted = decision.get("extracted_info", {})
@@ -407,188 +515,585 @@ Now decide: do we have enough information to search for programs?
     return decision
 
 
-def run_search_queries(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+def search_deadline_reached() -> bool:
+    """True when the turn's deadline leaves no time for another search."""
+    try:
+        stage_timeout(SERPER_TIMEOUT_SECONDS, reserve=DEADLINE_REPORT_RESERVE_SECONDS, step="search")
+    except TurnDeadlineExceeded:
+        return True
+    return False
+
+
+def _fetch_raw_results(queries: List[str], num_results: int) -> List[Optional[Dict[str, Any]]]:
+    """
+    Raw Serper JSON for each query, in input order.
+
+    Queries already in the shared search cache are answered locally. The
+    rest are trimmed to the remaining search budget; of those, turns with
+    SERPER_BATCH_MIN_QUERIES or more go out as a single batched Serper
+    request; smaller turns use one request per query. None marks a query
+    that failed or was skipped for budget.
+    """
+    raw_results: List[Optional[Dict[str, Any]]] = [
+        search_cache.get(search_cache_key(q, num_results)) for q in queries
+    ]
+    missing = [i for i, res in enumerate(raw_results) if res is None]
+    if len(missing) < len(queries):
+        print(f"[DEBUG] Search cache answered {len(queries) - len(missing)}/{len(queries)} queries")
+
+    allowance = remaining_searches()
+    if allowance is not None and len(missing) > allowance:
+        print(f"[DEBUG] Search budget allows {allowance} of {len(missing)} uncached queries")
+        mark_degraded(f"searches trimmed to {allowance} by usage budget")
+        missing = missing[:allowance]
+
+    if missing and search_deadline_reached():
+        print(f"[WARN] Skipping {len(missing)} uncached searches: turn deadline is too close")
+        mark_degraded("searches cut short by the turn deadline")
+        missing = []
+
+    if len(missing) >= SERPER_BATCH_MIN_QUERIES:
+        print(f"[DEBUG] Sending {len(missing)} queries as one Serper batch")
+        fetched = serper_batch_search([queries[i] for i in missing], num_results=num_results)
+        for i, res in zip(missing, fetched):
+            raw_results[i] = res
+        if any(res is None for res in fetched) and search_deadline_reached():
+            mark_degraded("searches cut short by the turn deadline")
+    else:
+        for i in missing:
+            try:
+                raw_results[i] = serper_program_search(queries[i], num_results=num_results)
+            except TurnDeadlineExceeded as e:
+                print(f"[WARN] Cancelling remaining searches: {e}")
+                mark_degraded("searches cut short by the turn deadline")
+                break
+            except Exception as e:
+                print(f"[WARN] Search error for query '{queries[i]}': {e}")
+
+    for i in missing:
+        if raw_results[i] is not None:
+            search_cache.set(search_cache_key(queries[i], num_results), raw_results[i])
+
+    return raw_results
+
+
+def _is_zero_yield(raw: Optional[Dict[str, Any]]) -> bool:
+    # None is a failed/skipped search, not an empty one; don't relax those
+    return raw is not None and not raw.get("organic")
+
+
+def search_many(
+    queries: List[str],
+    num_results: int = 5,
+    keep_terms: Optional[List[str]] = None,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Run several search queries and return the candidates found for each one.
+
+    Queries that recently came back empty are answered from zero_result_cache:
+    either swapped for the relaxed form that worked last time, or skipped
+    when no relaxation helped. Queries that come back empty now are retried
+    down the relax_query ladder (one batched round per rung, no planner
+    call), and the outcome is remembered for next time. Words of keep_terms
+    (the student's degree, field and countries) are never relaxed away.
+
+    Returns:
+        One candidate list per query, in input order (empty on failure,
+        when skipped for budget, or when no relaxation found anything).
+    """
+    if not queries:
+        return []
+
+    effective: List[Optional[str]] = []
+    for q in queries:
+        known = zero_result_cache.get(zero_result_key(q))
+        if known is None:
+            effective.append(q)
+        elif known:
+            print(f"[DEBUG] Zero-result cache: '{q}' -> '{known}'")
+            effective.append(known)
+        else:
+            print(f"[DEBUG] Zero-result cache: skipping '{q}' (no results recently)")
+            effective.append(None)
+
+    live = [i for i, q in enumerate(effective) if q is not None]
+    raw_results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+    for i, res in zip(live, _fetch_raw_results([effective[i] for i in live], num_results)):
+        raw_results[i] = res
+
+    ladders = {
+        i: relax_query(effective[i], keep_terms)[:QUERY_RELAXATION_MAX_STEPS]
+        for i in live if _is_zero_yield(raw_results[i])
+    }
+    ladders = {i: ladder for i, ladder in ladders.items() if ladder}
+    step = 0
+    while ladders:
+        attempt = {i: ladder[step] for i, ladder in ladders.items()}
+        print(f"[DEBUG] Relaxing {len(attempt)} zero-result queries (step {step + 1})")
+        fetched = _fetch_raw_results(list(attempt.values()), num_results)
+        step += 1
+        for (i, relaxed), res in zip(attempt.items(), fetched):
+            if res is None:
+                # Out of budget or a failed request; stop here without a verdict
+                del ladders[i]
+            elif not _is_zero_yield(res):
+                print(f"[DEBUG] Relaxed '{queries[i]}' -> '{relaxed}'")
+                raw_results[i] = res
+                zero_result_cache.set(zero_result_key(queries[i]), relaxed)
+                del ladders[i]
+            elif step >= len(ladders[i]):
+                print(f"[DEBUG] No relaxation of '{queries[i]}' returned results")
+                zero_result_cache.set(zero_result_key(queries[i]), "")
+                del ladders[i]
+
+    return [extract_program_candidates(res) if res else [] for res in raw_results]
+
+
+def run_search_queries(plan: Dict[str, Any], profile: Optional[StudentProfile] = None) -> List[Dict[str, Any]]:
     """
     Execute search_queries from the plan using Serper and accumulate candidates.
+
+    The profile's degree, field and countries are kept in any relaxed query.
     """
+    keep_terms = None
+    if profile is not None:
+        keep_terms = [profile.degree_level, profile.field_of_study, profile.preferred_countries]
     search_queries = plan.get("search_queries", []) or []
     all_candidates: List[Dict[str, Any]] = []
 
     print(f"[DEBUG] Search queries from plan: {search_queries}")
-    
-    for q in search_queries:
-        try:
-            print(f"[DEBUG] Executing search for: {q}")
-            res = serper_program_search(q, num_results=5)
-            extracted = extract_program_candidates(res)
-            print(f"[DEBUG] Found {len(extracted)} candidates for query: {q}")
-            all_candidates.extend(extracted)
-        except Exception as e:
-            print(f"[WARN] Search error for query '{q}': {e}")
-            continue
+
+    for q, extracted in zip(search_queries, search_many(search_queries, num_results=SEARCH_RESULTS_PER_QUERY, keep_terms=keep_terms)):
+        print(f"[DEBUG] Found {len(extracted)} candidates for query: {q}")
+        all_candidates.extend(extracted)
 
     print(f"[DEBUG] Total candidates found: {len(all_candidates)}")
     return all_candidates
 
 
-def classify_query(user_input: str) -> Dict[str, Any]:
+def classify_query(user_input: str, context: str = "") -> Dict[str, Any]:
     """
     Classify the user's query to determine if it's a new search, deep dive, or comparison.
+
+    Args:
+        user_input: The user's message.
+        context: Conversation section from conversation_section, if any,
+            so references to earlier turns can be resolved.
     """
     prompt = f"""
 {QUERY_CLASSIFIER_PROMPT}
-
+{context}
 USER MESSAGE:
 {user_input}
 """
     
-    model = genai.GenerativeModel(GEMINI_MODEL_NAME)
-    response = model.generate_content(prompt)
-    text = response.text.strip() if response.text else ""
-    
-    # Clean up markdown code blocks
-    if text.startswith("```"):
-        lines = text.split("\n")
-        if len(lines) > 2:
-            text = "\n".join(lines[1:-1])
-        if text.startswith("json\n"):
-            text = text[5:]
-        text = text.strip()
-    
     try:
-        return json.loads(text)
-    except json.JSONDecodeError:
+        return generate_json(prompt, QueryClassification, stage="classifier").model_dump()
+    except Exception as e:
         # Default to new_search if classification fails
+        print(f"[WARN] Query classification failed, defaulting to new_search: {e}")
         return {"query_type": "new_search", "universities": [], "comparison_aspects": [], "notes": ""}
 
 
-def handle_deep_dive(university_query: str, universities: List[str], store: InMemoryProfileStore, session_id: str) -> str:
+def clean_response_text(text: str) -> str:
+    """
+    Replace literal Unicode escape sequences Gemini sometimes emits.
+    """
+    text = text or ""
+    text = text.replace(r'\u201c', '"')  # Left double quotation mark
+    text = text.replace(r'\u201d', '"')  # Right double quotation mark
+    text = text.replace(r'\u2018', "'")  # Left single quotation mark
+    text = text.replace(r'\u2019', "'")  # Right single quotation mark
+    text = text.replace(r'\u2013', '–')  # En dash
+    text = text.replace(r'\u2014', '—')  # Em dash
+    text = text.replace(r'\u2026', '...')  # Ellipsis
+    return text
+
+
+def personalize_report(
+    base_report: str,
+    user_question: str,
+    profile_dict: Dict[str, Any],
+) -> str:
+    """
+    Tailor a shared (cached) report to one student.
+
+    Instead of regenerating the whole report per profile, a short Gemini call
+    writes a "What This Means for You" section from the profile and the start
+    of the report, and appends it. Falls back to the base report on failure or
+    when the profile is still empty.
+    """
+    if not any(profile_dict.values()):
+        return base_report
+
+    prompt = PERSONALIZATION_PROMPT.format(
+        profile=json.dumps({k: v for k, v in profile_dict.items() if v}, indent=2),
+        question=user_question,
+        report=base_report[:PERSONALIZATION_REPORT_CHARS],
+    )
+
+    if not can_afford_optional_call():
+        return base_report
+
+    try:
+        section = clean_response_text(generate_text(
+            prompt,
+            stage="personalization",
+            generation_config=budget_generation_config("personalization"),
+        )).strip()
+    except Exception as e:
+        print(f"[WARN] Report personalization failed: {e}")
+        return base_report
+
+    if not section:
+        return base_report
+    return f"{base_report.rstrip()}\n\n{section}"
+
+
+def degraded_step_count() -> int:
+    """Number of degraded-step markers on the current turn so far."""
+    ctx = current_turn()
+    return len(ctx.degraded) if ctx is not None else 0
+
+
+def handle_deep_dive(
+    university_query: str,
+    universities: List[str],
+    store: InMemoryProfileStore,
+    session_id: str,
+) -> str:
     """
     Provide detailed, extensive information about a specific university program.
+
+    The base report is shared across sessions through report_cache (unless
+    it was written from degraded evidence); only the personalization pass
+    runs per student. The base report covers every aspect, so its key has
+    none: what the student asked about shapes the personalization only.
     """
     # Get student profile to include field of study
     profile = store.get_profile(session_id)
     field = profile.field_of_study or "graduate programs"
     degree = profile.degree_level or "MS"
-    
-    # Create comprehensive, focused search queries for extensive coverage
+    universities = universities[:2]  # Limit to 2 universities if multiple mentioned
+
+    cache_key = make_report_key("deep_dive", universities, field, degree)
+    base_report = report_cache.get(cache_key)
+    if base_report is None:
+        degraded_before = degraded_step_count()
+        base_report = generate_deep_dive_report(universities, field, degree)
+        if degraded_step_count() == degraded_before:
+            report_cache.put(cache_key, base_report)
+    else:
+        report_progress("report_cache_hit", universities=universities)
+
+    report_progress("personalizing")
+    return personalize_report(base_report, university_query, store.as_dict(session_id))
+
+
+def build_deep_dive_queries(
+    universities: List[str],
+    field: str,
+    degree: str,
+    compact: bool = False,
+) -> List[str]:
+    """
+    Create comprehensive, focused search queries for extensive coverage.
+
+    With compact=True (pages are fetched), searches only need to find the
+    right pages, so a few per university are enough.
+    """
     search_queries = []
-    for uni in universities[:2]:  # Limit to 2 universities if multiple mentioned
+    if compact:
+        for uni in universities:
+            search_queries.append(f'"{uni}" {field} {degree} program overview')
+            search_queries.append(f'"{uni}" {field} {degree} admission requirements funding')
+            search_queries.append(f'"{uni}" {field} {degree} application deadline')
+        return search_queries[:DEEP_DIVE_COMPACT_QUERIES]
+
+    for uni in universities:
         # Core program information
         search_queries.append(f'"{uni}" {field} {degree} program overview')
         search_queries.append(f'"{uni}" {field} {degree} admission requirements GPA test scores')
-        
+
         # Funding and financial
         search_queries.append(f'"{uni}" {field} {degree} funding RA TA fellowships stipend')
         search_queries.append(f'"{uni}" {field} graduate program scholarships financial aid')
-        
+
         # Application process
         search_queries.append(f'"{uni}" {field} {degree} application deadline process')
-        
+
         # Research and faculty
         search_queries.append(f'"{uni}" {field} research labs faculty')
-        
+
         # Student experience
         search_queries.append(f'"{uni}" {field} {degree} student experience career outcomes')
-        
-        # Specific details
-        if profile.extra_notes and 'healthcare' in profile.extra_notes.lower():
-            search_queries.append(f'"{uni}" {field} healthcare applications research')
-    
-    # Execute MORE searches for comprehensive results (8-10 queries)
+
+    return search_queries[:DEEP_DIVE_MAX_QUERIES]
+
+
+def select_pages_to_fetch(results: List[Dict[str, Any]], limit: int) -> List[str]:
+    """
+    Pick result URLs worth fetching in full: official university pages
+    first, no aggregators or listicles, at most two pages per domain.
+    """
+    scored = sorted(
+        ((domain_prior(r), i, r) for i, r in enumerate(results) if r.get("url")),
+        key=lambda s: (-s[0], s[1]),
+    )
+    per_domain: Counter = Counter()
+    urls: List[str] = []
+    for prior, _, result in scored:
+        domain = result.get("source") or ""
+        if prior < 0 or result["url"] in urls or per_domain[domain] >= 2:
+            continue
+        per_domain[domain] += 1
+        urls.append(result["url"])
+        if len(urls) >= limit:
+            break
+    return urls
+
+
+def fetch_page_excerpts(results: List[Dict[str, Any]]) -> str:
+    """
+    Fetch the most promising result pages and keep their admissions,
+    funding and deadline sections.
+    """
+    urls = select_pages_to_fetch(results, DEEP_DIVE_FETCH_PAGES)
+    if not urls:
+        return ""
+
+    try:
+        timeout = stage_timeout(DEEP_DIVE_FETCH_SECONDS, reserve=DEADLINE_REPORT_RESERVE_SECONDS, step="page fetch")
+    except TurnDeadlineExceeded as e:
+        print(f"[WARN] Skipping page fetches: {e}")
+        mark_degraded("page fetches skipped to meet the turn deadline")
+        return ""
+
+    report_progress("fetching_pages", pages=len(urls))
+    pages = page_fetcher.fetch_many(urls, timeout_seconds=timeout)
+    excerpts = [
+        f"Page: {page.title or page.url}\nURL: {page.final_url}\n"
+        f"{target_sections(page.text, max_chars=DEEP_DIVE_PAGE_CHARS)}"
+        for page in pages
+        if page is not None
+    ]
+    print(f"[DEBUG] Deep dive: fetched {len(excerpts)}/{len(urls)} pages")
+    return "\n\n".join(excerpts)
+
+
+def generate_deep_dive_report(universities: List[str], field: str, degree: str) -> str:
+    """
+    Search and write the profile-independent deep-dive report.
+
+    When page fetching is on, fewer searches are run and the report is
+    grounded in section excerpts of the top pages instead of snippets alone.
+    """
+    search_queries = build_deep_dive_queries(universities, field, degree, compact=PAGE_FETCH_ENABLED)
+
     all_results = []
-    for query in search_queries[:10]:  # Increased from 3 to 10
-        try:
-            print(f"[DEBUG] Deep dive search: {query}")
-            res = serper_program_search(query, num_results=8)  # Increased from 5 to 8 per query
-            all_results.extend(extract_program_candidates(res))
-        except Exception as e:
-            print(f"[WARN] Search error: {e}")
-    
-    # Format MORE search results for comprehensive report
+    print(f"[DEBUG] Deep dive searches: {search_queries}")
+    keep_terms = [*universities, field, degree]
+    for extracted in search_many(search_queries, num_results=DEEP_DIVE_RESULTS_PER_QUERY, keep_terms=keep_terms):
+        all_results.extend(extracted)
+
+    # Quote the first DEEP_DIVE_RESULT_LIMIT results in the report prompt
+    context_results = all_results[:DEEP_DIVE_RESULT_LIMIT]
     search_results_text = "\n\n".join([
         f"Title: {r['title']}\nURL: {r['url']}\nSnippet: {r['snippet']}"
-        for r in all_results[:30]  # Increased from 10 to 30 results
+        for r in context_results
     ])
-    
-    print(f"[DEBUG] Deep dive: Using {len(all_results[:30])} search results for comprehensive report")
-    
+
+    print(f"[DEBUG] Deep dive: Using {len(context_results)} search results for comprehensive report")
+
+    page_excerpts = fetch_page_excerpts(all_results) if PAGE_FETCH_ENABLED else ""
+    if page_excerpts:
+        search_results_text += (
+            "\n\nPAGE EXCERPTS (full-page text from the results above; "
+            "prefer these over snippets for requirements, funding and deadlines):\n\n"
+            + page_excerpts
+        )
+
     # Generate response with explicit instruction for extensive report
+    report_progress("writing", results=len(context_results))
     prompt = DEEP_DIVE_PROMPT.format(
-        university_query=university_query,
+        university_query=f"{degree} {field} at {' and '.join(universities)}",
         search_results=search_results_text or "No specific results found. Provide general guidance based on typical program structure."
     )
-    
-    model = genai.GenerativeModel(GEMINI_MODEL_NAME)
-    response = model.generate_content(prompt)
-    
-    # Clean up Unicode escape sequences
-    result = response.text
-    result = result.replace(r'\u201c', '"')  # Left double quotation mark
-    result = result.replace(r'\u201d', '"')  # Right double quotation mark
-    result = result.replace(r'\u2018', "'")  # Left single quotation mark
-    result = result.replace(r'\u2019', "'")  # Right single quotation mark
-    result = result.replace(r'\u2013', '–')  # En dash
-    result = result.replace(r'\u2014', '—')  # Em dash
-    result = result.replace(r'\u2026', '...')  # Ellipsis
-    
-    return result
+
+    try:
+        text = generate_text(prompt, stage="deep_dive", generation_config=budget_generation_config("deep_dive"))
+    except Exception as e:
+        # Answer from the evidence gathered so far rather than failing the turn
+        print(f"[ERROR] Deep dive report failed, returning the search results: {e}")
+        mark_degraded("report writer unavailable; showing the search results")
+        return fallback_source_list(universities, context_results)
+    return clean_response_text(text)
 
 
-def handle_comparison(universities: List[str], aspects: List[str], store: InMemoryProfileStore, session_id: str) -> str:
+def handle_comparison(
+    universities: List[str],
+    aspects: List[str],
+    store: InMemoryProfileStore,
+    session_id: str,
+    user_question: str = "",
+) -> str:
     """
     Compare multiple universities on specific aspects.
+
+    Like deep dives, the base comparison is cached across sessions and then
+    personalized.
     """
     # Get student profile to include field of study
     profile = store.get_profile(session_id)
     field = profile.field_of_study or "graduate programs"
     degree = profile.degree_level or "MS"
-    
-    # Create search queries for comparison with field context
-    search_queries = []
-    for uni in universities[:3]:  # Limit to 3 universities
-        search_queries.append(f'"{uni}" {field} {degree} program funding requirements')
-        if aspects:
-            for aspect in aspects[:2]:
-                search_queries.append(f'"{uni}" {field} {aspect}')
-    
-    # Execute searches
-    all_results = []
-    for query in search_queries[:6]:  # Limit total searches
-        try:
-            print(f"[DEBUG] Comparison search: {query}")
-            res = serper_program_search(query, num_results=5)
-            all_results.extend(extract_program_candidates(res))
-        except Exception as e:
-            print(f"[WARN] Search error: {e}")
-    
+    universities = universities[:3]  # Limit to 3 universities
+
+    cache_key = make_report_key("compare", universities, field, degree, aspects)
+    base_report = report_cache.get(cache_key)
+    if base_report is None:
+        degraded_before = degraded_step_count()
+        base_report = generate_comparison_report(universities, aspects, field, degree)
+        if degraded_step_count() == degraded_before:
+            report_cache.put(cache_key, base_report)
+    else:
+        report_progress("report_cache_hit", universities=universities)
+
+    report_progress("personalizing")
+
+    question = user_question or f"Compare {', '.join(universities)}"
+    return personalize_report(base_report, question, store.as_dict(session_id))
+
+
+def interleave_buckets(buckets: List[List[Dict[str, Any]]], budget: int) -> List[Dict[str, Any]]:
+    """
+    Allocate up to `budget` result slots round-robin across buckets.
+
+    Each bucket contributes its next unseen result in turn, so no bucket can
+    crowd out another; a bucket that runs dry simply gives its turn away.
+    """
+    selected: List[Dict[str, Any]] = []
+    seen_urls = set()
+    positions = [0] * len(buckets)
+
+    while len(selected) < budget:
+        progressed = False
+        for i, bucket in enumerate(buckets):
+            while positions[i] < len(bucket):
+                result = bucket[positions[i]]
+                positions[i] += 1
+                url = result.get("url")
+                if url and url in seen_urls:
+                    continue
+                seen_urls.add(url)
+                selected.append(result)
+                progressed = True
+                break
+            if len(selected) >= budget:
+                break
+        if not progressed:
+            break
+
+    return selected
+
+
+def build_comparison_queries(university: str, aspects: List[str], field: str, degree: str, limit: int) -> List[str]:
+    """
+    Search queries for one university in a comparison.
+    """
+    queries = [f'"{university}" {field} {degree} program funding requirements']
+    for aspect in aspects[:2]:
+        queries.append(f'"{university}" {field} {aspect}')
+    return queries[:max(1, limit)]
+
+
+def generate_comparison_report(universities: List[str], aspects: List[str], field: str, degree: str) -> str:
+    """
+    Search and write the profile-independent comparison report.
+
+    Retrieval fans out per university in parallel, with the query budget
+    split evenly and each university's results kept in its own bucket.
+    Result slots are then handed out round-robin so every university gets
+    the same amount of evidence.
+    """
+    per_uni_queries = COMPARISON_MAX_QUERIES // max(1, len(universities))
+    query_groups = [
+        build_comparison_queries(uni, aspects or [], field, degree, per_uni_queries)
+        for uni in universities
+    ]
+    print(f"[DEBUG] Comparison searches: {query_groups}")
+    keep_terms = [*universities, field, degree]
+
+    def search_university(queries: List[str]) -> List[Dict[str, Any]]:
+        bucket: List[Dict[str, Any]] = []
+        for extracted in search_many(queries, num_results=COMPARISON_RESULTS_PER_QUERY, keep_terms=keep_terms):
+            bucket.extend(extracted)
+        return bucket
+
+    with ThreadPoolExecutor(max_workers=max(1, len(query_groups))) as pool:
+        futures = [submit_in_context(pool, search_university, queries) for queries in query_groups]
+        buckets = [f.result() for f in futures]
+
+    for uni, bucket in zip(universities, buckets):
+        print(f"[DEBUG] Comparison bucket for {uni}: {len(bucket)} results")
+
+    # Tag results with their university so the writer can attribute them
+    for uni, bucket in zip(universities, buckets):
+        for r in bucket:
+            r.setdefault("university", uni)
+    selected = interleave_buckets(buckets, COMPARISON_RESULT_BUDGET)
+
     # Format search results
     search_results_text = "\n\n".join([
-        f"Title: {r['title']}\nURL: {r['url']}\nSnippet: {r['snippet']}"
-        for r in all_results[:15]
+        f"University: {r['university']}\nTitle: {r['title']}\nURL: {r['url']}\nSnippet: {r['snippet']}"
+        for r in selected
     ])
-    
+
     # Generate response
+    report_progress("writing", results=len(selected))
     prompt = COMPARISON_PROMPT.format(
         universities=", ".join(universities),
         aspects=", ".join(aspects) if aspects else "all aspects",
         search_results=search_results_text or "No specific results found. Provide general comparison."
     )
-    
-    model = genai.GenerativeModel(GEMINI_MODEL_NAME)
-    response = model.generate_content(prompt)
-    
-    # Clean up Unicode escape sequences
-    result = response.text
-    result = result.replace(r'\u201c', '"')  # Left double quotation mark
-    result = result.replace(r'\u201d', '"')  # Right double quotation mark
-    result = result.replace(r'\u2018', "'")  # Left single quotation mark
-    result = result.replace(r'\u2019', "'")  # Right single quotation mark
-    result = result.replace(r'\u2013', '–')  # En dash
-    result = result.replace(r'\u2014', '—')  # Em dash
-    result = result.replace(r'\u2026', '...')  # Ellipsis
-    
-    return result
+
+    try:
+        text = generate_text(prompt, stage="comparison", generation_config=budget_generation_config("comparison"))
+    except Exception as e:
+        print(f"[ERROR] Comparison report failed, returning the search results: {e}")
+        mark_degraded("report writer unavailable; showing the search results")
+        return fallback_source_list(universities, selected)
+    return clean_response_text(text)
+
+
+def fallback_program_list(candidates: List[Dict[str, Any]]) -> str:
+    """Plain Markdown list of the ranked candidates, used when the writer fails."""
+    if not candidates:
+        return (
+            "I couldn't finish searching for programs in time. "
+            "Please try again, or narrow the request (field, country, degree)."
+        )
+    lines = ["Here are the most relevant programs I found (a full write-up was not possible this time):", ""]
+    for i, c in enumerate(candidates[:MAX_PROGRAM_RESULTS], 1):
+        snippet = (c.get("snippet") or "").strip()
+        lines.append(f"{i}. **[{c.get('title') or c.get('url')}]({c.get('url')})**" + (f" - {snippet}" if snippet else ""))
+    return "\n".join(lines)
+
+
+def fallback_source_list(universities: List[str], results: List[Dict[str, Any]]) -> str:
+    """Plain Markdown list of a report's search results, used when the report writer fails."""
+    names = " and ".join(universities) or "these universities"
+    if not results:
+        return f"I couldn't finish the report on {names} in time. Please try again in a moment."
+    lines = [f"Here is what I found on {names} (a full report was not possible this time):", ""]
+    for i, r in enumerate(results, 1):
+        snippet = (r.get("snippet") or "").strip()
+        university = f"{r['university']}: " if r.get("university") else ""
+        lines.append(
+            f"{i}. {university}**[{r.get('title') or r.get('url')}]({r.get('url')})**"
+            + (f" - {snippet}" if snippet else "")
+        )
+    return "\n".join(lines)
 
 
 def build_writer_prompt(
@@ -606,13 +1111,142 @@ STUDENT PROFILE (JSON):
 SEARCH PLAN (JSON):
 {json.dumps(plan, indent=2)}
 
-RAW PROGRAM CANDIDATES (JSON):
-{json.dumps(candidates[:30], indent=2)}
+RAW PROGRAM CANDIDATES (JSON, most relevant first):
+{json.dumps(candidates[:WRITER_CANDIDATE_LIMIT], indent=2)}
 
 Now produce the Markdown output described above.
 """
 
 
+def extract_university_names(candidates: List[Dict[str, Any]], limit: int = 5) -> List[str]:
+    """
+    Best-effort university names from candidate titles or domains.
+
+    Looks at the first 10 candidates and returns unique names in the order
+    they appear, so ranked candidates give the strongest matches first.
+    """
+    universities = []
+    for c in candidates[:10]:
+        # Try to extract university from title (e.g., "Program Name - Stanford University")
+        title = c.get('title', '')
+        # Common patterns: "University of X", "X University", "X Institute"
+        if 'University' in title or 'Institute' in title or 'College' in title:
+            # Extract the university name from title
+            parts = title.split('-')
+            if len(parts) > 1:
+                univ = parts[-1].strip()
+            else:
+                univ = title
+            universities.append(univ)
+        elif c.get('source'):
+            # Fall back to domain name (e.g., stanford.edu -> Stanford)
+            domain = c.get('source', '')
+            if domain:
+                # Extract main part of domain (e.g., stanford from stanford.edu)
+                domain_parts = domain.split('.')
+                if len(domain_parts) >= 2:
+                    universities.append(domain_parts[-2].title())
+
+    # Get unique universities, keeping order
+    unique_universities = list(dict.fromkeys(u for u in universities if u))
+    return unique_universities[:limit]
+
+
+def schedule_prefetch(session_id: str, candidates: List[Dict[str, Any]], store: InMemoryProfileStore) -> None:
+    """
+    Warm caches for the follow-ups a new_search answer usually leads to.
+
+    For the top universities in the ranked candidates this queues the
+    deep-dive searches (and, with PREFETCH_REPORTS, the base deep-dive
+    report) plus the comparison searches for the top two.
+    """
+    if not PREFETCH_ENABLED:
+        return
+
+    universities = extract_university_names(candidates, limit=PREFETCH_TOP_UNIVERSITIES)
+    if not universities:
+        return
+
+    profile = store.get_profile(session_id)
+    field = profile.field_of_study or "graduate programs"
+    degree = profile.degree_level or "MS"
+
+    def warm_deep_dive_report(uni: str) -> None:
+        key = make_report_key("deep_dive", [uni], field, degree)
+        if report_cache.get(key) is None:
+            report_cache.put(key, generate_deep_dive_report([uni], field, degree))
+
+    tasks: List[PrefetchTask] = []
+    for uni in universities:
+        # The same query set generate_deep_dive_report runs, so the cost
+        # estimate and the warmed cache entries match the real deep dive
+        queries = build_deep_dive_queries([uni], field, degree, compact=PAGE_FETCH_ENABLED)
+        if PREFETCH_REPORTS:
+            tasks.append(PrefetchTask(
+                name=f"deep_dive_report:{uni}",
+                run=lambda uni=uni: warm_deep_dive_report(uni),
+                cost=len(queries),
+            ))
+        else:
+            tasks.append(PrefetchTask(
+                name=f"deep_dive_search:{uni}",
+                run=lambda queries=queries, uni=uni: search_many(
+                    queries, num_results=DEEP_DIVE_RESULTS_PER_QUERY, keep_terms=[uni, field, degree]
+                ),
+                cost=len(queries),
+            ))
+
+    if len(universities) >= 2:
+        pair = universities[:2]
+        per_uni_queries = COMPARISON_MAX_QUERIES // len(pair)
+        queries = [
+            q for uni in pair
+            for q in build_comparison_queries(uni, [], field, degree, per_uni_queries)
+        ]
+        tasks.append(PrefetchTask(
+            name=f"compare_search:{' vs '.join(pair)}",
+            run=lambda queries=queries: search_many(
+                queries, num_results=COMPARISON_RESULTS_PER_QUERY, keep_terms=[*pair, field, degree]
+            ),
+            cost=len(queries),
+        ))
+
+    prefetcher.submit(session_id, tasks)
+
+
+def template_followup_questions(
+    profile_dict: Dict[str, Any],
+    candidates: List[Dict[str, Any]],
+) -> List[str]:
+    """
+    Deterministic follow-up questions built from the profile and candidates.
+
+    Used when the LLM follow-ups fail or are not ready by the time the
+    writer has finished.
+    """
+    universities = extract_university_names(candidates, limit=2)
+    questions: List[str] = []
+
+    if universities:
+        questions.append(f"Would you like me to dive deeper into the program at {universities[0]}?")
+    else:
+        questions.append("Would you like me to dive deeper into any specific program?")
+
+    if len(universities) >= 2:
+        questions.append(f"Should I compare {universities[0]} and {universities[1]} side by side?")
+    else:
+        questions.append("Are you interested in comparing specific universities?")
+
+    if not profile_dict.get("funding_needs"):
+        questions.append("Should I focus on programs that offer full funding (RA/TA or fellowships)?")
+    elif not profile_dict.get("gre"):
+        questions.append("Would you like to see only programs that don't require the GRE?")
+    else:
+        questions.append("Should I search for programs with different requirements or locations?")
+
+    return questions
+
+
 def generate_followup_questions(
     profile_dict: Dict[str, Any],
     query_type: str,
@@ -636,32 +1270,8 @@ def generate_followup_questions(
         results_info = "No programs found"
     else:
         program_count = len(candidates)
-        # Extract university names from titles or domains
-        universities = []
-        for c in candidates[:10]:
-            # Try to extract university from title (e.g., "Program Name - Stanford University")
-            title = c.get('title', '')
-            # Common patterns: "University of X", "X University", "X Institute"
-            if 'University' in title or 'Institute' in title or 'College' in title:
-                # Extract the university name from title
-                parts = title.split('-')
-                if len(parts) > 1:
-                    univ = parts[-1].strip()
-                else:
-                    univ = title
-                universities.append(univ)
-            elif c.get('source'):
-                # Fall back to domain name (e.g., stanford.edu -> Stanford)
-                domain = c.get('source', '')
-                if domain:
-                    # Extract main part of domain (e.g., stanford from stanford.edu)
-                    domain_parts = domain.split('.')
-                    if len(domain_parts) >= 2:
-                        universities.append(domain_parts[-2].title())
-        
-        # Get unique universities, limit to 5
-        unique_universities = list(set([u for u in universities if u]))[:5]
-        
+        unique_universities = extract_university_names(candidates, limit=5)
+
         if unique_universities:
             results_info = f"Found {program_count} programs at universities including: {', '.join(unique_universities)}"
         else:
@@ -673,40 +1283,29 @@ def generate_followup_questions(
         results_summary=results_info
     )
     
-    model = genai.GenerativeModel(GEMINI_MODEL_NAME)
-    
     try:
-        response = model.generate_content(prompt)
-        text = response.text.strip() if response.text else ""
-        
-        # Clean up markdown code blocks
-        if text.startswith("```"):
-            lines = text.split("\n")
-            if len(lines) > 2:
-                text = "\n".join(lines[1:-1])
-            if text.startswith("json"):
-                text = text[4:].strip()
-        
-        result = json.loads(text)
-        questions = result.get("follow_up_questions", [])
+        questions = generate_json(prompt, FollowUpQuestions, stage="followups").follow_up_questions
         
         print(f"[DEBUG] Generated follow-up questions: {questions}")
         return questions[:3]  # Return max 3 questions
         
     except Exception as e:
         print(f"[WARN] Failed to generate follow-up questions: {e}")
-        # Return generic but helpful fallback questions
-        return [
-            "Would you like me to dive deeper into any specific program?",
-            "Should I search for programs with different requirements?",
-            "Are you interested in comparing specific universities?"
-        ]
+        return template_followup_questions(profile_dict, candidates)
+
+
+def budget_generation_config(stage: str) -> Optional[Dict[str, Any]]:
+    """Generation config whose max_output_tokens respects the usage budget."""
+    cap = output_token_cap(stage_max_output_tokens(stage))
+    return {"max_output_tokens": cap} if cap else None
 
 
 def execute_agentic_pipeline(
     user_input: str,
     session_id: str,
     store: InMemoryProfileStore,
+    on_progress: Optional[ProgressCallback] = None,
+    deadline_seconds: float = TURN_DEADLINE_SECONDS,
 ) -> str:
     """
     End-to-end pipeline:
@@ -716,13 +1315,71 @@ def execute_agentic_pipeline(
        - Deep dive: Get detailed info about specific university
        - Compare: Compare multiple universities
        - New search: Standard search flow
+
+    Args:
+        user_input: The user's message.
+        session_id: Session whose profile memory to use.
+        store: Profile store.
+        on_progress: Optional callback(stage, info) invoked as the turn
+            moves through its stages (classified, planned, searching,
+            writing, ...), e.g. to render progress in a UI.
+        deadline_seconds: Latency budget for the turn (0 = none). Stages
+            take their timeouts from what is left, searches stop when it
+            runs out, and the answer notes which steps were cut short.
     """
-    # 0) First, classify the query
-    classification = classify_query(user_input)
+    ctx = TurnContext(session_id=session_id, on_progress=on_progress)
+    if deadline_seconds > 0:
+        ctx.deadline = ctx.started_at + deadline_seconds
+    ctx.usage = usage_ledger.begin_turn(session_id)
+    with turn_scope(ctx), profile_turn(ctx), track_turn_memory(ctx):
+        if remaining_tokens() == 0:
+            mark_degraded("session usage budget exhausted")
+            response = BUDGET_EXHAUSTED_MESSAGE
+        else:
+            response = _run_pipeline(user_input, session_id, store)
+            if ctx.degraded:
+                print(f"[WARN] Turn finished in degraded mode: {ctx.degraded}")
+                response += degraded_note(ctx.degraded)
+            store.conversation(session_id).add_turn(
+                user_input, response, query_type=ctx.usage.query_type, universities=ctx.universities
+            )
+        ctx.usage.degraded = list(ctx.degraded)
+        ctx.report("done", degraded=list(ctx.degraded), **usage_ledger.session_totals(session_id))
+    return response
+
+
+def degraded_note(reasons: List[str]) -> str:
+    """Footer telling the student which steps were shortened this turn."""
+    return "\n\n---\n\n_⏱️ Some steps were shortened this time: " + "; ".join(reasons) + "._"
+
+
+def _run_pipeline(
+    user_input: str,
+    session_id: str,
+    store: InMemoryProfileStore,
+) -> str:
+    # A new message makes any speculative work for the previous turn moot
+    prefetcher.cancel(session_id)
+
+    # 0) First, classify the query, with the conversation so far for references
+    conversation = store.conversation(session_id)
+    classification = classify_query(user_input, conversation_section(conversation))
     query_type = classification.get("query_type", "new_search")
+
+    # "the second one" / "it" when the classifier couldn't name the universities
+    needed = {"deep_dive": 1, "compare": 2}.get(query_type, 0)
+    universities = classification.get("universities") or []
+    if len(universities) < needed:
+        resolved = [u for u in conversation.resolve_references(user_input) if u not in universities]
+        if resolved:
+            print(f"[DEBUG] Resolved references from conversation: {resolved}")
+            classification["universities"] = universities = universities + resolved
     
     print(f"[DEBUG] Query classified as: {query_type}")
     print(f"[DEBUG] Classification details: {classification}")
+    report_progress("classified", query_type=query_type)
+    current_turn().usage.query_type = query_type
+    current_turn().universities = list(universities)
     
     # Handle deep dive queries
     if query_type == "deep_dive":
@@ -750,7 +1407,7 @@ def execute_agentic_pipeline(
         universities = classification.get("universities", [])
         aspects = classification.get("comparison_aspects", [])
         if len(universities) >= 2:
-            main_response = handle_comparison(universities, aspects, store, session_id)
+            main_response = handle_comparison(universities, aspects, store, session_id, user_question=user_input)
             
             # Add follow-up questions for comparison
             profile_dict = store.as_dict(session_id)
@@ -771,9 +1428,11 @@ def execute_agentic_pipeline(
     # 1) Check if we're ready to search or need more info
     decision = check_if_ready_to_search(user_input, session_id, store)
     
+    report_progress("profile_checked", ready=bool(decision.get("ready_to_search")))
+
     if decision.get("needs_more_info") and not decision.get("ready_to_search"):
         # Return the questions to gather more information
-        return decision.get("questions_to_ask", "Could you provide more details about what you're looking for?")
+        return decision.get("questions_to_ask") or "Could you provide more details about what you're looking for?"
     
     # 2) We have enough info - proceed with search
     # Import here to avoid circular import
@@ -782,37 +1441,66 @@ def execute_agentic_pipeline(
     # Plan + update memory
     plan = plan_from_user_input(user_input, session_id, store)
     print(f"[DEBUG] Generated plan: {json.dumps(plan, indent=2)}")
+    report_progress("planned", queries=len(plan.get("search_queries", []) or []), template="query_roles" in plan)
 
     # Run web search
-    candidates = run_search_queries(plan)
+    candidates = run_search_queries(plan, store.get_profile(session_id))
     print(f"[DEBUG] Total candidates after all searches: {len(candidates)}")
 
+    # Drop programs whose parsed facts (stated GPA/test minimums, GRE policy,
+    # degree level) rule them out for this profile, before any tokens are spent
+    candidates = filter_candidates(candidates, store.get_profile(session_id), min_keep=MIN_PROGRAM_RESULTS)
+
+    # Rank against the profile so only the strongest matches reach the writer
+    candidates = rank_candidates(
+        candidates,
+        store.get_profile(session_id),
+        plan,
+        top_k=WRITER_CANDIDATE_LIMIT,
+    )
+
+    report_progress("ranked", candidates=len(candidates))
+    store.set_last_results(session_id, plan, candidates)
+
     # Build writer prompt & call Gemini to synthesize final answer
     profile_dict = store.as_dict(session_id)
     writer_prompt = build_writer_prompt(profile_dict, plan, candidates)
 
-    model = genai.GenerativeModel(GEMINI_MODEL_NAME)
-    response = model.generate_content(writer_prompt)
-    
-    main_response = response.text
-    
-    # Clean up Unicode escape sequences in the response
-    # Replace common Unicode escapes with actual characters
-    main_response = main_response.replace(r'\u201c', '"')  # Left double quotation mark
-    main_response = main_response.replace(r'\u201d', '"')  # Right double quotation mark
-    main_response = main_response.replace(r'\u2018', "'")  # Left single quotation mark
-    main_response = main_response.replace(r'\u2019', "'")  # Right single quotation mark
-    main_response = main_response.replace(r'\u2013', '–')  # En dash
-    main_response = main_response.replace(r'\u2014', '—')  # Em dash
-    main_response = main_response.replace(r'\u2026', '...')  # Ellipsis
-    
-    # Generate intelligent follow-up questions
-    followup_questions = generate_followup_questions(
-        profile_dict=profile_dict,
-        query_type=query_type,
-        results_summary=f"Found {len(candidates)} programs",
-        candidates=candidates
-    )
+    # Follow-ups only need the profile and candidates, so generate them
+    # while the writer runs instead of after it
+    followup_future = None
+    if can_afford_optional_call():
+        followup_future = submit_in_context(
+            _followup_pool,
+            generate_followup_questions,
+            profile_dict=profile_dict,
+            query_type=query_type,
+            results_summary=f"Found {len(candidates)} programs",
+            candidates=candidates,
+        )
+
+    report_progress("writing", candidates=len(candidates))
+    try:
+        main_response = clean_response_text(
+            generate_text(writer_prompt, stage="writer", generation_config=budget_generation_config("writer"))
+        )
+    except Exception as e:
+        # Still answer with the evidence we have rather than failing the turn
+        print(f"[ERROR] Writer failed, returning the ranked program list: {e}")
+        mark_degraded("writer unavailable; showing the ranked search results")
+        main_response = fallback_program_list(candidates)
+
+    try:
+        if followup_future is None:
+            raise FutureTimeoutError()
+        left = time_left()
+        grace = FOLLOWUP_GRACE_SECONDS if left is None else max(0.0, min(FOLLOWUP_GRACE_SECONDS, left))
+        followup_questions = followup_future.result(timeout=grace)
+    except FutureTimeoutError:
+        print("[DEBUG] Follow-up generation not ready, using template follow-ups")
+        if followup_future is not None:
+            followup_future.cancel()
+        followup_questions = template_followup_questions(profile_dict, candidates)
     
     # Append follow-up questions to the response
     if followup_questions:
@@ -821,5 +1509,8 @@ def execute_agentic_pipeline(
             followup_section += f"{i}. {question}\n"
         
         main_response += followup_section
-    
+
+    # Warm caches for the likely "dive deeper" / "compare" follow-ups
+    schedule_prefetch(session_id, candidates, store)
+
     return main_response
@@ -0,0 +1,112 @@
+"""
+Run the pipeline in a background worker and collect its progress.
+
+Front ends (Streamlit, the HTTP service) start a PipelineJob and poll it
+for stage events instead of blocking on execute_agentic_pipeline.
+"""
+
+import asyncio
+import queue
+from concurrent.futures import Executor, Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from .executor import execute_agentic_pipeline
+from .memory import InMemoryProfileStore
+
+ProgressEvent = Tuple[str, Dict[str, Any]]
+
+
+class PipelineJob:
+    """
+    Handle for one pipeline run on a worker pool.
+
+    Progress events are pushed from the worker thread into a queue;
+    poll_events() drains them and also keeps the full history so a UI that
+    re-renders from scratch can redraw every stage seen so far.
+    """
+
+    def __init__(self, session_id: str, user_input: str) -> None:
+        self.session_id = session_id
+        self.user_input = user_input
+        self.history: List[ProgressEvent] = []
+        self._events: "queue.Queue[ProgressEvent]" = queue.Queue()
+        self._future: Optional[Future] = None
+
+    def _on_progress(self, stage: str, info: Dict[str, Any]) -> None:
+        self._events.put((stage, info))
+
+    def poll_events(self) -> List[ProgressEvent]:
+        """Return events that arrived since the last poll."""
+        new_events: List[ProgressEvent] = []
+        while True:
+            try:
+                new_events.append(self._events.get_nowait())
+            except queue.Empty:
+                break
+        self.history.extend(new_events)
+        return new_events
+
+    def done(self) -> bool:
+        return self._future is not None and self._future.done()
+
+    def result(self, timeout: Optional[float] = None) -> str:
+        """The response text; re-raises any pipeline exception."""
+        assert self._future is not None
+        return self._future.result(timeout=timeout)
+
+    async def wait(self) -> str:
+        """Await the response from an asyncio event loop (the HTTP service)."""
+        assert self._future is not None
+        return await asyncio.wrap_future(self._future)
+
+    def add_done_callback(self, fn) -> None:
+        """Call fn(job) from the worker thread once the run finishes."""
+        assert self._future is not None
+        self._future.add_done_callback(lambda _future: fn(self))
+
+    def cancel(self) -> bool:
+        """Cancel the job if it has not started yet."""
+        return self._future is not None and self._future.cancel()
+
+
+def start_pipeline_job(
+    pool: Executor,
+    user_input: str,
+    session_id: str,
+    store: InMemoryProfileStore,
+) -> PipelineJob:
+    """Submit a pipeline run to pool and return its job handle."""
+    job = PipelineJob(session_id, user_input)
+    job._future = pool.submit(
+        execute_agentic_pipeline,
+        user_input,
+        session_id,
+        store,
+        on_progress=job._on_progress,
+    )
+    return job
+
+
+def describe_stage(stage: str, info: Dict[str, Any]) -> str:
+    """Human-readable one-liner for a progress event."""
+    if stage == "classified":
+        return f"Understood your request ({info.get('query_type', 'new_search').replace('_', ' ')})"
+    if stage == "profile_checked":
+        return "Checked your profile" if info.get("ready") else "Checking what else I need to know"
+    if stage == "planned":
+        return f"Planned {info.get('queries', 0)} searches"
+    if stage == "searching":
+        return f"{info.get('searches_done', 0)} searches done"
+    if stage == "ranked":
+        return f"Ranked {info.get('candidates', 0)} candidate programs"
+    if stage == "report_cache_hit":
+        return "Found a recent report for these universities"
+    if stage == "fetching_pages":
+        return f"Reading {info.get('pages', 0)} program pages"
+    if stage == "writing":
+        return "Writing your answer"
+    if stage == "personalizing":
+        return "Tailoring it to your profile"
+    if stage == "done":
+        return "Done"
+    return stage.replace("_", " ").capitalize()
@@ -0,0 +1,229 @@
+"""
+Gemini calls shared by all pipeline stages.
+
+generate_text runs a free-form generation; generate_json asks Gemini for JSON
+matching a pydantic model, validates the reply, and on a malformed reply
+makes exactly one targeted repair call that shows the model its own output
+and the validation error. Both record token usage under a stage name, and the
+stage also picks the model and generation settings (STAGE_SETTINGS in
+config.py) unless the caller overrides them.
+
+Calls queue for a Gemini slot in the scheduler (see scheduler.py), then run
+under a turn deadline with a request timeout from the time left.
+Report stages always run; earlier stages leave time for the report and raise
+TurnDeadlineExceeded instead of starting when too little is left, which
+their callers handle with the same fallbacks as any other failure.
+"""
+
+import json
+from typing import Any, Dict, Optional, Tuple, Type, TypeVar
+
+import google.generativeai as genai
+from pydantic import BaseModel, ValidationError
+
+from .config import (
+    DEADLINE_REPORT_RESERVE_SECONDS,
+    GEMINI_API_KEY,
+    GEMINI_MODEL_NAME,
+    LLM_TIMEOUT_SECONDS,
+    STAGE_SETTINGS,
+)
+from .scheduler import gemini_scheduler
+from .turn_context import TurnDeadlineExceeded, report_timeout, stage_timeout, time_left
+from .usage import mark_degraded, record_llm_response
+
+# Configure Gemini once
+genai.configure(api_key=GEMINI_API_KEY)
+
+T = TypeVar("T", bound=BaseModel)
+
+# The turn's answer: run even when the deadline is close or past
+REPORT_STAGES = {"writer", "deep_dive", "comparison"}
+# Run before the report, so they must leave time for it
+PRE_REPORT_STAGES = {"classifier", "coordinator", "planner"}
+
+
+REPAIR_PROMPT = """
+Your previous reply was not valid JSON for the required schema.
+
+VALIDATION ERROR:
+{error}
+
+YOUR PREVIOUS REPLY:
+{reply}
+
+REQUIRED JSON SCHEMA:
+{schema}
+
+Return ONLY the corrected JSON object. Keep every value from your previous reply that was valid.
+"""
+
+
+class StructuredOutputError(Exception):
+    """Gemini did not produce valid JSON for the schema, even after a repair attempt."""
+
+
+def _strip_code_fences(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```"):
+        lines = text.split("\n")
+        if len(lines) > 2:
+            text = "\n".join(lines[1:-1])
+        if text.startswith("json"):
+            text = text[4:]
+        text = text.strip()
+    return text
+
+
+def _response_text(response: Any) -> str:
+    try:
+        return response.text or ""
+    except ValueError:
+        # Blocked or empty candidates: .text raises instead of returning ""
+        return ""
+
+
+def stage_max_output_tokens(stage: str) -> Optional[int]:
+    """Configured max_output_tokens for a stage (None = model default)."""
+    return STAGE_SETTINGS.get(stage, {}).get("max_output_tokens")
+
+
+def resolve_stage(
+    stage: str,
+    model_name: Optional[str] = None,
+    generation_config: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Model and generation config for a call from stage.
+
+    Explicit arguments win over the stage's configured settings, key by key.
+    """
+    settings = STAGE_SETTINGS.get(stage, {})
+    config = {k: settings[k] for k in ("max_output_tokens", "temperature") if k in settings}
+    config.update(generation_config or {})
+    return model_name or settings.get("model", GEMINI_MODEL_NAME), config
+
+
+def _request_timeout(stage: str) -> float:
+    """Request timeout for a stage's call under the current turn's deadline."""
+    if stage in REPORT_STAGES:
+        return report_timeout(LLM_TIMEOUT_SECONDS)
+    reserve = DEADLINE_REPORT_RESERVE_SECONDS if stage in PRE_REPORT_STAGES else 0.0
+    return stage_timeout(LLM_TIMEOUT_SECONDS, reserve=reserve, step=stage)
+
+
+def _generate(model: Any, stage: str, prompt: str, generation_config: Optional[Dict[str, Any]]) -> Any:
+    try:
+        slot = gemini_scheduler.slot(stage, must_run=stage in REPORT_STAGES)
+        with slot:
+            kwargs: Dict[str, Any] = {"request_options": {"timeout": _request_timeout(stage)}}
+            if generation_config:
+                kwargs["generation_config"] = generation_config
+            return model.generate_content(prompt, **kwargs)
+    except TurnDeadlineExceeded:
+        mark_degraded(f"{stage} skipped to meet the turn deadline")
+        raise
+    except Exception:
+        left = time_left()
+        if left is not None and left <= 0:
+            mark_degraded(f"{stage} timed out at the turn deadline")
+        raise
+
+
+def generate_text(
+    prompt: str,
+    stage: str,
+    model_name: Optional[str] = None,
+    generation_config: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    Free-form Gemini generation (reports, writer output, ...).
+
+    Args:
+        prompt: The full prompt.
+        stage: Pipeline stage name used for usage accounting and routing.
+        model_name: Gemini model to use instead of the stage's.
+        generation_config: Generation settings (max_output_tokens, ...)
+            layered over the stage's.
+    """
+    model_name, config = resolve_stage(stage, model_name, generation_config)
+    response = _generate(genai.GenerativeModel(model_name), stage, prompt, config)
+    record_llm_response(stage, response)
+    return _response_text(response)
+
+
+def _call_json_mode(
+    model_name: str,
+    prompt: str,
+    schema: Type[BaseModel],
+    stage: str,
+    generation_config: Optional[Dict[str, Any]] = None,
+) -> str:
+    config: Dict[str, Any] = dict(generation_config or {})
+    config["response_mime_type"] = "application/json"
+
+    model = genai.GenerativeModel(model_name)
+    try:
+        response = _generate(model, stage, prompt, {**config, "response_schema": schema})
+    except (TypeError, ValueError) as e:
+        # The SDK rejects schemas it cannot translate before any request is
+        # sent; plain JSON mode plus validation still beats free-form text.
+        print(f"[WARN] response_schema rejected for {schema.__name__} ({e}); using plain JSON mode")
+        response = _generate(model, stage, prompt, config)
+
+    record_llm_response(stage, response)
+    return _response_text(response)
+
+
+def generate_json(
+    prompt: str,
+    schema: Type[T],
+    stage: str,
+    model_name: Optional[str] = None,
+    generation_config: Optional[Dict[str, Any]] = None,
+) -> T:
+    """
+    Call Gemini in JSON mode and validate the reply against schema.
+
+    Args:
+        prompt: The full prompt.
+        schema: Pydantic model describing the expected JSON object.
+        stage: Pipeline stage name used for usage accounting and routing.
+        model_name: Gemini model to use instead of the stage's.
+        generation_config: Generation settings (temperature, ...) layered
+            over the stage's.
+
+    Returns:
+        The validated model instance.
+
+    Raises:
+        StructuredOutputError: if the reply is still invalid after one repair.
+        TurnDeadlineExceeded: if the turn's deadline leaves no time for a call.
+    """
+    model_name, generation_config = resolve_stage(stage, model_name, generation_config)
+    text = _call_json_mode(model_name, prompt, schema, stage, generation_config)
+    if not text.strip():
+        raise StructuredOutputError(
+            f"Gemini returned an empty response for {schema.__name__}. "
+            "This may be due to content filtering, rate limits, or quota issues."
+        )
+
+    try:
+        return schema.model_validate_json(_strip_code_fences(text))
+    except ValidationError as e:
+        error = e
+
+    print(f"[WARN] Invalid {schema.__name__} JSON from Gemini, attempting one repair: {error}")
+    repair_prompt = REPAIR_PROMPT.format(
+        error=str(error)[:1500],
+        reply=text[:4000],
+        schema=json.dumps(schema.model_json_schema(), indent=2),
+    )
+    repaired = _call_json_mode(model_name, repair_prompt, schema, stage, generation_config)
+
+    try:
+        result = schema.model_validate_json(_strip_code_fences(repaired))
+        print(f"[INFO] Repaired {schema.__name__} JSON on retry")
+        return result
+    except ValidationError as e:
+        raise StructuredOutputError(f"Invalid {schema.__name__} JSON after repair: {e}") from e
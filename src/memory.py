@@ -1,5 +1,7 @@
 from dataclasses import dataclass, asdict
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+
+from .conversation import ConversationContext
 
 
 @dataclass
@@ -19,6 +21,19 @@ class StudentProfile:
     extra_notes: Optional[str] = None
 
 
+# Profile fields the coordinator needs before searching, with how to ask for them
+REQUIRED_PROFILE_FIELDS = [
+    ("field_of_study", "field of study"),
+    ("degree_level", "degree level (e.g. MS or PhD)"),
+    ("preferred_countries", "preferred countries or regions"),
+]
+
+
+def missing_required_fields(profile: StudentProfile) -> List[str]:
+    """Labels of the required fields the profile doesn't have yet."""
+    return [label for attr, label in REQUIRED_PROFILE_FIELDS if not getattr(profile, attr)]
+
+
 class InMemoryProfileStore:
     """
     Very simple memory store for student profiles
@@ -26,6 +41,10 @@ class InMemoryProfileStore:
 
     def __init__(self) -> None:
         self._profiles: Dict[str, StudentProfile] = {}
+        # Plan and ranked candidates of each session's latest search
+        self._last_results: Dict[str, Dict[str, Any]] = {}
+        # Rolling summary, recent turns and mentioned universities per session
+        self._conversations: Dict[str, ConversationContext] = {}
 
     def get_profile(self, session_id: str) -> StudentProfile:
         if session_id not in self._profiles:
@@ -42,6 +61,36 @@ class InMemoryProfileStore:
     def as_dict(self, session_id: str) -> Dict[str, Any]:
         return asdict(self.get_profile(session_id))
 
+    def set_last_results(self, session_id: str, plan: Dict[str, Any], candidates: List[Dict[str, Any]]) -> None:
+        self._last_results[session_id] = {"plan": plan, "candidates": candidates}
+
+    def last_results(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self._last_results.get(session_id)
+
+    def conversation(self, session_id: str) -> ConversationContext:
+        if session_id not in self._conversations:
+            self._conversations[session_id] = ConversationContext()
+        return self._conversations[session_id]
+
+    def set_conversation(self, session_id: str, context: ConversationContext) -> None:
+        self._conversations[session_id] = context
+
+    def session_ids(self) -> List[str]:
+        return list(self._profiles.keys() | self._last_results.keys() | self._conversations.keys())
+
+    def session_state(self, session_id: str) -> Dict[str, Any]:
+        """What the store holds for a session, without creating a profile."""
+        return {
+            "profile": self._profiles.get(session_id),
+            "last_results": self._last_results.get(session_id),
+            "conversation": self._conversations.get(session_id),
+        }
+
+    def forget(self, session_id: str) -> None:
+        self._profiles.pop(session_id, None)
+        self._last_results.pop(session_id, None)
+        self._conversations.pop(session_id, None)
+
 
 # Global store for simplicity (one process)
 profile_store = InMemoryProfileStore()
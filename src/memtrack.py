@@ -0,0 +1,283 @@
+"""
+Memory accounting for turns, stages and sessions.
+
+Two views, both served by the HTTP service (GET /metrics/memory,
+GET /sessions/{id}/memory):
+
+    Stage peaks   With MEMTRACK_MODE=stages or snapshots, tracemalloc traces
+                  every allocation. Each turn records, per progress event
+                  (classified, planned, searching, ranked, writing, done),
+                  how far traced memory rose above where it stood at the
+                  previous event (peak_bytes) and how much of that was still
+                  held at the event (retained_bytes). Turn breakdowns go into
+                  the turn's usage record; per-stage aggregates are kept in
+                  memory_ledger. In snapshots mode each turn also keeps the
+                  MEMTRACK_TOP_N allocation sites (file:line) that grew most
+                  over the turn.
+    Resident      session_memory estimates what a session keeps alive between
+                  turns (profile, last plan and candidates, conversation
+                  context, usage records) by walking the objects with
+                  sys.getsizeof, and memory_report adds the process-wide
+                  caches. This needs no tracing and works in every mode.
+
+tracemalloc is process-wide: with several turns in flight, a stage's numbers
+include whatever the other turns allocated meanwhile, so stage peaks are
+exact for one turn at a time and an upper bound otherwise. Tracing costs
+roughly 2x allocation time and memory, so keep it off outside load tests and
+leak hunts.
+"""
+
+import os
+import sys
+import threading
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from types import FunctionType, ModuleType
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set
+
+try:
+    import resource  # not available on Windows
+except ImportError:
+    resource = None
+
+from .config import MEMTRACK_FRAMES, MEMTRACK_MODE, MEMTRACK_TOP_N
+from .memory import InMemoryProfileStore, profile_store
+from .report_cache import report_cache
+from .tools.search import search_cache, zero_result_cache
+from .turn_context import TurnContext
+from .usage import usage_ledger
+
+MEMTRACK_MODES = {"off", "stages", "snapshots"}
+# Per-turn summaries kept for /metrics/memory
+RECENT_TURNS_KEPT = 20
+_ATOMIC_TYPES = (str, bytes, bytearray, int, float, complex, bool, type(None))
+_OPAQUE_TYPES = (type, ModuleType, FunctionType)
+
+if MEMTRACK_MODE not in MEMTRACK_MODES:
+    print(f"[WARN] Unknown MEMTRACK_MODE '{MEMTRACK_MODE}', memory tracing disabled")
+elif MEMTRACK_MODE != "off" and not tracemalloc.is_tracing():
+    tracemalloc.start(MEMTRACK_FRAMES)
+    print(f"[INFO] Memory tracing on (MEMTRACK_MODE={MEMTRACK_MODE}, {MEMTRACK_FRAMES} frame(s))")
+
+# Reading and resetting the traced peak must not interleave across threads
+_trace_lock = threading.Lock()
+
+
+def tracing_enabled() -> bool:
+    return MEMTRACK_MODE in {"stages", "snapshots"} and tracemalloc.is_tracing()
+
+
+def deep_sizeof(obj: Any) -> int:
+    """
+    Approximate bytes held by obj and everything it references (containers,
+    dataclasses and other objects with a __dict__ or __slots__). Objects
+    reachable twice are counted once; classes, modules and functions are not
+    followed.
+    """
+    seen: Set[int] = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, _OPAQUE_TYPES):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, _ATOMIC_TYPES):
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            stack.extend(item)
+        else:
+            if hasattr(item, "__dict__"):
+                stack.append(vars(item))
+            for slot in getattr(type(item), "__slots__", ()):
+                if hasattr(item, slot):
+                    stack.append(getattr(item, slot))
+    return total
+
+
+class TurnMemoryTracker:
+    """Traced-memory peaks and growth between one turn's progress events."""
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, Dict[str, int]] = {}
+        with _trace_lock:
+            self._baseline, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        self._turn_start = self._baseline
+        self._turn_peak = 0
+
+    def mark(self, stage: str) -> None:
+        """Close the interval that ends with this progress event."""
+        with _trace_lock:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            entry = self.stages.setdefault(stage, {"events": 0, "peak_bytes": 0, "retained_bytes": 0})
+            entry["events"] += 1
+            entry["peak_bytes"] = max(entry["peak_bytes"], peak - self._baseline)
+            entry["retained_bytes"] += current - self._baseline
+            self._turn_peak = max(self._turn_peak, peak - self._turn_start)
+            self._baseline = current
+
+    def summary(self) -> Dict[str, Any]:
+        with _trace_lock:
+            current, peak = tracemalloc.get_traced_memory()
+            return {
+                "peak_bytes": max(self._turn_peak, peak - self._turn_start),
+                "retained_bytes": current - self._turn_start,
+                "stages": {stage: dict(entry) for stage, entry in self.stages.items()},
+            }
+
+
+def _top_growth(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, limit: int) -> List[Dict[str, Any]]:
+    ignore = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen *>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    )
+    diffs = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+    top = []
+    for diff in diffs:
+        if diff.size_diff <= 0 or len(top) >= limit:
+            continue
+        frame = diff.traceback[0]
+        top.append({
+            "where": f"{os.path.relpath(frame.filename)}:{frame.lineno}",
+            "size_diff_bytes": diff.size_diff,
+            "count_diff": diff.count_diff,
+        })
+    return top
+
+
+class MemoryLedger:
+    """Per-stage aggregates and recent per-turn summaries of traced memory."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, int]] = {}
+        self._turns = 0
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=RECENT_TURNS_KEPT)
+
+    def record_turn(self, session_id: str, turn_id: int, summary: Dict[str, Any]) -> None:
+        with self._lock:
+            self._turns += 1
+            for stage, entry in summary["stages"].items():
+                totals = self._stages.setdefault(
+                    stage, {"turns": 0, "max_peak_bytes": 0, "total_peak_bytes": 0, "total_retained_bytes": 0}
+                )
+                totals["turns"] += 1
+                totals["max_peak_bytes"] = max(totals["max_peak_bytes"], entry["peak_bytes"])
+                totals["total_peak_bytes"] += entry["peak_bytes"]
+                totals["total_retained_bytes"] += entry["retained_bytes"]
+            self._recent.append({"session_id": session_id, "turn_id": turn_id, **summary})
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "turns": self._turns,
+                "stages": {
+                    stage: {
+                        "turns": t["turns"],
+                        "max_peak_bytes": t["max_peak_bytes"],
+                        "avg_peak_bytes": t["total_peak_bytes"] // t["turns"],
+                        "avg_retained_bytes": t["total_retained_bytes"] // t["turns"],
+                    }
+                    for stage, t in self._stages.items()
+                },
+                "recent_turns": list(self._recent),
+            }
+
+
+# Global ledger (one process)
+memory_ledger = MemoryLedger()
+
+
+@contextmanager
+def track_turn_memory(ctx: TurnContext) -> Iterator[None]:
+    """Record the enclosed turn's traced memory per stage, if tracing is on."""
+    if not tracing_enabled():
+        yield
+        return
+
+    before = tracemalloc.take_snapshot() if MEMTRACK_MODE == "snapshots" else None
+    tracker = TurnMemoryTracker()
+    ctx.memory = tracker
+    try:
+        yield
+    finally:
+        ctx.memory = None
+        summary = tracker.summary()
+        if before is not None:
+            summary["top_growth"] = _top_growth(before, tracemalloc.take_snapshot(), MEMTRACK_TOP_N)
+        if ctx.usage is not None:
+            ctx.usage.memory = summary
+            memory_ledger.record_turn(ctx.session_id, ctx.usage.turn_id, summary)
+        print(
+            f"[DEBUG] Turn memory: peak {summary['peak_bytes'] / 1024:.0f} KiB, "
+            f"retained {summary['retained_bytes'] / 1024:.0f} KiB"
+        )
+
+
+def session_memory(session_id: str, store: InMemoryProfileStore = profile_store) -> Dict[str, Any]:
+    """Estimated bytes a session keeps resident between turns, by structure."""
+    state = store.session_state(session_id)
+    last = state["last_results"] or {}
+    parts = {
+        "profile_bytes": deep_sizeof(state["profile"]) if state["profile"] is not None else 0,
+        "conversation_bytes": deep_sizeof(state["conversation"]) if state["conversation"] is not None else 0,
+        "plan_bytes": deep_sizeof(last["plan"]) if last else 0,
+        "candidates_bytes": deep_sizeof(last["candidates"]) if last else 0,
+        "usage_bytes": deep_sizeof(usage_ledger.turns(session_id)),
+    }
+    return {
+        "session_id": session_id,
+        "candidates": len(last["candidates"]) if last else 0,
+        **parts,
+        "total_bytes": sum(parts.values()),
+    }
+
+
+def process_memory() -> Dict[str, Optional[int]]:
+    """Current and peak resident set size of this process, where the OS reports them."""
+    info: Dict[str, Optional[int]] = {"rss_bytes": None, "max_rss_bytes": None}
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as f:
+            info["rss_bytes"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is not None:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        info["max_rss_bytes"] = max_rss if sys.platform == "darwin" else max_rss * 1024  # Linux reports KiB
+    return info
+
+
+def memory_report(store: InMemoryProfileStore = profile_store, top_sessions: int = 10) -> Dict[str, Any]:
+    """
+    Process-wide memory picture: RSS, traced memory and stage aggregates
+    (when tracing), shared cache sizes, and the largest sessions.
+    """
+    sessions = [session_memory(sid, store) for sid in store.session_ids()]
+    sessions.sort(key=lambda s: s["total_bytes"], reverse=True)
+    report: Dict[str, Any] = {
+        "mode": MEMTRACK_MODE,
+        "process": process_memory(),
+        "shared": {
+            "search_cache_bytes": deep_sizeof(search_cache.items()),
+            "zero_result_cache_bytes": deep_sizeof(zero_result_cache.items()),
+            "report_cache_bytes": deep_sizeof(report_cache.items()),
+        },
+        "sessions": {
+            "count": len(sessions),
+            "total_bytes": sum(s["total_bytes"] for s in sessions),
+            "largest": sessions[:top_sessions],
+        },
+    }
+    if tracing_enabled():
+        current, _ = tracemalloc.get_traced_memory()
+        report["traced_bytes"] = current
+        report.update(memory_ledger.stats())
+    return report
@@ -1,13 +1,15 @@
 import json
-from typing import Dict, Any
+import re
+from typing import Dict, Any, List, Optional, Set
 
-import google.generativeai as genai
-
-from .config import GEMINI_API_KEY, GEMINI_MODEL_NAME
-from .memory import StudentProfile, InMemoryProfileStore
-
-# Configure Gemini once
-genai.configure(api_key=GEMINI_API_KEY)
+from .config import PLANNER_MAX_QUERIES, PLANNER_MIN_QUERIES, TEMPLATE_PLAN_MAX_COUNTRIES, TEMPLATE_PLANNER_ENABLED
+from .conversation import conversation_section
+from .llm import StructuredOutputError, generate_json
+from .memory import StudentProfile, InMemoryProfileStore, missing_required_fields
+from .report_cache import normalize_degree
+from .schemas import MinimumRequirements, PlanFilters, SearchPlan
+from .tools.search import LOW_INFORMATION_TERMS
+from .turn_context import TurnDeadlineExceeded
 
 
 PLANNER_SYSTEM_PROMPT = """
@@ -15,7 +17,8 @@ You are the GradPath Planner.
 
 Your job:
 1. Read the student's natural-language request.
-2. Combine it with any existing profile data (GPA, tests, countries, funding, etc.).
+2. Combine it with any existing profile data (GPA, tests, countries, funding, etc.)
+   and the conversation so far, when given (e.g. "like the second school, but in Canada").
 3. Update the profile if new details are provided.
 4. Produce a JSON "search plan" for finding grad programs.
 
@@ -66,7 +69,7 @@ IMPORTANT SEARCH QUERY RULES:
 - Use 1-2 quoted phrases MAX per query (e.g., "Data Science" OR "MS program")
 - Avoid site: operators unless specifically needed
 - Use natural language: "MS Data Science funding USA" NOT site:.edu "MS" "Data Science" "funding"
-- Generate 5-7 different queries with different keyword combinations
+- Generate {query_range} different queries with different keyword combinations
 - Focus on findable terms: program names, degree types, countries, funding types
 - Each query should be distinct and target different aspects:
   * Query 1-2: General program pages (e.g., "PhD Machine Learning USA")
@@ -86,85 +89,262 @@ Examples of BAD queries (too restrictive):
 """
 
 
-def build_planner_prompt(user_input: str, profile: StudentProfile) -> str:
+def build_planner_prompt(user_input: str, profile: StudentProfile, context: str = "") -> str:
+    query_range = f"{min(PLANNER_MIN_QUERIES, PLANNER_MAX_QUERIES)}-{PLANNER_MAX_QUERIES}"
+    system_prompt = PLANNER_SYSTEM_PROMPT.replace("{query_range}", query_range)
     return f"""
 SYSTEM:
-{PLANNER_SYSTEM_PROMPT}
+{system_prompt}
 
 CURRENT PROFILE (JSON):
 {json.dumps(profile.__dict__, indent=2)}
-
+{context}
 USER REQUEST:
 {user_input}
 """
 
 
+# Words that make up requests ("can you find me funded programs") without
+# constraining them. Words like "more", "other" or "cheaper" are left out on
+# purpose: they ask for something the profile doesn't describe.
+REQUEST_FILLER_TERMS = LOW_INFORMATION_TERMS | {
+    "i", "im", "i'm", "me", "my", "we", "you", "your", "is", "am", "are", "be",
+    "can", "could", "would", "will", "please", "want", "wanna", "like", "need",
+    "looking", "look", "find", "search", "show", "give", "get", "list", "suggest",
+    "recommend", "help", "interested", "some", "any", "good", "great", "options",
+    "schools", "study", "studying", "apply", "applying", "admission", "admissions",
+    "hi", "hello", "thanks", "thank", "ok", "okay", "yes", "so",
+    "now", "what", "which", "there", "that", "this", "it", "do", "does", "start", "starting",
+}
+
+# Abbreviations and spellings expanded before comparing a message to the profile
+_TERM_ALIASES = {
+    "cs": "computer science",
+    "ml": "machine learning",
+    "ai": "artificial intelligence",
+    "ds": "data science",
+    "ee": "electrical engineering",
+    "us": "united states",
+    "usa": "united states",
+    "america": "united states",
+    "uk": "united kingdom",
+    "britain": "united kingdom",
+    "funded": "funding",
+    "fund": "funding",
+    "fully": "full",
+}
+_TERM_RE = re.compile(r"[a-z0-9']+")
+_LIST_SPLIT_RE = re.compile(r"\s*(?:,|/|;|&|\band\b|\bor\b)\s*", re.IGNORECASE)
+
+# Which query of a template plan looks for what, in the order the planner
+# prompt asks for them
+QUERY_ROLES = ("programs", "funding", "requirements", "specialty")
+
+
+def _terms(text: Optional[str]) -> Set[str]:
+    terms: Set[str] = set()
+    for token in _TERM_RE.findall((text or "").lower()):
+        token = token.strip("'")
+        expanded = _TERM_ALIASES.get(token, normalize_degree(token) or token)
+        terms.update(expanded.split())
+    return terms
+
+
+def _split_list(value: Optional[str]) -> List[str]:
+    return [part.strip() for part in _LIST_SPLIT_RE.split(value or "") if part.strip()]
+
+
+def message_adds_constraints(user_input: str, profile: StudentProfile) -> bool:
+    """
+    True if the message says anything the stored profile doesn't: a term
+    that is neither request filler nor part of a profile value (after
+    expanding common abbreviations like "CS" or "USA").
+
+    Test names count as covered only when the profile has a score for them,
+    so "my TOEFL is 104" still goes to the planner model, which records it.
+    """
+    covered: Set[str] = set()
+    for attr, value in profile.__dict__.items():
+        if value:
+            covered |= _terms(value)
+            if attr in ("gpa", "gre", "ielts", "toefl"):
+                covered.add(attr)
+
+    new_terms = sorted(t for t in _terms(user_input) - covered if t not in REQUEST_FILLER_TERMS and len(t) > 1)
+    if new_terms:
+        print(f"[DEBUG] Message adds terms not in the profile: {new_terms}")
+    return bool(new_terms)
+
+
+def _funding_terms(funding_needs: Optional[str]) -> List[str]:
+    """Search phrases and filter tags for a free-text funding preference."""
+    text = (funding_needs or "").lower()
+    phrases: List[str] = []
+    if re.search(r"\bfull(y)?\b", text):
+        phrases.append("fully funded")
+    if re.search(r"\bra\b|research assistant", text):
+        phrases.append("research assistantship")
+    if re.search(r"\bta\b|teaching assistant", text):
+        phrases.append("teaching assistantship")
+    if "fellowship" in text:
+        phrases.append("fellowships")
+    if "scholarship" in text:
+        phrases.append("scholarships")
+    return phrases or ["funding scholarships"]
+
+
+def template_plan(profile: StudentProfile) -> Dict[str, Any]:
+    """
+    Build a search plan from a complete profile without calling the model.
+
+    Produces the same structure as the planner (validated through
+    SearchPlan) with up to PLANNER_MAX_QUERIES queries following the planner
+    prompt's rules, plus query_roles mapping each query to one of QUERY_ROLES.
+
+    Raises:
+        ValueError: if the profile is missing a required field.
+    """
+    missing = missing_required_fields(profile)
+    if missing:
+        raise ValueError(f"Template plan needs a complete profile; missing {', '.join(missing)}")
+
+    field = profile.field_of_study.strip()
+    degrees = _split_list(profile.degree_level) or [profile.degree_level.strip()]
+    countries = _split_list(profile.preferred_countries)[:max(1, TEMPLATE_PLAN_MAX_COUNTRIES)]
+    cities = _split_list(profile.preferred_cities)
+    funding = _funding_terms(profile.funding_needs)
+    degree, country = degrees[0], countries[0] if countries else ""
+    last_country = countries[-1] if countries else ""
+
+    roles: Dict[str, str] = {}
+
+    def add(role: str, query: str) -> None:
+        query = " ".join(query.split())
+        if query and query.lower() not in {q.lower() for q in roles}:
+            roles[query] = role
+
+    # 1-2: program pages, one per country (or degree) so result sets differ
+    for c in countries:
+        add("programs", f"{degree} {field} {c}")
+    if len(degrees) > 1:
+        add("programs", f"{degrees[1]} {field} {country}")
+    if len(roles) < 2:
+        add("programs", f"{field} graduate programs {country}")
+
+    # 3-4: funding
+    add("funding", f"{degree} {field} {funding[0]} {country}")
+    if funding[0] == "funding scholarships":
+        add("funding", f"{field} {degree} scholarships international students {last_country}")
+    else:
+        add("funding", f"{field} {degree} funding scholarships international students {last_country}")
+
+    # 5-6: requirements and deadlines (one quoted phrase at most)
+    add("requirements", f'"{field}" {degree} admission requirements {country}')
+    if profile.intake_term:
+        add("requirements", f"{degree} {field} application deadline {profile.intake_term}")
+
+    # 7: specialty focus, when the profile has one
+    if cities:
+        add("specialty", f"{degree} {field} {cities[0]}")
+
+    queries = list(roles)
+    if len(queries) > PLANNER_MAX_QUERIES:
+        # Keep the first query of every role before the second of any
+        firsts = [q for i, q in enumerate(queries) if roles[q] not in {roles[p] for p in queries[:i]}]
+        kept = set((firsts + [q for q in queries if q not in firsts])[:max(1, PLANNER_MAX_QUERIES)])
+        queries = [q for q in queries if q in kept]
+        roles = {q: roles[q] for q in queries}
+
+    tests = [f"{name.upper()} {score}" for name, score in (
+        ("gre", profile.gre), ("ielts", profile.ielts), ("toefl", profile.toefl)
+    ) if score]
+    plan = SearchPlan(
+        high_level_goal=f"Find {' or '.join(degrees)} programs in {field} in {', '.join(countries) or 'any country'}",
+        filters=PlanFilters(
+            field_of_study=field,
+            degree_type=degrees,
+            countries_or_regions=countries,
+            cities_or_states=cities,
+            funding_priority=funding if profile.funding_needs else [],
+            budget_notes=profile.budget_notes,
+            target_intake_terms=[profile.intake_term] if profile.intake_term else [],
+            minimum_requirements=MinimumRequirements(gpa=profile.gpa or "unknown", tests=tests or ["unknown"]),
+        ),
+        search_queries=queries,
+        notes_for_search="Template plan built from a complete profile",
+    ).model_dump()
+    plan["query_roles"] = roles
+    return plan
+
+
+def fallback_plan(user_input: str, profile: StudentProfile) -> Dict[str, Any]:
+    """
+    Simple natural-language plan built from the profile, used when the
+    planner's output cannot be parsed. A complete profile gets the template
+    plan; otherwise the queries follow the same rules as the planner prompt
+    (no site: operators, at most one quoted phrase).
+    """
+    if not missing_required_fields(profile):
+        plan = template_plan(profile)
+        plan["notes_for_search"] = "Fallback plan built from the profile after a planner parsing error"
+        return plan
+
+    field = profile.field_of_study or user_input[:60]
+    degree = profile.degree_level or "MS"
+    country = profile.preferred_countries or ""
+    funding = profile.funding_needs
+
+    queries = [
+        f"{degree} {field} {country}".strip(),
+        f"{degree} {field} funding scholarships {country}".strip(),
+        f'"{field}" {degree} admission requirements {country}'.strip(),
+    ]
+    if funding:
+        queries.append(f"{degree} {field} {funding} {country}".strip())
+
+    return {
+        "high_level_goal": f"Find {degree} programs in {field}",
+        "profile_updates": {},
+        "filters": {
+            "field_of_study": field,
+            "degree_type": [degree],
+            "countries_or_regions": [c.strip() for c in country.split(",") if c.strip()],
+        },
+        "search_queries": queries,
+        "notes_for_search": "Fallback plan built from the profile after a planner parsing error",
+    }
+
+
 def plan_from_user_input(
     user_input: str,
     session_id: str,
     store: InMemoryProfileStore,
 ) -> Dict[str, Any]:
     """
-    Call Gemini to create a search plan and update student profile memory.
+    Create a search plan and update student profile memory.
+
+    Uses template_plan when the profile is complete and the message adds no
+    new constraints; otherwise asks Gemini.
     """
     profile = store.get_profile(session_id)
-    prompt = build_planner_prompt(user_input, profile)
 
-    model = genai.GenerativeModel(GEMINI_MODEL_NAME)
-    response = model.generate_content(prompt)
-    
-    text = response.text.strip() if response.text else ""
-
-    # Check if response is empty
-    if not text:
-        raise ValueError("Gemini returned an empty response. This may be due to content filtering, rate limits, or quota issues.")
-
-    # Extract JSON from markdown code blocks if present
-    if text.startswith("```"):
-        # Remove markdown code block markers
-        lines = text.split("\n")
-        # Skip first line (```json or similar) and last line (```)
-        if len(lines) > 2:
-            text = "\n".join(lines[1:-1])
-        # Also handle case where language identifier is on same line as opening ```
-        if text.startswith("json\n"):
-            text = text[5:]
-        text = text.strip()
-
-    # Try to parse JSON with better error handling
+    # Common profile shapes don't need the model to invent queries
+    if (
+        TEMPLATE_PLANNER_ENABLED
+        and not missing_required_fields(profile)
+        and not message_adds_constraints(user_input, profile)
+    ):
+        print("[INFO] Profile is complete and the message adds no new constraints; using the template plan")
+        return template_plan(profile)
+
+    prompt = build_planner_prompt(user_input, profile, conversation_section(store.conversation(session_id)))
+
     try:
-        plan: Dict[str, Any] = json.loads(text)
-    except json.JSONDecodeError as e:
-        # Log the problematic JSON for debugging
-        print(f"[ERROR] Failed to parse JSON from Gemini planner:")
-        print(f"Error: {e}")
-        print(f"Response text (first 500 chars): {text[:500]}")
-        
-        # Try to fix common JSON issues
-        # Remove trailing commas before closing braces/brackets
-        import re
-        text = re.sub(r',(\s*[}\]])', r'\1', text)
-        
-        try:
-            plan: Dict[str, Any] = json.loads(text)
-            print("[INFO] Successfully parsed JSON after cleanup")
-        except json.JSONDecodeError as e2:
-            # If still failing, return a basic plan
-            print(f"[ERROR] Still failed after cleanup: {e2}")
-            print("[INFO] Returning fallback plan")
-            plan = {
-                "high_level_goal": "Search for graduate programs",
-                "profile_updates": {},
-                "filters": {
-                    "field_of_study": "unknown",
-                    "degree_type": ["MS", "PhD"],
-                    "countries_or_regions": ["United States", "Canada"],
-                },
-                "search_queries": [
-                    f'site:.edu "MS" "graduate program" "{text[:50]}"',
-                ],
-                "notes_for_search": "Fallback search due to JSON parsing error"
-            }
+        plan: Dict[str, Any] = generate_json(prompt, SearchPlan, stage="planner").model_dump()
+    except (StructuredOutputError, TurnDeadlineExceeded) as e:
+        print(f"[ERROR] Planner output unusable: {e}")
+        print("[INFO] Returning fallback plan built from the profile")
+        plan = fallback_plan(user_input, profile)
 
     # Apply profile_updates into memory
     updates = plan.get("profile_updates", {}) or {}
@@ -0,0 +1,128 @@
+"""
+Speculative background prefetch for likely next turns.
+
+After a new_search answer the most common follow-ups are "dive deeper into X"
+and "compare X and Y". The executor hands the Prefetcher a list of small
+tasks (warm the search cache for X, optionally pre-generate X's base report)
+that run on a background pool. Each session has a budget of upstream
+searches, and any pending prefetch work is cancelled as soon as the same
+session sends another message. Prefetch calls take the lowest upstream
+priority (see scheduler.py), behind every live turn.
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple
+
+from .config import PREFETCH_SESSION_BUDGET, PREFETCH_WORKERS
+from .scheduler import background_scope
+
+
+@dataclass
+class PrefetchTask:
+    """One unit of speculative work."""
+    name: str
+    run: Callable[[], Any]
+    cost: int = 0  # upstream searches this task may spend
+
+
+class _SessionJob:
+    def __init__(self) -> None:
+        self.cancelled = threading.Event()
+        self.futures: List[Tuple[Future, PrefetchTask]] = []
+
+
+class Prefetcher:
+    """
+    Runs prefetch tasks in the background with per-session budgets.
+    """
+
+    def __init__(self, max_workers: int, session_budget: int) -> None:
+        self.session_budget = session_budget
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, _SessionJob] = {}
+        self._spent: Dict[str, int] = {}
+
+    def remaining_budget(self, session_id: str) -> int:
+        with self._lock:
+            return self.session_budget - self._spent.get(session_id, 0)
+
+    def submit(self, session_id: str, tasks: List[PrefetchTask]) -> int:
+        """
+        Queue tasks for a session, replacing any job it already has running.
+
+        Tasks that would exceed the session's remaining budget are dropped.
+
+        Returns:
+            Number of tasks actually queued.
+        """
+        self.cancel(session_id)
+        job = _SessionJob()
+
+        with self._lock:
+            self._jobs[session_id] = job
+            accepted: List[PrefetchTask] = []
+            for task in tasks:
+                spent = self._spent.get(session_id, 0)
+                if spent + task.cost > self.session_budget:
+                    print(f"[DEBUG] Prefetch budget exhausted for session {session_id[:8]}, skipping {task.name}")
+                    continue
+                self._spent[session_id] = spent + task.cost
+                accepted.append(task)
+
+            for task in accepted:
+                job.futures.append((self._pool.submit(self._run_task, session_id, job, task), task))
+
+        if accepted:
+            print(f"[DEBUG] Prefetch queued {len(accepted)} tasks for session {session_id[:8]}")
+        return len(accepted)
+
+    def _run_task(self, session_id: str, job: _SessionJob, task: PrefetchTask) -> None:
+        if job.cancelled.is_set():
+            # Cancelled before it started: give the budget back
+            self._refund(session_id, task.cost)
+            return
+        try:
+            with background_scope(session_id):
+                task.run()
+            print(f"[DEBUG] Prefetch finished: {task.name}")
+        except Exception as e:
+            print(f"[WARN] Prefetch task {task.name} failed: {e}")
+
+    def cancel(self, session_id: str) -> None:
+        """Cancel any pending prefetch work for the session."""
+        with self._lock:
+            job = self._jobs.pop(session_id, None)
+        if job is None:
+            return
+        job.cancelled.set()
+        cancelled = 0
+        for future, task in job.futures:
+            if future.cancel():
+                self._refund(session_id, task.cost)
+                cancelled += 1
+        if cancelled:
+            print(f"[DEBUG] Cancelled {cancelled} pending prefetch tasks for session {session_id[:8]}")
+
+    def _refund(self, session_id: str, cost: int) -> None:
+        with self._lock:
+            self._spent[session_id] = max(0, self._spent.get(session_id, 0) - cost)
+
+    def forget(self, session_id: str) -> None:
+        """Cancel work and drop the budget bookkeeping for a closed session."""
+        self.cancel(session_id)
+        with self._lock:
+            self._spent.pop(session_id, None)
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            sessions = list(self._jobs)
+        for session_id in sessions:
+            self.cancel(session_id)
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+# Global prefetcher (one process)
+prefetcher = Prefetcher(max_workers=PREFETCH_WORKERS, session_budget=PREFETCH_SESSION_BUDGET)
@@ -0,0 +1,146 @@
+"""
+Opt-in profiling of individual pipeline turns.
+
+Set PROFILE_MODE and PROFILE_SAMPLE_RATE (see config.py) to profile a random
+fraction of turns. Each profiled turn writes one file to PROFILE_DIR, named
+after its time, session, query type and turn number:
+
+    cprofile  Deterministic cProfile of the turn's own thread -> .prof
+              (python -m pstats FILE, snakeviz FILE). Shows our Python and
+              where the turn thread blocks on upstream calls or pool work.
+    sample    Stack sampler every PROFILE_INTERVAL_MS over the turn's thread
+              and the pool threads working for it (searches, follow-ups)
+              -> .collapsed, one "frame;frame;frame count" line per stack,
+              ready for flamegraph.pl or speedscope.
+
+With PROFILE_MODE=off (the default) profile_turn is a bare generator that
+yields immediately.
+"""
+
+import cProfile
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from types import FrameType
+from typing import Iterator, Optional, Set
+
+from .config import PROFILE_DIR, PROFILE_INTERVAL_MS, PROFILE_MODE, PROFILE_SAMPLE_RATE
+from .turn_context import TurnContext
+
+PROFILE_MODES = {"off", "cprofile", "sample"}
+MAX_STACK_DEPTH = 128
+
+if PROFILE_MODE not in PROFILE_MODES:
+    print(f"[WARN] Unknown PROFILE_MODE '{PROFILE_MODE}', profiling disabled")
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def collapse_stack(frame: Optional[FrameType], prefix: str = "") -> str:
+    """Root-first 'file:function;...' string for a frame's call stack."""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    if prefix:
+        labels.insert(0, prefix)
+    return ";".join(labels)
+
+
+class StackSampler:
+    """
+    Samples the stacks of a turn's threads on a background thread.
+
+    root is the thread running the turn; helpers is the live set of pool
+    threads working for it (maintained by submit_in_context).
+    """
+
+    def __init__(self, root: int, helpers: Set[int], interval_seconds: float) -> None:
+        self.root = root
+        self.helpers = helpers
+        self.interval_seconds = interval_seconds
+        self.samples = 0
+        self.counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="turn-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            frames = sys._current_frames()
+            self.samples += 1
+            self.counts[collapse_stack(frames.get(self.root), "turn")] += 1
+            for ident in list(self.helpers):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.counts[collapse_stack(frame, "pool")] += 1
+
+    def write_collapsed(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _profile_path(ctx: TurnContext, extension: str) -> str:
+    usage = ctx.usage
+    query_type = (usage.query_type if usage is not None else None) or "unclassified"
+    turn_id = usage.turn_id if usage is not None else 0
+    session = re.sub(r"[^A-Za-z0-9_-]", "_", ctx.session_id)[:16]
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    return os.path.join(PROFILE_DIR, f"{stamp}_{session}_{query_type}_t{turn_id}.{extension}")
+
+
+def should_profile() -> bool:
+    return PROFILE_MODE in {"cprofile", "sample"} and random.random() < PROFILE_SAMPLE_RATE
+
+
+@contextmanager
+def profile_turn(ctx: TurnContext) -> Iterator[None]:
+    """Profile the enclosed turn if profiling is on and this turn is sampled."""
+    if not should_profile():
+        yield
+        return
+
+    started = time.perf_counter()
+    if PROFILE_MODE == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            path = _profile_path(ctx, "prof")
+            profiler.dump_stats(path)
+            print(f"[INFO] Turn profile ({time.perf_counter() - started:.2f}s) written to {path}")
+        return
+
+    ctx.active_threads = set()
+    sampler = StackSampler(threading.get_ident(), ctx.active_threads, PROFILE_INTERVAL_MS / 1000.0)
+    sampler.start()
+    try:
+        yield
+    finally:
+        sampler.stop()
+        ctx.active_threads = None
+        path = _profile_path(ctx, "collapsed")
+        sampler.write_collapsed(path)
+        print(
+            f"[INFO] Turn profile ({time.perf_counter() - started:.2f}s, {sampler.samples} samples) "
+            f"written to {path}"
+        )
@@ -0,0 +1,262 @@
+"""
+Relevance ranking of search candidates against the student profile.
+
+Candidates arrive from Serper in query order, so a plain slice keeps whatever
+the first queries returned. This module scores every candidate with a hashed
+TF-IDF cosine similarity against the profile and plan filters, adds domain
+priors (university domains up, listicle aggregators down) and returns the
+top-k in score order.
+"""
+
+import re
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from .memory import StudentProfile
+
+# Size of the hashed feature space. 2**11 keeps a 1000 x 2048 float32 matrix
+# at ~8 MB while collisions stay rare for title + snippet vocabularies.
+HASH_DIM = 2 ** 11
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has",
+    "have", "in", "is", "it", "its", "of", "on", "or", "our", "that", "the",
+    "their", "this", "to", "was", "we", "with", "you", "your", "unknown",
+    "null", "none", "all",
+}
+
+# Domain priors are added to the cosine similarity (which lies in [0, 1]).
+UNIVERSITY_DOMAIN_BOOST = 0.25
+AGGREGATOR_DOMAIN_PENALTY = 0.30
+LISTICLE_TITLE_PENALTY = 0.15
+
+# University domains, matched on whole labels at the end of the host:
+# *.edu, *.edu.xx, *.ac.xx, and uni-*.xx / univ-*.xx / tu-*.xx (German,
+# French, ...)
+_UNIVERSITY_DOMAIN_RE = re.compile(
+    r"(^|\.)(edu|edu\.[a-z]{2}|ac\.[a-z]{2})$|(^|\.)(univ?|tu)-[a-z0-9-]+\.[a-z]{2}$"
+)
+
+# Universities in countries whose university domains follow no pattern
+# (plain .ca, .de, .nl, .ch, ...); matched like AGGREGATOR_DOMAINS
+UNIVERSITY_DOMAINS = (
+    # Canada
+    "utoronto.ca", "ubc.ca", "mcgill.ca", "uwaterloo.ca", "ualberta.ca",
+    "umontreal.ca", "mcmaster.ca", "queensu.ca", "uottawa.ca", "ucalgary.ca",
+    "sfu.ca", "yorku.ca", "concordia.ca", "dal.ca", "uwo.ca", "uvic.ca",
+    "usask.ca", "umanitoba.ca", "carleton.ca", "ulaval.ca", "polymtl.ca",
+    "torontomu.ca", "uqam.ca", "etsmtl.ca", "mun.ca", "unb.ca", "uoguelph.ca",
+    # Germany
+    "tum.de", "lmu.de", "rwth-aachen.de", "fu-berlin.de", "hu-berlin.de",
+    "fau.de", "rub.de", "tuhh.de",
+    # Netherlands
+    "tudelft.nl", "uva.nl", "vu.nl", "uu.nl", "universiteitleiden.nl", "rug.nl",
+    "tue.nl", "utwente.nl", "ru.nl", "maastrichtuniversity.nl", "eur.nl", "wur.nl",
+    # Switzerland
+    "ethz.ch", "epfl.ch", "uzh.ch", "unibe.ch", "unibas.ch", "unige.ch",
+    "unil.ch", "unisg.ch", "usi.ch", "unifr.ch",
+    # Elsewhere in Europe, and Hong Kong
+    "jku.at", "kth.se", "chalmers.se", "lu.se", "uu.se", "su.se", "liu.se", "dtu.dk",
+    "ku.dk", "au.dk", "aalto.fi", "helsinki.fi", "uio.no", "ntnu.no", "tcd.ie",
+    "ucd.ie", "kuleuven.be", "ugent.be", "polimi.it", "unibo.it", "unimi.it",
+    "unipd.it", "hku.hk", "ust.hk",
+)
+
+AGGREGATOR_DOMAINS = (
+    "mastersportal.com",
+    "phdportal.com",
+    "studyportals.com",
+    "findamasters.com",
+    "findaphd.com",
+    "gradschools.com",
+    "topuniversities.com",
+    "usnews.com",
+    "shiksha.com",
+    "leverageedu.com",
+    "yocket.com",
+    "collegedunia.com",
+    "upgrad.com",
+    "collegevine.com",
+    "niche.com",
+    "educations.com",
+    "idp.com",
+    "quora.com",
+    "reddit.com",
+    "medium.com",
+)
+
+_LISTICLE_TITLE_RE = re.compile(
+    r"(^|\b)(top|best)\s+\d+|\b\d+\s+(best|top|cheapest|affordable)\b|"
+    r"\branking(s)?\b|\blist of\b"
+)
+
+
+def _tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS and len(t) > 1]
+
+
+def _hash_tokens(tokens: List[str]) -> List[int]:
+    # Python's str hash is salted per process, which is fine because all
+    # vectors compared in one ranking call are built in the same process.
+    return [hash(t) % HASH_DIM for t in tokens]
+
+
+def build_profile_query(profile: StudentProfile, plan: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Flatten the profile and plan filters into a single bag-of-words query.
+
+    Field of study and degree are repeated so they weigh more than the
+    free-form notes.
+    """
+    parts: List[str] = []
+    if profile.field_of_study:
+        parts.extend([profile.field_of_study] * 3)
+    if profile.degree_level:
+        parts.extend([profile.degree_level] * 2)
+    for value in (
+        profile.preferred_countries,
+        profile.preferred_cities,
+        profile.funding_needs,
+        profile.intake_term,
+        profile.extra_notes,
+    ):
+        if value:
+            parts.append(value)
+
+    filters = (plan or {}).get("filters", {}) or {}
+    for key in (
+        "field_of_study",
+        "degree_type",
+        "countries_or_regions",
+        "cities_or_states",
+        "funding_priority",
+        "target_intake_terms",
+        "other_constraints",
+    ):
+        value = filters.get(key)
+        if isinstance(value, list):
+            parts.extend(str(v) for v in value if v)
+        elif value:
+            parts.append(str(value))
+
+    return " ".join(parts)
+
+
+def domain_prior(candidate: Dict[str, Any]) -> float:
+    """
+    Additive prior for a candidate based on its domain and title shape.
+    """
+    domain = (candidate.get("source") or "").lower()
+    if domain.startswith("www."):
+        domain = domain[4:]
+    title = (candidate.get("title") or "").lower()
+
+    prior = 0.0
+    if any(domain == agg or domain.endswith("." + agg) for agg in AGGREGATOR_DOMAINS):
+        prior -= AGGREGATOR_DOMAIN_PENALTY
+    elif _UNIVERSITY_DOMAIN_RE.search(domain) or any(
+        domain == uni or domain.endswith("." + uni) for uni in UNIVERSITY_DOMAINS
+    ):
+        prior += UNIVERSITY_DOMAIN_BOOST
+    if _LISTICLE_TITLE_RE.search(title):
+        prior -= LISTICLE_TITLE_PENALTY
+    return prior
+
+
+def score_candidates(candidates: List[Dict[str, Any]], query: str) -> np.ndarray:
+    """
+    Score candidates against a free-text query.
+
+    Builds a hashed term-frequency matrix over title + snippet (title tokens
+    counted twice), weights it with smoothed IDF computed over the candidate
+    pool, and returns cosine similarity plus domain priors.
+    """
+    n = len(candidates)
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    rows: List[int] = []
+    cols: List[int] = []
+    for i, c in enumerate(candidates):
+        title_tokens = _tokenize(c.get("title") or "")
+        snippet_tokens = _tokenize(c.get("snippet") or "")
+        hashed = _hash_tokens(title_tokens * 2 + snippet_tokens)
+        rows.extend([i] * len(hashed))
+        cols.extend(hashed)
+
+    tf = np.zeros((n, HASH_DIM), dtype=np.float32)
+    if rows:
+        np.add.at(tf, (np.asarray(rows), np.asarray(cols)), 1.0)
+    # Sublinear TF damps snippets that repeat the same keyword
+    np.log1p(tf, out=tf)
+
+    df = np.count_nonzero(tf, axis=0).astype(np.float32)
+    idf = np.log((1.0 + n) / (1.0 + df)) + 1.0
+    doc = tf * idf
+
+    q = np.zeros(HASH_DIM, dtype=np.float32)
+    q_idx = _hash_tokens(_tokenize(query))
+    if q_idx:
+        np.add.at(q, np.asarray(q_idx), 1.0)
+    np.log1p(q, out=q)
+    q *= idf
+
+    doc_norms = np.linalg.norm(doc, axis=1)
+    q_norm = float(np.linalg.norm(q))
+    if q_norm > 0:
+        sims = (doc @ q) / (np.maximum(doc_norms, 1e-9) * q_norm)
+    else:
+        sims = np.zeros(n, dtype=np.float32)
+
+    priors = np.fromiter((domain_prior(c) for c in candidates), dtype=np.float32, count=n)
+    return sims.astype(np.float32) + priors
+
+
+def _dedupe(candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop repeated URLs, keeping the first occurrence."""
+    seen = set()
+    unique: List[Dict[str, Any]] = []
+    for c in candidates:
+        url = (c.get("url") or "").rstrip("/").lower()
+        if url and url in seen:
+            continue
+        seen.add(url)
+        unique.append(c)
+    return unique
+
+
+def rank_candidates(
+    candidates: List[Dict[str, Any]],
+    profile: StudentProfile,
+    plan: Optional[Dict[str, Any]] = None,
+    top_k: int = 30,
+) -> List[Dict[str, Any]]:
+    """
+    Return the top_k candidates most relevant to the profile and plan.
+
+    Args:
+        candidates: Raw candidates from extract_program_candidates.
+        profile: The student's current profile.
+        plan: Search plan (its filters are folded into the query).
+        top_k: Number of candidates to keep.
+
+    Returns:
+        Deduplicated candidates in descending score order.
+    """
+    unique = _dedupe(candidates)
+    if not unique:
+        return []
+
+    scores = score_candidates(unique, build_profile_query(profile, plan))
+    k = min(top_k, len(unique))
+    if k < len(unique):
+        top = np.sort(np.argpartition(-scores, k - 1)[:k])
+    else:
+        top = np.arange(len(unique))
+    # Stable sort so equal scores keep arrival order
+    order = top[np.argsort(-scores[top], kind="stable")]
+    return [unique[i] for i in order]
+
@@ -0,0 +1,455 @@
+"""
+Structured program records parsed locally from search candidates.
+
+parse_candidate turns a loose {title, url, snippet, source} candidate into a
+ProgramRecord with the facts that can be read off the text with regexes:
+university, degree, field, minimum GPA, GRE policy, TOEFL/IELTS minimums,
+funding keywords and deadline dates. Nothing here calls an LLM.
+
+ProgramBatch stores many records column-wise in NumPy arrays so profile
+constraints (GPA, GRE, English tests, funding, deadlines) become a handful
+of vectorized comparisons. Filters only drop records that are known to
+conflict with the profile; a fact the snippet doesn't mention, or states
+ambiguously, never excludes a record. In particular, a GPA only counts as a
+minimum when the text says so (an average or median admitted GPA is not a
+cutoff), a record naming several degree levels has no single degree, and
+deadlines are informational: a snippet often still shows last cycle's
+dates, so a past deadline doesn't mean the program is closed.
+"""
+
+import datetime as dt
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .memory import StudentProfile
+
+# ---------------------------------------------------------------------------
+# Codes used by the columnar batch
+# ---------------------------------------------------------------------------
+
+GRE_UNKNOWN, GRE_NOT_REQUIRED, GRE_OPTIONAL, GRE_REQUIRED = -1, 0, 1, 2
+GRE_POLICIES = {GRE_NOT_REQUIRED: "not_required", GRE_OPTIONAL: "optional", GRE_REQUIRED: "required"}
+
+DEGREE_UNKNOWN, DEGREE_MASTERS, DEGREE_PHD = -1, 0, 1
+DEGREE_NAMES = {DEGREE_MASTERS: "masters", DEGREE_PHD: "phd"}
+
+# Funding keywords and their bit in the batch's funding mask
+FUNDING_KEYWORDS: Tuple[Tuple[str, str], ...] = (
+    ("fully_funded", r"fully[- ]funded|full funding"),
+    ("assistantship", r"assistantships?|\bRA\b|\bTA\b|\bGA\b"),
+    ("fellowship", r"fellowships?"),
+    ("stipend", r"stipends?"),
+    ("tuition_waiver", r"tuition (?:waiver|remission)|waives? tuition"),
+    ("scholarship", r"scholarships?"),
+)
+FUNDING_BITS = {name: 1 << i for i, (name, _) in enumerate(FUNDING_KEYWORDS)}
+
+NO_DEADLINE = np.iinfo(np.int32).max  # sorts after every real deadline
+
+# ---------------------------------------------------------------------------
+# Regexes
+# ---------------------------------------------------------------------------
+
+_UNIVERSITY_RE = re.compile(
+    r"\b((?:The )?University of (?:[A-Z][\w&'.-]*)(?: (?:at |of |in )?[A-Z][\w&'.-]*)*"
+    r"|(?:[A-Z][\w&'.-]+ )+(?:University|Institute of Technology|Institute|College|Polytechnic)"
+    r"(?: of [A-Z][\w&'.-]*(?: [A-Z][\w&'.-]*)*)?)"
+)
+_DEGREE_RE = re.compile(
+    r"\b(Ph\.? ?D\.?|Doctor(?:al|ate)|M\.? ?S\.?c?\b|M\.? ?Eng\.?|MASc|M\.? ?A\.?\b|Master(?:'s|s)?)",
+    re.IGNORECASE,
+)
+_FIELD_RE = re.compile(
+    r"\b(?:M\.? ?S\.?c?|M\.? ?Eng|MASc|Ph\.? ?D\.?|Master(?:'s|s)?(?: of (?:Science|Engineering|Arts))?)"
+    r" (?:degree |program |programme )?in ([A-Z][A-Za-z&]*(?: (?:and |& )?[A-Z][A-Za-z&]*){0,4})"
+)
+# A GPA is a minimum only with cutoff wording next to it: "minimum GPA of
+# 3.0", "GPA of at least 3.0", "3.0 GPA required", "GPA of 3.0 or higher"
+_GPA_RE = re.compile(
+    r"(?:minimum|min\.|at least|required|requires?|no (?:less|lower) than)[^0-9.;]{0,30}?"
+    r"(?:GPA|grade point average)[^0-9.;]{0,15}?([1-4]\.\d{1,2})"
+    r"|(?:GPA|grade point average)[^0-9.;]{0,25}?(?:minimum|min\.|at least|no (?:less|lower) than|above)"
+    r"[^0-9.;]{0,10}?([1-4]\.\d{1,2})"
+    r"|(?:GPA|grade point average)[^0-9.;]{0,25}?([1-4]\.\d{1,2})(?:\s*/\s*4(?:\.0)?)?"
+    r"\s*(?:or (?:higher|above|better)|minimum|\(minimum\)|(?:is )?required)"
+    r"|([1-4]\.\d{1,2})\s*(?:/\s*4(?:\.0)?\s*)?(?:minimum|min\.?) (?:cumulative )?GPA"
+    r"|([1-4]\.\d{1,2})\s*(?:/\s*4(?:\.0)?\s*)?(?:cumulative )?GPA (?:is )?required",
+    re.IGNORECASE,
+)
+# Wording that makes a GPA a statistic about admitted students, not a cutoff
+_GPA_STATISTIC_RE = re.compile(r"\b(?:average|avg|median|mean|typical|admitted|class profile)\b", re.IGNORECASE)
+_GRE_NOT_REQUIRED_RE = re.compile(
+    r"\bno GRE\b|\bGRE[^.;]{0,25}\b(?:not required|not accepted|waived|not needed|eliminated"
+    r"|no longer (?:required|needed|accepted|considered))"
+    r"|\bGRE[- ]free\b|\bwithout (?:the )?GRE\b|\b(?:does not|doesn't|do not|don't|no longer) requires? (?:the )?GRE\b",
+    re.IGNORECASE,
+)
+_GRE_OPTIONAL_RE = re.compile(r"\bGRE[^.;]{0,25}\b(?:optional|recommended|not mandatory)|\bGRE[- ]optional\b", re.IGNORECASE)
+# "required" with no negation between it and "GRE"
+_GRE_REQUIRED_RE = re.compile(
+    r"\bGRE\b(?:(?!\bnot\b|n't\b|\bno longer\b|\bnever\b)[^.;]){0,25}\brequired\b"
+    r"|(?<!not )(?<!n't )(?<!no longer )\brequires? (?:the )?GRE\b",
+    re.IGNORECASE,
+)
+_TOEFL_RE = re.compile(r"\bTOEFL(?: iBT)?[^0-9.;]{0,20}(\d{2,3})\b", re.IGNORECASE)
+_IELTS_RE = re.compile(r"\bIELTS[^0-9.;]{0,20}(\d(?:\.\d)?)\b", re.IGNORECASE)
+
+_MONTHS = {
+    name: i + 1
+    for i, names in enumerate([
+        ("january", "jan"), ("february", "feb"), ("march", "mar"), ("april", "apr"),
+        ("may",), ("june", "jun"), ("july", "jul"), ("august", "aug"),
+        ("september", "sep", "sept"), ("october", "oct"), ("november", "nov"), ("december", "dec"),
+    ])
+    for name in names
+}
+_MONTH_NAMES = "|".join(sorted(_MONTHS, key=len, reverse=True))
+_DATE_RES = (
+    # December 15, 2025 / Dec. 15 / Dec 15th
+    re.compile(rf"\b({_MONTH_NAMES})\.? (\d{{1,2}})(?:st|nd|rd|th)?(?:,? (\d{{4}}))?\b", re.IGNORECASE),
+    # 15 December 2025
+    re.compile(rf"\b(\d{{1,2}}) ({_MONTH_NAMES})\.?(?:,? (\d{{4}}))?\b", re.IGNORECASE),
+    # 2025-12-15
+    re.compile(r"\b(20\d{2})-(\d{2})-(\d{2})\b"),
+)
+_DEADLINE_CONTEXT_RE = re.compile(r"deadline|due|apply by|applications? (?:close|open)|priority date", re.IGNORECASE)
+_FUNDING_RES = tuple((name, re.compile(pattern, re.IGNORECASE)) for name, pattern in FUNDING_KEYWORDS)
+
+
+class ProgramRecord:
+    """One search candidate with the facts parsed out of its text."""
+
+    __slots__ = (
+        "title", "url", "snippet", "source",
+        "university", "degree", "field",
+        "min_gpa", "gre", "toefl_min", "ielts_min",
+        "funding", "deadlines",
+    )
+
+    def __init__(
+        self,
+        title: str,
+        url: str,
+        snippet: str,
+        source: str,
+        university: Optional[str] = None,
+        degree: Optional[str] = None,
+        field: Optional[str] = None,
+        min_gpa: Optional[float] = None,
+        gre: Optional[str] = None,
+        toefl_min: Optional[int] = None,
+        ielts_min: Optional[float] = None,
+        funding: Tuple[str, ...] = (),
+        deadlines: Tuple[dt.date, ...] = (),
+    ) -> None:
+        self.title = title
+        self.url = url
+        self.snippet = snippet
+        self.source = source
+        self.university = university
+        self.degree = degree
+        self.field = field
+        self.min_gpa = min_gpa
+        self.gre = gre
+        self.toefl_min = toefl_min
+        self.ielts_min = ielts_min
+        self.funding = funding
+        self.deadlines = deadlines
+
+    def __repr__(self) -> str:
+        return f"ProgramRecord({self.university or self.source!r}, {self.degree!r}, {self.field!r})"
+
+    def facts(self) -> Dict[str, Any]:
+        """The parsed facts that were found, for prompts and debugging."""
+        facts = {
+            "university": self.university,
+            "degree": self.degree,
+            "field": self.field,
+            "min_gpa": self.min_gpa,
+            "gre": self.gre,
+            "toefl_min": self.toefl_min,
+            "ielts_min": self.ielts_min,
+            "funding": list(self.funding),
+            "deadlines": [d.isoformat() for d in self.deadlines],
+        }
+        return {k: v for k, v in facts.items() if v not in (None, [])}
+
+    def as_candidate(self) -> Dict[str, Any]:
+        """The original candidate dict, plus a "facts" entry when any were parsed."""
+        candidate: Dict[str, Any] = {
+            "title": self.title,
+            "url": self.url,
+            "snippet": self.snippet,
+            "source": self.source,
+        }
+        facts = self.facts()
+        if facts:
+            candidate["facts"] = facts
+        return candidate
+
+
+# ---------------------------------------------------------------------------
+# Parsing
+# ---------------------------------------------------------------------------
+
+def _parse_degree(text: str) -> Optional[str]:
+    """ "masters" or "phd" when the text names only one of them, else None."""
+    kinds = set()
+    for match in _DEGREE_RE.finditer(text):
+        token = match.group(1).lower().replace(".", "").replace(" ", "")
+        kinds.add("phd" if token.startswith(("phd", "doctor")) else "masters")
+    return kinds.pop() if len(kinds) == 1 else None
+
+
+def _parse_min_gpa(text: str) -> Optional[float]:
+    for match in _GPA_RE.finditer(text):
+        if _GPA_STATISTIC_RE.search(match.group(0)):
+            continue
+        value = float(next(g for g in match.groups() if g))
+        if 1.0 <= value <= 4.0:
+            return value
+    return None
+
+
+def _parse_gre(text: str) -> Optional[str]:
+    if _GRE_NOT_REQUIRED_RE.search(text):
+        return "not_required"
+    if _GRE_OPTIONAL_RE.search(text):
+        return "optional"
+    if _GRE_REQUIRED_RE.search(text):
+        return "required"
+    return None
+
+
+def _first_float(regex: "re.Pattern[str]", text: str, low: float, high: float) -> Optional[float]:
+    for match in regex.finditer(text):
+        raw = next((g for g in match.groups() if g), None)
+        if raw is None:
+            continue
+        value = float(raw)
+        if low <= value <= high:
+            return value
+    return None
+
+
+def _resolve_date(year: Optional[str], month: int, day: int, today: dt.date) -> Optional[dt.date]:
+    try:
+        if year:
+            return dt.date(int(year), month, day)
+        # No year: the next occurrence on or after today
+        candidate = dt.date(today.year, month, day)
+        return candidate if candidate >= today else dt.date(today.year + 1, month, day)
+    except ValueError:
+        return None
+
+
+def parse_deadlines(text: str, today: Optional[dt.date] = None) -> Tuple[dt.date, ...]:
+    """
+    Dates mentioned near deadline wording, sorted and deduplicated.
+
+    Dates without a year resolve to their next occurrence after today.
+    """
+    today = today or dt.date.today()
+    found = set()
+    for sentence in re.split(r"(?<=[.;!?])\s+|\n", text):
+        if not _DEADLINE_CONTEXT_RE.search(sentence):
+            continue
+        for match in _DATE_RES[0].finditer(sentence):
+            date = _resolve_date(match.group(3), _MONTHS[match.group(1).lower()], int(match.group(2)), today)
+            if date:
+                found.add(date)
+        for match in _DATE_RES[1].finditer(sentence):
+            date = _resolve_date(match.group(3), _MONTHS[match.group(2).lower()], int(match.group(1)), today)
+            if date:
+                found.add(date)
+        for match in _DATE_RES[2].finditer(sentence):
+            date = _resolve_date(match.group(1), int(match.group(2)), int(match.group(3)), today)
+            if date:
+                found.add(date)
+    return tuple(sorted(found))
+
+
+def parse_candidate(candidate: Dict[str, Any], today: Optional[dt.date] = None) -> ProgramRecord:
+    """Parse one search candidate into a ProgramRecord."""
+    title = candidate.get("title") or ""
+    snippet = candidate.get("snippet") or ""
+    text = f"{title}. {snippet}"
+
+    university_match = _UNIVERSITY_RE.search(title) or _UNIVERSITY_RE.search(snippet)
+    field_match = _FIELD_RE.search(text)
+    toefl = _first_float(_TOEFL_RE, text, 40, 120)
+    funding = tuple(name for name, regex in _FUNDING_RES if regex.search(text))
+
+    return ProgramRecord(
+        title=title,
+        url=candidate.get("url") or "",
+        snippet=snippet,
+        source=candidate.get("source") or "",
+        university=university_match.group(1).strip() if university_match else None,
+        degree=_parse_degree(text),
+        field=field_match.group(1).strip() if field_match else None,
+        min_gpa=_parse_min_gpa(text),
+        gre=_parse_gre(text),
+        toefl_min=int(toefl) if toefl is not None else None,
+        ielts_min=_first_float(_IELTS_RE, text, 4.0, 9.0),
+        funding=funding,
+        deadlines=parse_deadlines(text, today),
+    )
+
+
+def parse_candidates(candidates: Sequence[Dict[str, Any]], today: Optional[dt.date] = None) -> List[ProgramRecord]:
+    today = today or dt.date.today()
+    return [parse_candidate(c, today) for c in candidates]
+
+
+# ---------------------------------------------------------------------------
+# Columnar batch and vectorized filters
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ProgramFilter:
+    """
+    Profile constraints; None means "don't filter on this".
+
+    Each constraint only excludes records with a known conflicting fact.
+    """
+    student_gpa: Optional[float] = None
+    avoid_gre: bool = False
+    toefl_score: Optional[int] = None
+    ielts_score: Optional[float] = None
+    degree: Optional[str] = None  # "masters" or "phd"
+    require_funding: bool = False
+    deadline_after: Optional[dt.date] = None  # explicit use only; see constraints_from_profile
+
+
+def _to_days(date: dt.date) -> int:
+    return (date - dt.date(1970, 1, 1)).days
+
+
+class ProgramBatch:
+    """
+    Column-wise storage for many ProgramRecords.
+
+    Numeric facts live in NumPy arrays (NaN / -1 / NO_DEADLINE for unknown),
+    funding keywords in a bitmask, and deadlines as the earliest and latest
+    day number, so filters never touch the Python objects.
+    """
+
+    def __init__(self, records: Sequence[ProgramRecord]) -> None:
+        self.records: List[ProgramRecord] = list(records)
+        n = len(self.records)
+        self.min_gpa = np.full(n, np.nan, dtype=np.float32)
+        self.toefl_min = np.full(n, np.nan, dtype=np.float32)
+        self.ielts_min = np.full(n, np.nan, dtype=np.float32)
+        self.gre = np.full(n, GRE_UNKNOWN, dtype=np.int8)
+        self.degree = np.full(n, DEGREE_UNKNOWN, dtype=np.int8)
+        self.funding = np.zeros(n, dtype=np.uint8)
+        self.first_deadline = np.full(n, NO_DEADLINE, dtype=np.int32)
+        self.last_deadline = np.full(n, -1, dtype=np.int32)
+
+        gre_codes = {name: code for code, name in GRE_POLICIES.items()}
+        degree_codes = {name: code for code, name in DEGREE_NAMES.items()}
+        for i, r in enumerate(self.records):
+            if r.min_gpa is not None:
+                self.min_gpa[i] = r.min_gpa
+            if r.toefl_min is not None:
+                self.toefl_min[i] = r.toefl_min
+            if r.ielts_min is not None:
+                self.ielts_min[i] = r.ielts_min
+            if r.gre is not None:
+                self.gre[i] = gre_codes[r.gre]
+            if r.degree is not None:
+                self.degree[i] = degree_codes[r.degree]
+            for name in r.funding:
+                self.funding[i] |= FUNDING_BITS[name]
+            if r.deadlines:
+                self.first_deadline[i] = _to_days(r.deadlines[0])
+                self.last_deadline[i] = _to_days(r.deadlines[-1])
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def mask(self, constraints: ProgramFilter) -> np.ndarray:
+        """Boolean array: True for records that don't conflict with constraints."""
+        keep = np.ones(len(self.records), dtype=bool)
+        if constraints.student_gpa is not None:
+            # NaN > x is False, so unknown minimums are kept
+            keep &= ~(self.min_gpa > constraints.student_gpa + 1e-6)
+        if constraints.avoid_gre:
+            keep &= self.gre != GRE_REQUIRED
+        if constraints.toefl_score is not None:
+            keep &= ~(self.toefl_min > constraints.toefl_score)
+        if constraints.ielts_score is not None:
+            keep &= ~(self.ielts_min > constraints.ielts_score + 1e-6)
+        if constraints.degree in ("masters", "phd"):
+            wanted = DEGREE_MASTERS if constraints.degree == "masters" else DEGREE_PHD
+            keep &= (self.degree == wanted) | (self.degree == DEGREE_UNKNOWN)
+        if constraints.require_funding:
+            keep &= self.funding != 0
+        if constraints.deadline_after is not None:
+            # Drop only programs whose every known deadline has passed
+            keep &= (self.last_deadline < 0) | (self.last_deadline >= _to_days(constraints.deadline_after))
+        return keep
+
+    def select(self, keep: np.ndarray) -> List[ProgramRecord]:
+        return [self.records[i] for i in np.flatnonzero(keep)]
+
+
+# ---------------------------------------------------------------------------
+# Profile -> constraints
+# ---------------------------------------------------------------------------
+
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+_NO_GRE_RE = re.compile(r"\b(?:no|none|not taken|without|avoid|haven'?t|skip|n/a)\b", re.IGNORECASE)
+
+
+def _profile_number(value: Optional[str], low: float, high: float) -> Optional[float]:
+    for raw in _NUMBER_RE.findall(value or ""):
+        number = float(raw)
+        if low <= number <= high:
+            return number
+    return None
+
+
+def constraints_from_profile(profile: StudentProfile) -> ProgramFilter:
+    """
+    Hard constraints implied by the profile.
+
+    Funding is left as a ranking preference rather than a filter, since most
+    snippets don't mention it either way. Deadlines aren't filtered on: a
+    snippet showing only last cycle's date says nothing about this cycle, so
+    the parsed dates go to the writer as facts instead.
+    """
+    toefl = _profile_number(profile.toefl, 40, 120)
+    return ProgramFilter(
+        student_gpa=_profile_number(profile.gpa, 1.0, 4.0),
+        avoid_gre=bool(profile.gre) and bool(_NO_GRE_RE.search(profile.gre or "")),
+        toefl_score=int(toefl) if toefl is not None else None,
+        ielts_score=_profile_number(profile.ielts, 4.0, 9.0),
+        degree=_parse_degree(profile.degree_level or ""),
+    )
+
+
+def filter_candidates(
+    candidates: List[Dict[str, Any]],
+    profile: StudentProfile,
+    min_keep: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Parse candidates, drop those that conflict with the profile, and return
+    the survivors as candidate dicts with a "facts" entry.
+
+    If fewer than min_keep survive, the unfiltered (but parsed) list is
+    returned instead, so an over-strict profile never empties the answer.
+    """
+    batch = ProgramBatch(parse_candidates(candidates))
+    keep = batch.mask(constraints_from_profile(profile))
+    kept = int(keep.sum())
+    print(f"[DEBUG] Structured filter kept {kept}/{len(batch)} candidates")
+    if kept < min_keep:
+        print(f"[DEBUG] Fewer than {min_keep} candidates left after filtering; keeping all")
+        return [r.as_candidate() for r in batch.records]
+    return [r.as_candidate() for r in batch.select(keep)]
@@ -0,0 +1,137 @@
+"""
+Cross-session cache of generated deep-dive and comparison reports.
+
+Reports are keyed on what they are about (report kind, normalized university
+set, field, degree and aspects), not on who asked, so one user's Stanford MS
+CS deep dive serves everyone else asking the same thing. Per-profile tailoring
+happens afterwards in a cheap personalization pass (see executor.py).
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .cache import TTLCache
+from .config import REPORT_CACHE_MAX_ENTRIES, REPORT_CACHE_TTL_SECONDS
+
+ReportKey = Tuple[str, Tuple[str, ...], str, str, Tuple[str, ...]]
+
+# Common short forms users type for the same university
+UNIVERSITY_ALIASES = {
+    "mit": "massachusetts institute of technology",
+    "cmu": "carnegie mellon",
+    "carnegie mellon university": "carnegie mellon",
+    "stanford university": "stanford",
+    "uc berkeley": "berkeley",
+    "ucb": "berkeley",
+    "university of california berkeley": "berkeley",
+    "ucla": "university of california los angeles",
+    "caltech": "california institute of technology",
+    "gatech": "georgia institute of technology",
+    "georgia tech": "georgia institute of technology",
+    "uiuc": "university of illinois urbana champaign",
+    "uoft": "university of toronto",
+    "u of t": "university of toronto",
+    "eth": "eth zurich",
+    "tum": "technical university of munich",
+}
+
+_DEGREE_ALIASES = {
+    "ms": "masters",
+    "msc": "masters",
+    "meng": "masters",
+    "master": "masters",
+    "masters": "masters",
+    "mastersdegree": "masters",
+    "phd": "phd",
+    "doctorate": "phd",
+    "doctoral": "phd",
+}
+
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+
+
+def _normalize_text(value: Optional[str]) -> str:
+    return _NON_WORD_RE.sub(" ", (value or "").lower()).strip()
+
+
+def normalize_university(name: str) -> str:
+    """Lowercase, strip punctuation and a leading 'the', then apply aliases."""
+    norm = _normalize_text(name)
+    if norm.startswith("the "):
+        norm = norm[4:]
+    return UNIVERSITY_ALIASES.get(norm, norm)
+
+
+def normalize_degree(degree: Optional[str]) -> str:
+    compact = _NON_WORD_RE.sub("", (degree or "").lower())
+    return _DEGREE_ALIASES.get(compact, compact)
+
+
+def make_report_key(
+    kind: str,
+    universities: Iterable[str],
+    field: Optional[str],
+    degree: Optional[str],
+    aspects: Iterable[str] = (),
+) -> ReportKey:
+    """
+    Build the cache key for a report.
+
+    Args:
+        kind: "deep_dive" or "compare".
+        universities: University names as the user typed them.
+        field: Field of study.
+        degree: Degree level (MS, MSc, PhD, ...).
+        aspects: Comparison aspects; order does not matter.
+    """
+    unis = tuple(sorted({normalize_university(u) for u in universities if u}))
+    asp = tuple(sorted({_normalize_text(a) for a in aspects if a}))
+    return (kind, unis, _normalize_text(field), normalize_degree(degree), asp)
+
+
+class ReportCache:
+    """
+    TTL + LRU cache of base (un-personalized) reports.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float) -> None:
+        self._cache = TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+
+    def get(self, key: ReportKey) -> Optional[str]:
+        report = self._cache.get(key)
+        print(f"[DEBUG] Report cache {'hit' if report else 'miss'} for {key}")
+        return report
+
+    def put(self, key: ReportKey, report: str) -> None:
+        if report:
+            self._cache.set(key, report)
+
+    def invalidate(self, key: ReportKey) -> bool:
+        """Drop a single report."""
+        return self._cache.invalidate(key)
+
+    def invalidate_university(self, university: str) -> int:
+        """Drop every report that covers the given university."""
+        norm = normalize_university(university)
+        return self._cache.invalidate_where(lambda key: norm in key[1])
+
+    def invalidate_field(self, field: str) -> int:
+        """Drop every report for the given field of study."""
+        norm = _normalize_text(field)
+        return self._cache.invalidate_where(lambda key: key[2] == norm)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def keys(self) -> List[ReportKey]:
+        return self._cache.keys()
+
+    def items(self) -> List[tuple]:
+        return self._cache.items()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+# Global cache shared by all sessions in this process
+report_cache = ReportCache(maxsize=REPORT_CACHE_MAX_ENTRIES, ttl_seconds=REPORT_CACHE_TTL_SECONDS)
@@ -0,0 +1,223 @@
+"""
+Priority-aware, per-session fair scheduling of upstream calls.
+
+Every Gemini and Serper call takes a slot from its upstream's scheduler
+(gemini_scheduler, serper_scheduler) before it is sent, so at most
+max_concurrency calls per upstream are in flight in this process. When all
+slots are busy, waiting calls are granted in order of:
+
+    1. Priority class: INTERACTIVE (classifier, coordinator: the calls that
+       decide whether to ask a clarifying question), then STANDARD (planner,
+       searches, follow-ups), then REPORT (long-form generations), then
+       PREFETCH (speculative work). A call waiting longer than
+       SCHEDULER_AGING_SECONDS moves up one class per interval, so reports
+       are never starved; prefetch never moves up.
+    2. Session: within a class, sessions take turns round-robin, so a session
+       with ten queued searches doesn't delay another session's one.
+
+The session and class come from the current turn (or from background_scope
+for prefetch work), so callers only name their stage. Waiting counts
+against the turn deadline: a call that could be skipped gives up with
+TurnDeadlineExceeded when the deadline passes in the queue.
+"""
+
+import contextvars
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from .config import SCHEDULER_AGING_SECONDS, SCHEDULER_GEMINI_CONCURRENCY, SCHEDULER_SERPER_CONCURRENCY
+from .turn_context import TurnDeadlineExceeded, current_turn, time_left
+
+INTERACTIVE = 0
+STANDARD = 1
+REPORT = 2
+PREFETCH = 3
+PRIORITY_NAMES = ["interactive", "standard", "report", "prefetch"]
+
+STAGE_PRIORITY = {
+    "classifier": INTERACTIVE,
+    "coordinator": INTERACTIVE,
+    "planner": STANDARD,
+    "followups": STANDARD,
+    "personalization": STANDARD,
+    "search": STANDARD,
+    "writer": REPORT,
+    "deep_dive": REPORT,
+    "comparison": REPORT,
+}
+
+# Session id of background (prefetch) work running in this context
+_background_session: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "gradpath_background_session", default=None
+)
+
+
+@contextmanager
+def background_scope(session_id: str) -> Iterator[None]:
+    """Run the enclosed upstream calls as PREFETCH work for session_id."""
+    token = _background_session.set(session_id)
+    try:
+        yield
+    finally:
+        _background_session.reset(token)
+
+
+def background_session() -> Optional[str]:
+    """Session id of the background work running in this context, if any."""
+    return _background_session.get()
+
+
+def call_priority(stage: str) -> int:
+    """Priority class for a stage's call in the current context."""
+    if _background_session.get() is not None:
+        return PREFETCH
+    return STAGE_PRIORITY.get(stage, STANDARD)
+
+
+def call_session() -> str:
+    ctx = current_turn()
+    if ctx is not None:
+        return ctx.session_id
+    return _background_session.get() or "-"
+
+
+class _Waiter:
+    __slots__ = ("session_id", "priority", "enqueued_at", "event", "granted")
+
+    def __init__(self, session_id: str, priority: int) -> None:
+        self.session_id = session_id
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.event = threading.Event()
+        self.granted = False
+
+
+class FairScheduler:
+    """
+    Concurrency limiter for one upstream with priority classes and
+    round-robin fairness across sessions. max_concurrency <= 0 disables it.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, aging_seconds: float = SCHEDULER_AGING_SECONDS) -> None:
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.aging_seconds = aging_seconds
+        self._lock = threading.Lock()
+        self._active = 0
+        # One queue per class: session -> its waiters; key order is the rotation
+        self._queues: List["OrderedDict[str, Deque[_Waiter]]"] = [OrderedDict() for _ in PRIORITY_NAMES]
+        self._granted = [0] * len(PRIORITY_NAMES)
+        self._waited = [0.0] * len(PRIORITY_NAMES)
+        self._timeouts = 0
+
+    @contextmanager
+    def slot(self, stage: str, must_run: bool = False) -> Iterator[None]:
+        """
+        Hold one of the upstream's slots for the enclosed call.
+
+        Args:
+            stage: Stage making the call; picks the priority class.
+            must_run: Wait for a slot even past the turn deadline (the report).
+
+        Raises:
+            TurnDeadlineExceeded: if the turn's deadline passes in the queue.
+        """
+        if self.max_concurrency <= 0:
+            yield
+            return
+        self.acquire(call_priority(stage), call_session(), None if must_run else time_left())
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self, priority: int, session_id: str, timeout: Optional[float] = None) -> None:
+        waiter = _Waiter(session_id, priority)
+        with self._lock:
+            if self._active < self.max_concurrency and not self._queued_locked():
+                self._grant_locked(waiter)
+                return
+            self._queues[priority].setdefault(session_id, deque()).append(waiter)
+
+        if waiter.event.wait(None if timeout is None else max(0.0, timeout)):
+            return
+        with self._lock:
+            if waiter.granted:
+                return  # granted just as the wait timed out
+            sessions = self._queues[priority]
+            sessions[session_id].remove(waiter)
+            if not sessions[session_id]:
+                del sessions[session_id]
+            self._timeouts += 1
+        raise TurnDeadlineExceeded(
+            f"{self.name} queue: waited {time.monotonic() - waiter.enqueued_at:.1f}s for a slot"
+        )
+
+    def release(self) -> None:
+        with self._lock:
+            self._active -= 1
+            while self._active < self.max_concurrency:
+                waiter = self._next_waiter_locked()
+                if waiter is None:
+                    break
+                self._grant_locked(waiter)
+                waiter.event.set()
+
+    def _grant_locked(self, waiter: _Waiter) -> None:
+        self._active += 1
+        waiter.granted = True
+        self._granted[waiter.priority] += 1
+        self._waited[waiter.priority] += time.monotonic() - waiter.enqueued_at
+
+    def _queued_locked(self) -> int:
+        return sum(len(w) for sessions in self._queues for w in sessions.values())
+
+    def _next_waiter_locked(self) -> Optional[_Waiter]:
+        now = time.monotonic()
+        best_class: Optional[int] = None
+        best_rank = len(PRIORITY_NAMES)
+        for priority, sessions in enumerate(self._queues):
+            if not sessions:
+                continue
+            rank = priority
+            if priority != PREFETCH and self.aging_seconds > 0:
+                oldest = min(w[0].enqueued_at for w in sessions.values())
+                rank = max(INTERACTIVE, priority - int((now - oldest) / self.aging_seconds))
+            if rank < best_rank:
+                best_class, best_rank = priority, rank
+        if best_class is None:
+            return None
+
+        sessions = self._queues[best_class]
+        session_id, waiters = next(iter(sessions.items()))
+        waiter = waiters.popleft()
+        # Served: move the session to the back of the rotation
+        del sessions[session_id]
+        if waiters:
+            sessions[session_id] = waiters
+        return waiter
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "active": self._active,
+                "timeouts": self._timeouts,
+                "classes": {
+                    name: {
+                        "queued": sum(len(w) for w in self._queues[i].values()),
+                        "queued_sessions": len(self._queues[i]),
+                        "granted": self._granted[i],
+                        "avg_wait_seconds": round(self._waited[i] / self._granted[i], 4) if self._granted[i] else 0.0,
+                    }
+                    for i, name in enumerate(PRIORITY_NAMES)
+                },
+            }
+
+
+# Global schedulers (one process)
+gemini_scheduler = FairScheduler("gemini", SCHEDULER_GEMINI_CONCURRENCY)
+serper_scheduler = FairScheduler("serper", SCHEDULER_SERPER_CONCURRENCY)
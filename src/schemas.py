@@ -0,0 +1,89 @@
+"""
+Response schemas for the stages that must return JSON.
+
+These models are sent to Gemini as the response schema (JSON mode) and used
+to validate what comes back. Every field has a default so a response that
+omits an optional part still validates; types are kept to what Gemini's
+schema subset supports (strings, booleans, lists and nested objects).
+"""
+
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, field_validator
+
+
+class QueryClassification(BaseModel):
+    query_type: Literal["deep_dive", "compare", "new_search"] = "new_search"
+    universities: List[str] = []
+    comparison_aspects: List[str] = []
+    notes: Optional[str] = None
+
+
+class ExtractedInfo(BaseModel):
+    field: Optional[str] = None
+    degree_level: Optional[str] = None
+    location: Optional[str] = None
+    gpa: Optional[str] = None
+    funding_preference: Optional[str] = None
+    other_notes: Optional[str] = None
+
+
+class CoordinatorDecision(BaseModel):
+    needs_more_info: bool
+    missing_info: List[str] = []
+    questions_to_ask: Optional[str] = None
+    ready_to_search: bool
+    extracted_info: ExtractedInfo = ExtractedInfo()
+
+
+class ProfileUpdates(BaseModel):
+    gpa: Optional[str] = None
+    gre: Optional[str] = None
+    ielts: Optional[str] = None
+    toefl: Optional[str] = None
+    field_of_study: Optional[str] = None
+    degree_level: Optional[str] = None
+    preferred_countries: Optional[str] = None
+    preferred_cities: Optional[str] = None
+    funding_needs: Optional[str] = None
+    intake_term: Optional[str] = None
+    budget_notes: Optional[str] = None
+    extra_notes: Optional[str] = None
+
+
+class MinimumRequirements(BaseModel):
+    gpa: Optional[str] = None
+    tests: List[str] = []
+
+
+class PlanFilters(BaseModel):
+    field_of_study: Optional[str] = None
+    degree_type: List[str] = []
+    countries_or_regions: List[str] = []
+    cities_or_states: List[str] = []
+    funding_priority: List[str] = []
+    budget_notes: Optional[str] = None
+    target_intake_terms: List[str] = []
+    minimum_requirements: MinimumRequirements = MinimumRequirements()
+    other_constraints: List[str] = []
+
+
+class SearchPlan(BaseModel):
+    high_level_goal: Optional[str] = None
+    profile_updates: ProfileUpdates = ProfileUpdates()
+    filters: PlanFilters = PlanFilters()
+    search_queries: List[str]
+    notes_for_search: Optional[str] = None
+
+    @field_validator("search_queries")
+    @classmethod
+    def _non_empty_queries(cls, queries: List[str]) -> List[str]:
+        cleaned = [q.strip() for q in queries if q and q.strip()]
+        if not cleaned:
+            raise ValueError("search_queries must contain at least one non-empty query")
+        return cleaned
+
+
+class FollowUpQuestions(BaseModel):
+    follow_up_questions: List[str]
+    reasoning: Optional[str] = None
@@ -0,0 +1,314 @@
+"""
+HTTP service around the GradPath pipeline.
+
+Usage:
+    python -m src.server            # or: uvicorn src.server:app --port 8080
+
+Endpoints:
+    GET  /health                     liveness/readiness (503 while draining), upstream queues
+    POST /chat                       {"message": "..."} -> full response as JSON
+    POST /chat/stream                same, as server-sent events (progress, response)
+    GET  /metrics/memory             RSS, shared caches, largest sessions and, with
+                                     MEMTRACK_MODE on, per-stage allocation peaks
+    GET  /sessions/{session_id}/usage  token/search totals and recent turns
+    GET  /sessions/{session_id}/memory  estimated resident memory of the session
+    GET  /sessions/{session_id}/snapshot  binary session snapshot (see snapshot.py)
+    PUT  /sessions/{session_id}/snapshot  restore a snapshot, e.g. from another replica
+
+The session is identified by the X-Session-Id header; when it is missing a
+new id is generated and returned in the same header. Profile memory lives in
+this process, so when running several replicas behind a load balancer, route
+on X-Session-Id (sticky sessions).
+
+Pipeline runs happen on a thread pool, at most SERVER_MAX_CONCURRENCY at once;
+a request that cannot get a slot within SERVER_QUEUE_TIMEOUT_SECONDS gets a
+503 with Retry-After. One message per session is processed at a time. On
+shutdown the service stops taking new messages, reports 503 on /health and
+gives in-flight turns SERVER_SHUTDOWN_GRACE_SECONDS to finish.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+import uvicorn
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+
+from .config import (
+    SERVER_HOST,
+    SERVER_MAX_CONCURRENCY,
+    SERVER_PORT,
+    SERVER_QUEUE_TIMEOUT_SECONDS,
+    SERVER_SHUTDOWN_GRACE_SECONDS,
+)
+from .jobs import PipelineJob, describe_stage, start_pipeline_job
+from .memory import profile_store
+from .memtrack import memory_report, session_memory
+from .prefetch import prefetcher
+from .scheduler import gemini_scheduler, serper_scheduler
+from .snapshot import SnapshotError, capture_session, decode_snapshot, encode_snapshot, restore_session
+from .usage import usage_ledger
+
+SESSION_HEADER = "X-Session-Id"
+SNAPSHOT_MEDIA_TYPE = "application/vnd.gradpath.snapshot"
+# How often a stream checks its job for new progress events
+STREAM_POLL_SECONDS = 0.1
+# Idle streams send an SSE comment this often so proxies keep them open
+STREAM_KEEPALIVE_SECONDS = 15.0
+RETRY_AFTER_SECONDS = 5
+
+
+class ChatRequest(BaseModel):
+    message: str = Field(min_length=1)
+
+
+class ServiceState:
+    """
+    Worker pool, concurrency slots and in-flight jobs of one server process.
+
+    Created inside the app lifespan so the semaphore binds to the running
+    event loop.
+    """
+
+    def __init__(self, max_concurrency: int) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="gradpath-http")
+        self.slots = asyncio.Semaphore(self.max_concurrency)
+        self.busy_sessions: Set[str] = set()
+        self.jobs: Set[PipelineJob] = set()
+        self.draining = False
+        self.started_at = time.time()
+
+    async def start_job(self, session_id: str, message: str) -> PipelineJob:
+        """
+        Reserve the session and a concurrency slot, then start the pipeline.
+
+        Raises:
+            HTTPException: 503 while draining or when no slot frees up in
+                time, 409 when the session already has a message in flight.
+        """
+        if self.draining:
+            raise HTTPException(status_code=503, detail="Server is shutting down")
+        if session_id in self.busy_sessions:
+            raise HTTPException(
+                status_code=409,
+                detail="A previous message for this session is still being processed",
+            )
+
+        # Reserve the session before waiting so a second request can't slip in
+        self.busy_sessions.add(session_id)
+        try:
+            await asyncio.wait_for(self.slots.acquire(), timeout=SERVER_QUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            self.busy_sessions.discard(session_id)
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+            )
+
+        loop = asyncio.get_running_loop()
+        job = start_pipeline_job(self.pool, message, session_id, profile_store)
+        self.jobs.add(job)
+
+        def _finished(finished_job: PipelineJob) -> None:
+            # Runs on the worker thread; hand the bookkeeping back to the loop
+            try:
+                loop.call_soon_threadsafe(self._release, finished_job)
+            except RuntimeError:
+                pass  # loop already closed during shutdown
+
+        job.add_done_callback(_finished)
+        return job
+
+    def _release(self, job: PipelineJob) -> None:
+        self.jobs.discard(job)
+        self.busy_sessions.discard(job.session_id)
+        self.slots.release()
+
+    async def drain(self, grace_seconds: float) -> None:
+        """Stop accepting messages and wait for in-flight turns to finish."""
+        self.draining = True
+        if self.jobs:
+            print(f"[INFO] Waiting up to {grace_seconds:.0f}s for {len(self.jobs)} in-flight turns")
+            waiters = [asyncio.ensure_future(job.wait()) for job in list(self.jobs)]
+            _, pending = await asyncio.wait(waiters, timeout=grace_seconds)
+            if pending:
+                print(f"[WARN] {len(pending)} turns still running at shutdown; abandoning them")
+            for waiter in waiters:
+                if waiter.done() and not waiter.cancelled():
+                    waiter.exception()  # already logged by the pipeline; don't warn again
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        prefetcher.shutdown(wait=False)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    app.state.service = ServiceState(SERVER_MAX_CONCURRENCY)
+    print(f"[INFO] GradPath HTTP service ready (max concurrency {SERVER_MAX_CONCURRENCY})")
+    yield
+    print("[INFO] Shutting down GradPath HTTP service")
+    await app.state.service.drain(SERVER_SHUTDOWN_GRACE_SECONDS)
+
+
+app = FastAPI(title="GradPath", lifespan=lifespan)
+
+
+def _service(request: Request) -> ServiceState:
+    return request.app.state.service
+
+
+def _session_id(header_value: Optional[str]) -> str:
+    session_id = (header_value or "").strip()
+    return session_id or str(uuid.uuid4())
+
+
+def _last_turn_usage(session_id: str) -> Optional[Dict[str, Any]]:
+    turns = usage_ledger.turns(session_id)
+    return turns[-1] if turns else None
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.get("/health")
+async def health(request: Request) -> JSONResponse:
+    service = _service(request)
+    body = {
+        "status": "draining" if service.draining else "ok",
+        "in_flight": len(service.jobs),
+        "max_concurrency": service.max_concurrency,
+        "uptime_seconds": round(time.time() - service.started_at, 1),
+        "upstream": {"gemini": gemini_scheduler.stats(), "serper": serper_scheduler.stats()},
+    }
+    return JSONResponse(body, status_code=503 if service.draining else 200)
+
+
+@app.post("/chat")
+async def chat(
+    body: ChatRequest,
+    request: Request,
+    x_session_id: Optional[str] = Header(default=None),
+) -> JSONResponse:
+    session_id = _session_id(x_session_id)
+    job = await _service(request).start_job(session_id, body.message)
+    try:
+        response = await job.wait()
+    except Exception as e:
+        print(f"[ERROR] Pipeline failed for session {session_id}: {e}")
+        raise HTTPException(status_code=500, detail="The pipeline failed to answer this message")
+
+    job.poll_events()
+    return JSONResponse(
+        {
+            "session_id": session_id,
+            "response": response,
+            "stages": [stage for stage, _ in job.history],
+            "usage": _last_turn_usage(session_id),
+        },
+        headers={SESSION_HEADER: session_id},
+    )
+
+
+async def _stream_job(job: PipelineJob) -> AsyncIterator[str]:
+    """Relay a job's progress events, then its response, as SSE."""
+    last_sent = time.monotonic()
+    while True:
+        finished = job.done()
+        for stage, info in job.poll_events():
+            yield _sse("progress", {"stage": stage, "message": describe_stage(stage, info), "info": info})
+            last_sent = time.monotonic()
+        if finished:
+            break
+        if time.monotonic() - last_sent >= STREAM_KEEPALIVE_SECONDS:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        await asyncio.sleep(STREAM_POLL_SECONDS)
+
+    try:
+        response = job.result()
+    except Exception as e:
+        print(f"[ERROR] Pipeline failed for session {job.session_id}: {e}")
+        yield _sse("error", {"session_id": job.session_id, "detail": "The pipeline failed to answer this message"})
+        return
+    yield _sse(
+        "response",
+        {"session_id": job.session_id, "response": response, "usage": _last_turn_usage(job.session_id)},
+    )
+
+
+@app.post("/chat/stream")
+async def chat_stream(
+    body: ChatRequest,
+    request: Request,
+    x_session_id: Optional[str] = Header(default=None),
+) -> StreamingResponse:
+    session_id = _session_id(x_session_id)
+    # Slot/session errors surface as normal HTTP errors before the stream opens
+    job = await _service(request).start_job(session_id, body.message)
+    return StreamingResponse(
+        _stream_job(job),
+        media_type="text/event-stream",
+        headers={
+            SESSION_HEADER: session_id,
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # nginx: don't buffer the stream
+        },
+    )
+
+
+@app.get("/sessions/{session_id}/usage")
+async def session_usage(session_id: str) -> Dict[str, Any]:
+    return {
+        "totals": usage_ledger.session_totals(session_id),
+        "turns": usage_ledger.turns(session_id),
+    }
+
+
+@app.get("/sessions/{session_id}/memory")
+async def session_memory_usage(session_id: str) -> Dict[str, Any]:
+    return session_memory(session_id, profile_store)
+
+
+@app.get("/metrics/memory")
+async def metrics_memory(top: int = 10) -> Dict[str, Any]:
+    # Walks every session and cache entry; meant for occasional scraping
+    return await asyncio.get_running_loop().run_in_executor(None, memory_report, profile_store, top)
+
+
+@app.get("/sessions/{session_id}/snapshot")
+async def get_snapshot(session_id: str) -> Response:
+    data = encode_snapshot(capture_session(session_id, profile_store))
+    return Response(content=data, media_type=SNAPSHOT_MEDIA_TYPE)
+
+
+@app.put("/sessions/{session_id}/snapshot")
+async def put_snapshot(session_id: str, request: Request) -> Dict[str, Any]:
+    if session_id in _service(request).busy_sessions:
+        raise HTTPException(status_code=409, detail="A message for this session is still being processed")
+    try:
+        snapshot = decode_snapshot(await request.body())
+    except SnapshotError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid snapshot: {e}")
+    restore_session(snapshot, profile_store, session_id=session_id)
+    return {"session_id": session_id, "candidates": len(snapshot.candidates), "search_results": len(snapshot.search_results)}
+
+
+def main() -> None:
+    uvicorn.run(
+        app,
+        host=SERVER_HOST,
+        port=SERVER_PORT,
+        timeout_graceful_shutdown=int(SERVER_SHUTDOWN_GRACE_SECONDS),
+    )
+
+
+if __name__ == "__main__":
+    main()
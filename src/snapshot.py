@@ -0,0 +1,240 @@
+"""
+Compact, versioned binary snapshots of a session.
+
+A snapshot holds everything needed to pick a session up elsewhere without
+re-running its searches: the profile, the last search plan and ranked
+candidate pool, the conversation context (conversation.py), the chat
+messages (when a ChatHistoryStore is given), and the cached raw Serper
+results behind the plan's queries.
+
+Layout (big-endian):
+
+    offset  size  field
+    0       4     magic b"GPSS"
+    4       1     format version (SNAPSHOT_VERSION)
+    5       1     flags (bit 0: body is zlib-compressed)
+    6       2     reserved (0)
+    8       4     body length in bytes
+    12      4     CRC-32 of the stored body
+    16      4     CRC-32 of the decoded JSON
+    20      ...   body: UTF-8 JSON, zlib-compressed unless flag 0 is clear
+
+Both checksums are verified on decode; a snapshot from a newer format
+version is rejected rather than half-read. Version 2 added the
+conversation context; version 1 snapshots restore without one. Version 3
+stores each search result's remaining TTL at capture time; older snapshots
+fall back to the TTL left since the snapshot was taken.
+
+Usage:
+    data = encode_snapshot(capture_session(session_id))
+    restore_session(decode_snapshot(data))
+    python -m src.snapshot inspect session.gpss
+"""
+
+import argparse
+import json
+import os
+import struct
+import time
+import zlib
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .chat_history import DEFAULT_TITLE, ChatHistoryStore
+from .config import SEARCH_CACHE_TTL_SECONDS, SNAPSHOT_COMPRESSION_LEVEL, SNAPSHOT_MAX_MESSAGES
+from .conversation import ConversationContext
+from .memory import InMemoryProfileStore, profile_store
+from .tools.search import search_cache
+
+SNAPSHOT_MAGIC = b"GPSS"
+SNAPSHOT_VERSION = 3
+FLAG_ZLIB = 0x01
+_HEADER = struct.Struct(">4sBBHIII")
+
+
+class SnapshotError(Exception):
+    """A snapshot is corrupt, truncated or from an unsupported version."""
+
+
+@dataclass
+class SessionSnapshot:
+    session_id: str
+    created_at: float = field(default_factory=time.time)
+    title: Optional[str] = None
+    profile: Dict[str, Any] = field(default_factory=dict)
+    last_plan: Optional[Dict[str, Any]] = None
+    candidates: List[Dict[str, Any]] = field(default_factory=list)
+    conversation: Optional[Dict[str, Any]] = None  # asdict(ConversationContext)
+    messages: List[Dict[str, str]] = field(default_factory=list)  # {"role", "content"}
+    # [search cache key as a list, raw Serper JSON, seconds of TTL left when
+    # captured] for the plan's queries
+    search_results: List[List[Any]] = field(default_factory=list)
+
+
+def encode_snapshot(snapshot: SessionSnapshot, compress: bool = True) -> bytes:
+    """Serialize a snapshot to the binary format."""
+    raw = json.dumps(asdict(snapshot), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    body = zlib.compress(raw, SNAPSHOT_COMPRESSION_LEVEL) if compress else raw
+    header = _HEADER.pack(
+        SNAPSHOT_MAGIC,
+        SNAPSHOT_VERSION,
+        FLAG_ZLIB if compress else 0,
+        0,
+        len(body),
+        zlib.crc32(body),
+        zlib.crc32(raw),
+    )
+    return header + body
+
+
+def decode_snapshot(data: bytes) -> SessionSnapshot:
+    """
+    Parse and verify a binary snapshot.
+
+    Raises:
+        SnapshotError: on a bad magic, unknown version, length or checksum
+            mismatch, or a body that doesn't decode.
+    """
+    if len(data) < _HEADER.size:
+        raise SnapshotError(f"Snapshot too short ({len(data)} bytes)")
+    magic, version, flags, _, length, body_crc, raw_crc = _HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC:
+        raise SnapshotError("Not a GradPath session snapshot")
+    if version > SNAPSHOT_VERSION:
+        raise SnapshotError(f"Snapshot version {version} is newer than supported ({SNAPSHOT_VERSION})")
+
+    body = data[_HEADER.size:]
+    if len(body) != length:
+        raise SnapshotError(f"Snapshot body is {len(body)} bytes, header says {length}")
+    if zlib.crc32(body) != body_crc:
+        raise SnapshotError("Snapshot body checksum mismatch")
+    try:
+        raw = zlib.decompress(body) if flags & FLAG_ZLIB else body
+    except zlib.error as e:
+        raise SnapshotError(f"Snapshot body does not decompress: {e}") from e
+    if zlib.crc32(raw) != raw_crc:
+        raise SnapshotError("Snapshot content checksum mismatch")
+
+    try:
+        fields = json.loads(raw.decode("utf-8"))
+        return SessionSnapshot(**fields)
+    except (UnicodeDecodeError, json.JSONDecodeError, TypeError) as e:
+        raise SnapshotError(f"Snapshot content is malformed: {e}") from e
+
+
+def capture_session(
+    session_id: str,
+    store: InMemoryProfileStore = profile_store,
+    history: Optional[ChatHistoryStore] = None,
+    max_messages: int = SNAPSHOT_MAX_MESSAGES,
+) -> SessionSnapshot:
+    """Collect a session's state from the profile store, search cache and chat history."""
+    snapshot = SessionSnapshot(session_id=session_id, profile=store.as_dict(session_id))
+
+    conversation = store.session_state(session_id)["conversation"]
+    if conversation is not None:
+        snapshot.conversation = asdict(conversation)
+
+    last = store.last_results(session_id)
+    if last is not None:
+        snapshot.last_plan = last["plan"]
+        snapshot.candidates = last["candidates"]
+        queries = {" ".join(q.lower().split()) for q in last["plan"].get("search_queries") or []}
+        for key in search_cache.keys():
+            if key[0] in queries:
+                raw = search_cache.get(key)
+                ttl_left = search_cache.ttl_left(key)
+                if raw is not None and ttl_left is not None:
+                    snapshot.search_results.append([list(key), raw, round(ttl_left, 1)])
+
+    if history is not None:
+        session = history.get_session(session_id)
+        snapshot.title = session["title"] if session else None
+        snapshot.messages = [
+            {"role": m["role"], "content": m["content"]}
+            for m in history.get_messages(session_id, limit=max_messages)
+        ]
+    return snapshot
+
+
+def restore_session(
+    snapshot: SessionSnapshot,
+    store: InMemoryProfileStore = profile_store,
+    history: Optional[ChatHistoryStore] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    """
+    Load a snapshot into this process, optionally under a new session id.
+
+    Search results go back into the shared search cache for whatever is
+    left of their own TTL (what was left at capture, minus the time since);
+    expired ones are dropped. Messages are only restored
+    into a history store that doesn't already have the session.
+
+    Returns:
+        The session id the state was restored under.
+    """
+    session_id = session_id or snapshot.session_id
+    store.forget(session_id)
+    store.update_profile(session_id, **snapshot.profile)
+    if snapshot.last_plan is not None:
+        store.set_last_results(session_id, snapshot.last_plan, snapshot.candidates)
+    if snapshot.conversation is not None:
+        store.set_conversation(session_id, ConversationContext.from_dict(snapshot.conversation))
+
+    age = time.time() - snapshot.created_at
+    for entry in snapshot.search_results:
+        key, raw = entry[0], entry[1]
+        # Version 2 entries have no TTL of their own: assume a fresh entry at capture
+        ttl_left = (entry[2] if len(entry) > 2 else SEARCH_CACHE_TTL_SECONDS) - age
+        if ttl_left > 0:
+            search_cache.set(tuple(key), raw, ttl_seconds=ttl_left)
+
+    if history is not None and history.get_session(session_id) is None:
+        history.create_session(session_id, snapshot.title or DEFAULT_TITLE)
+        for message in snapshot.messages:
+            history.append_message(session_id, message["role"], message["content"])
+
+    return session_id
+
+
+def save_snapshot(path: str, snapshot: SessionSnapshot) -> int:
+    """Write a snapshot atomically; returns its size in bytes."""
+    data = encode_snapshot(snapshot)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+def load_snapshot(path: str) -> SessionSnapshot:
+    with open(path, "rb") as f:
+        return decode_snapshot(f.read())
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Inspect GradPath session snapshots.")
+    parser.add_argument("command", choices=["inspect"])
+    parser.add_argument("path")
+    args = parser.parse_args(argv)
+
+    with open(args.path, "rb") as f:
+        data = f.read()
+    snapshot = decode_snapshot(data)
+    print(json.dumps({
+        "session_id": snapshot.session_id,
+        "version": data[4],
+        "bytes": len(data),
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(snapshot.created_at)),
+        "profile": {k: v for k, v in snapshot.profile.items() if v},
+        "search_queries": (snapshot.last_plan or {}).get("search_queries", []),
+        "candidates": len(snapshot.candidates),
+        "conversation_turns": (snapshot.conversation or {}).get("turns", 0),
+        "messages": len(snapshot.messages),
+        "search_results": len(snapshot.search_results),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
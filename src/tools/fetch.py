@@ -0,0 +1,471 @@
+"""
+Concurrent page fetcher and text extractor for enriching search snippets.
+
+Serper snippets are ~150 characters; deep dives need the admissions,
+funding and deadline sections of the program pages themselves. PageFetcher
+downloads a handful of URLs on a bounded pool while staying polite:
+
+- robots.txt is honoured per origin (cached), including Crawl-delay
+- at most PAGE_FETCH_PER_DOMAIN requests in flight per domain, spaced by
+  PAGE_FETCH_DOMAIN_DELAY seconds
+- bodies are read up to PAGE_FETCH_MAX_BYTES and non-HTML content is skipped
+
+Pages are reduced to plain text with section headings kept ("## ..."), so
+target_sections can pick out the parts a report needs. Extracted text is
+stored in a content-addressed disk cache (identical pages reached through
+different URLs are stored once) with a small per-URL index.
+
+For local testing, the Serper stub also serves fixture pages and robots.txt:
+    python -m src.tools.serper_stub --port 8765 --link-pages
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from html.parser import HTMLParser
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+from ..cache import TTLCache
+from ..config import (
+    PAGE_CACHE_DIR,
+    PAGE_CACHE_TTL_SECONDS,
+    PAGE_FETCH_DOMAIN_DELAY,
+    PAGE_FETCH_MAX_BYTES,
+    PAGE_FETCH_PER_DOMAIN,
+    PAGE_FETCH_TIMEOUT,
+    PAGE_FETCH_WORKERS,
+)
+from ..turn_context import submit_in_context
+
+USER_AGENT = "GradPathBot/1.0 (+https://github.com/Desae/aseda-addai-deseh)"
+ROBOTS_TTL_SECONDS = 6 * 60 * 60
+READ_CHUNK_BYTES = 16 * 1024
+
+# ---------------------------------------------------------------------------
+# HTML -> text
+# ---------------------------------------------------------------------------
+
+SKIP_TAGS = {"script", "style", "noscript", "svg", "nav", "footer", "header", "form", "iframe", "template", "aside"}
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "dl", "dt", "dd",
+    "table", "tr", "br", "blockquote", "pre",
+}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.title_parts: List[str] = []
+        self._skip_depth = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in HEADING_TAGS:
+            self.parts.append("\n## ")
+        elif tag in BLOCK_TAGS or tag == "td":
+            self.parts.append("\n" if tag != "td" else " | ")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "title":
+            self._in_title = False
+        elif tag in HEADING_TAGS or tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data: str) -> None:
+        if self._in_title:
+            self.title_parts.append(data)
+        elif not self._skip_depth:
+            # Source line breaks are not text structure; block tags are
+            self.parts.append(_WHITESPACE_RE.sub(" ", data))
+
+
+def html_to_text(html: str) -> Tuple[str, str]:
+    """
+    Reduce an HTML page to (title, text).
+
+    Scripts, styles and page chrome (nav, header, footer, forms) are dropped;
+    block elements become line breaks and headings become "## " lines.
+    """
+    parser = _TextExtractor()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception as e:
+        # html.parser is lenient, but keep whatever was extracted on odd input
+        print(f"[WARN] HTML parse error, using partial text: {e}")
+
+    lines = []
+    for raw in "".join(parser.parts).split("\n"):
+        line = " ".join(raw.split()).strip(" |")
+        if line and line != "##":
+            lines.append(line)
+    title = " ".join("".join(parser.title_parts).split())
+    return title, "\n".join(lines)
+
+
+# ---------------------------------------------------------------------------
+# Section targeting
+# ---------------------------------------------------------------------------
+
+SECTION_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "admissions": (
+        "admission", "requirement", "gpa", "gre", "toefl", "ielts", "prerequisite",
+        "transcript", "recommendation", "statement of purpose", "eligib",
+    ),
+    "funding": (
+        "funding", "assistantship", "fellowship", "stipend", "scholarship", "tuition",
+        "financial", "waiver", "cost", "application fee",
+    ),
+    "deadlines": ("deadline", "due", "priority date", "apply by", "intake", "decision", "timeline"),
+}
+DEFAULT_TOPICS = ("admissions", "funding", "deadlines")
+# Keywords match at word starts ("gre" must not hit "degree")
+_TOPIC_PATTERNS = {
+    topic: re.compile(r"\b(?:%s)" % "|".join(re.escape(k) for k in keywords))
+    for topic, keywords in SECTION_KEYWORDS.items()
+}
+
+
+def split_sections(text: str) -> List[Tuple[str, str]]:
+    """
+    Split extracted text into (heading, body) sections.
+
+    Pages without headings are split into paragraphs with empty headings.
+    """
+    if "\n## " not in "\n" + text:
+        return [("", line) for line in text.split("\n") if line]
+
+    sections: List[Tuple[str, str]] = []
+    heading, body = "", []
+    for line in text.split("\n"):
+        if line.startswith("## "):
+            if heading or body:
+                sections.append((heading, "\n".join(body)))
+            heading, body = line[3:], []
+        else:
+            body.append(line)
+    if heading or body:
+        sections.append((heading, "\n".join(body)))
+    return sections
+
+
+def _keyword_hits(text: str, patterns: Sequence["re.Pattern[str]"]) -> int:
+    text = text.lower()
+    return sum(min(len(p.findall(text)), 5) for p in patterns)
+
+
+def target_sections(text: str, topics: Sequence[str] = DEFAULT_TOPICS, max_chars: int = 1500) -> str:
+    """
+    Keep the sections of a page most relevant to topics, within max_chars.
+
+    Sections are scored by keyword hits (heading hits count triple), picked
+    best-first and returned in page order. Falls back to the start of the
+    page when nothing matches.
+    """
+    patterns = [_TOPIC_PATTERNS[t] for t in topics if t in _TOPIC_PATTERNS]
+    sections = split_sections(text)
+    scored = []
+    for index, (heading, body) in enumerate(sections):
+        score = 3 * _keyword_hits(heading, patterns) + _keyword_hits(body, patterns)
+        if score > 0:
+            scored.append((score, index))
+    if not scored:
+        return text[:max_chars]
+
+    chosen: List[int] = []
+    used = 0
+    for _, index in sorted(scored, key=lambda s: (-s[0], s[1])):
+        heading, body = sections[index]
+        size = len(heading) + len(body) + 4
+        if used + size > max_chars and chosen:
+            continue
+        chosen.append(index)
+        used += size
+        if used >= max_chars:
+            break
+
+    parts = []
+    for index in sorted(chosen):
+        heading, body = sections[index]
+        parts.append(f"## {heading}\n{body}" if heading else body)
+    return "\n".join(parts)[:max_chars]
+
+
+# ---------------------------------------------------------------------------
+# Content-addressed disk cache
+# ---------------------------------------------------------------------------
+
+@dataclass
+class FetchedPage:
+    url: str
+    final_url: str
+    title: str
+    text: str
+    content_hash: str = ""
+    fetched_at: float = 0.0
+    from_cache: bool = False
+
+
+def _sha256(data: str) -> str:
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def _write_atomic(path: str, data: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class PageCache:
+    """
+    Extracted page text on disk.
+
+    blobs/<hh>/<sha256>.txt holds each distinct text once; urls/<sha256(url)>.json
+    maps a URL to its blob plus title and fetch time.
+    """
+
+    def __init__(self, root: str, ttl_seconds: int) -> None:
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+
+    def _index_path(self, url: str) -> str:
+        return os.path.join(self.root, "urls", f"{_sha256(url)}.json")
+
+    def _blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.root, "blobs", content_hash[:2], f"{content_hash}.txt")
+
+    def get(self, url: str) -> Optional[FetchedPage]:
+        try:
+            with open(self._index_path(url), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if time.time() - entry["fetched_at"] > self.ttl_seconds:
+                return None
+            with open(self._blob_path(entry["content_hash"]), "r", encoding="utf-8") as f:
+                text = f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        return FetchedPage(text=text, from_cache=True, **entry)
+
+    def put(self, page: FetchedPage) -> None:
+        try:
+            blob = self._blob_path(page.content_hash)
+            if not os.path.exists(blob):
+                _write_atomic(blob, page.text)
+            entry = asdict(page)
+            entry.pop("text")
+            entry.pop("from_cache")
+            _write_atomic(self._index_path(page.url), json.dumps(entry))
+        except OSError as e:
+            print(f"[WARN] Could not write page cache for {page.url}: {e}")
+
+
+# ---------------------------------------------------------------------------
+# Fetcher
+# ---------------------------------------------------------------------------
+
+class _DomainGate:
+    """Per-domain concurrency limit plus minimum spacing between request starts."""
+
+    def __init__(self, limit: int, delay_seconds: float) -> None:
+        self.slots = threading.BoundedSemaphore(max(1, limit))
+        self.delay_seconds = delay_seconds
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    @contextmanager
+    def hold(self) -> Iterator[None]:
+        with self.slots:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start)
+                self._next_start = start + self.delay_seconds
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+
+class PageFetcher:
+    """
+    Polite, bounded-concurrency fetcher returning extracted page text.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = PAGE_FETCH_WORKERS,
+        per_domain_limit: int = PAGE_FETCH_PER_DOMAIN,
+        domain_delay_seconds: float = PAGE_FETCH_DOMAIN_DELAY,
+        max_bytes: int = PAGE_FETCH_MAX_BYTES,
+        timeout_seconds: float = PAGE_FETCH_TIMEOUT,
+        cache: Optional[PageCache] = None,
+    ) -> None:
+        self.per_domain_limit = per_domain_limit
+        self.domain_delay_seconds = domain_delay_seconds
+        self.max_bytes = max_bytes
+        self.timeout_seconds = timeout_seconds
+        self.cache = cache
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+        self._lock = threading.Lock()
+        self._gates: Dict[str, _DomainGate] = {}
+        self._robots = TTLCache(maxsize=512, ttl_seconds=ROBOTS_TTL_SECONDS)
+        self._robots_locks: Dict[str, threading.Lock] = {}
+
+    def _gate(self, domain: str, crawl_delay: Optional[float] = None) -> _DomainGate:
+        with self._lock:
+            gate = self._gates.get(domain)
+            if gate is None:
+                gate = _DomainGate(self.per_domain_limit, self.domain_delay_seconds)
+                self._gates[domain] = gate
+            if crawl_delay and crawl_delay > gate.delay_seconds:
+                gate.delay_seconds = float(crawl_delay)
+            return gate
+
+    def _robots_for(self, scheme: str, netloc: str) -> RobotFileParser:
+        origin = f"{scheme}://{netloc}"
+        parser = self._robots.get(origin)
+        if parser is not None:
+            return parser
+        with self._lock:
+            origin_lock = self._robots_locks.setdefault(origin, threading.Lock())
+        # One robots.txt request per origin, even when its pages are fetched concurrently
+        with origin_lock:
+            parser = self._robots.get(origin)
+            if parser is None:
+                parser = self._fetch_robots(origin)
+                self._robots.set(origin, parser)
+            return parser
+
+    def _fetch_robots(self, origin: str) -> RobotFileParser:
+        parser = RobotFileParser(f"{origin}/robots.txt")
+        try:
+            resp = requests.get(
+                f"{origin}/robots.txt",
+                headers={"User-Agent": USER_AGENT},
+                timeout=self.timeout_seconds,
+            )
+            if resp.status_code in (401, 403):
+                parser.disallow_all = True
+            elif resp.status_code >= 400:
+                parser.allow_all = True
+            else:
+                parser.parse(resp.text.splitlines())
+        except requests.RequestException:
+            # The page request itself will fail if the host is unreachable
+            parser.allow_all = True
+        return parser
+
+    def _read_capped(self, resp: requests.Response) -> bytes:
+        chunks: List[bytes] = []
+        size = 0
+        for chunk in resp.iter_content(READ_CHUNK_BYTES):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= self.max_bytes:
+                break
+        return b"".join(chunks)[: self.max_bytes]
+
+    def fetch(self, url: str) -> Optional[FetchedPage]:
+        """Fetch one URL; None when disallowed, not HTML, or failed."""
+        if self.cache is not None:
+            cached = self.cache.get(url)
+            if cached is not None:
+                return cached
+
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or not parsed.netloc:
+            return None
+
+        robots = self._robots_for(parsed.scheme, parsed.netloc)
+        if not robots.can_fetch(USER_AGENT, url):
+            print(f"[DEBUG] robots.txt disallows {url}")
+            return None
+
+        crawl_delay = robots.crawl_delay(USER_AGENT)
+        try:
+            with self._gate(parsed.netloc.lower(), crawl_delay).hold():
+                with requests.get(
+                    url,
+                    headers={"User-Agent": USER_AGENT, "Accept": "text/html,text/plain;q=0.9"},
+                    timeout=self.timeout_seconds,
+                    stream=True,
+                ) as resp:
+                    if resp.status_code != 200:
+                        print(f"[DEBUG] Page fetch {resp.status_code} for {url}")
+                        return None
+                    content_type = resp.headers.get("Content-Type", "").lower()
+                    if content_type and "html" not in content_type and "text/plain" not in content_type:
+                        print(f"[DEBUG] Skipping non-HTML page ({content_type}): {url}")
+                        return None
+                    body = self._read_capped(resp)
+                    final_url = resp.url
+                    encoding = resp.encoding if "charset=" in content_type else "utf-8"
+        except requests.RequestException as e:
+            print(f"[WARN] Page fetch failed for {url}: {e}")
+            return None
+
+        decoded = body.decode(encoding or "utf-8", errors="replace")
+        if "text/plain" in content_type:
+            title, text = "", decoded
+        else:
+            title, text = html_to_text(decoded)
+        if not text:
+            return None
+
+        page = FetchedPage(
+            url=url,
+            final_url=final_url,
+            title=title,
+            text=text,
+            content_hash=_sha256(text),
+            fetched_at=time.time(),
+        )
+        if self.cache is not None:
+            self.cache.put(page)
+        return page
+
+    def fetch_many(self, urls: List[str], timeout_seconds: Optional[float] = None) -> List[Optional[FetchedPage]]:
+        """
+        Fetch several URLs concurrently.
+
+        Pages not done within timeout_seconds come back as None; they keep
+        downloading in the background and land in the cache for next time.
+
+        Returns:
+            One entry per input URL, in input order.
+        """
+        unique = list(dict.fromkeys(urls))
+        futures = {url: submit_in_context(self._pool, self._fetch_logged, url) for url in unique}
+        done, _ = wait(futures.values(), timeout=timeout_seconds)
+        pages = {url: (f.result() if f in done else None) for url, f in futures.items()}
+        return [pages[url] for url in urls]
+
+    def _fetch_logged(self, url: str) -> Optional[FetchedPage]:
+        try:
+            return self.fetch(url)
+        except Exception as e:
+            print(f"[WARN] Unexpected error fetching {url}: {e}")
+            return None
+
+
+# Global fetcher (one process); shares domain politeness across sessions
+page_fetcher = PageFetcher(cache=PageCache(PAGE_CACHE_DIR, PAGE_CACHE_TTL_SECONDS) if PAGE_CACHE_DIR else None)
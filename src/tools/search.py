@@ -1,15 +1,142 @@
 import json
+import re
 from typing import Dict, Any, List, Optional
 import requests
 from urllib.parse import urlparse
 
-from ..config import SERPER_API_KEY, SERPER_SEARCH_URL
+from ..cache import TTLCache
+from ..config import (
+    SERPER_API_KEY,
+    SERPER_SEARCH_URL,
+    SERPER_BATCH_MAX_QUERIES,
+    SEARCH_CACHE_TTL_SECONDS,
+    SEARCH_CACHE_MAX_ENTRIES,
+    ZERO_RESULT_CACHE_TTL_SECONDS,
+    ZERO_RESULT_CACHE_MAX_ENTRIES,
+    SERPER_TIMEOUT_SECONDS,
+    SERPER_BATCH_TIMEOUT_SECONDS,
+    DEADLINE_REPORT_RESERVE_SECONDS,
+)
+from ..scheduler import serper_scheduler
+from ..turn_context import TurnDeadlineExceeded, record_searches, stage_timeout
 
 
 class SerperError(Exception):
     pass
 
 
+# Raw Serper responses shared by all sessions (also warmed by the prefetcher)
+search_cache = TTLCache(maxsize=SEARCH_CACHE_MAX_ENTRIES, ttl_seconds=SEARCH_CACHE_TTL_SECONDS)
+
+
+def search_cache_key(query: str, num_results: int, country: Optional[str] = None, locale: str = "en") -> tuple:
+    return (" ".join(query.lower().split()), num_results, country, locale)
+
+
+# Queries that came back with zero organic results. The value is the relaxed
+# query that did return results, or "" when the whole ladder came up empty.
+zero_result_cache = TTLCache(maxsize=ZERO_RESULT_CACHE_MAX_ENTRIES, ttl_seconds=ZERO_RESULT_CACHE_TTL_SECONDS)
+
+
+def zero_result_key(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+_OPERATOR_RE = re.compile(r"(?:^|\s)-?(?:site|inurl|intitle|intext|allintitle|allinurl|filetype|related):\S+", re.IGNORECASE)
+_EXCLUSION_RE = re.compile(r"(?:^|\s)-[\w\"]\S*")
+_BOOLEAN_RE = re.compile(r"\s(?:OR|AND)\s|\s\|\s")
+_YEAR_RE = re.compile(r"^(?:19|20)\d{2}$")
+
+# Terms that narrow a query without telling the search engine much
+LOW_INFORMATION_TERMS = {
+    "a", "an", "the", "of", "in", "for", "and", "or", "to", "at", "with", "on",
+    "program", "programs", "programme", "programmes", "degree", "degrees",
+    "graduate", "grad", "university", "universities", "official", "best", "top",
+    "list", "ranking", "rankings", "page", "website", "info", "information",
+}
+MIN_RELAXED_TERMS = 3
+
+# Qualifiers dropped first on the last rung, most generic first
+BROAD_QUALIFIER_TERMS = [
+    "overview", "process", "info", "international", "students", "online",
+    "application", "deadline", "deadlines", "requirements", "admission",
+    "admissions", "fully", "stipend", "fellowships", "financial", "aid", "tuition",
+    "fees", "scholarships", "scholarship", "funding", "funded",
+]
+
+# Degree words are never relaxed away, whatever the profile says
+DEGREE_TERMS = {
+    "phd", "ph.d", "ph.d.", "doctorate", "doctoral", "ms", "m.s", "m.s.", "msc",
+    "ma", "mba", "meng", "mphil", "mres", "master", "masters", "master's",
+}
+
+
+def _collapse(query: str) -> str:
+    return " ".join(query.split())
+
+
+def _term(token: str) -> str:
+    return token.lower().strip(".,;:()[]'\"")
+
+
+def _least_informative(tokens: List[str], keep: set) -> Optional[int]:
+    """Index of the token to drop on the last rung, None if all are kept."""
+    droppable = [i for i, t in enumerate(tokens) if _term(t) not in keep]
+    if not droppable:
+        return None
+    for qualifier in BROAD_QUALIFIER_TERMS:
+        for i in droppable:
+            if _term(tokens[i]) == qualifier:
+                return i
+    return droppable[-1]
+
+
+def relax_query(query: str, keep_terms: Optional[List[str]] = None) -> List[str]:
+    """
+    Progressively broader versions of a query that returned nothing.
+
+    The ladder is deterministic: drop search operators (site:, intitle:, ...)
+    and exclusions, then unquote phrases, then drop low-information terms
+    and years, then drop the least informative remaining qualifier. Words of
+    keep_terms (the student's degree, field and countries) and degree words
+    are never dropped. Steps that would not change the query are skipped.
+    """
+    keep = set(DEGREE_TERMS)
+    for phrase in keep_terms or []:
+        keep.update(_term(t) for t in (phrase or "").replace(",", " ").split())
+    keep.discard("")
+
+    ladder: List[str] = []
+
+    def add(candidate: str) -> None:
+        candidate = _collapse(candidate)
+        previous = ladder[-1] if ladder else _collapse(query)
+        if candidate and candidate.lower() != previous.lower():
+            ladder.append(candidate)
+
+    no_operators = _EXCLUSION_RE.sub(" ", _OPERATOR_RE.sub(" ", query))
+    add(no_operators)
+
+    unquoted = _BOOLEAN_RE.sub(" ", no_operators.replace('"', " "))
+    add(unquoted)
+
+    tokens = unquoted.split()
+    informative = [
+        t for t in tokens
+        if _term(t) in keep or (t.lower() not in LOW_INFORMATION_TERMS and not _YEAR_RE.match(t))
+    ]
+    if len(informative) >= MIN_RELAXED_TERMS:
+        tokens = informative
+        add(" ".join(tokens))
+
+    if len(tokens) > MIN_RELAXED_TERMS:
+        drop = _least_informative(tokens, keep)
+        if drop is not None:
+            add(" ".join(tokens[:drop] + tokens[drop + 1:]))
+
+    return ladder
+
+
 def serper_program_search(
     query: str,
     num_results: int = 20,
@@ -27,6 +154,9 @@ def serper_program_search(
 
     Returns:
         The raw JSON response from Serper.
+
+    Raises:
+        TurnDeadlineExceeded: if the turn has no time left for a search.
     """
     headers = {
         "X-API-KEY": SERPER_API_KEY,
@@ -41,7 +171,10 @@ def serper_program_search(
     if country:
         payload["gl"] = country
 
-    resp = requests.post(SERPER_SEARCH_URL, headers=headers, data=json.dumps(payload), timeout=20)
+    with serper_scheduler.slot("search"):
+        timeout = stage_timeout(SERPER_TIMEOUT_SECONDS, reserve=DEADLINE_REPORT_RESERVE_SECONDS, step="search")
+        resp = requests.post(SERPER_SEARCH_URL, headers=headers, data=json.dumps(payload), timeout=timeout)
+    record_searches(1)
     if resp.status_code != 200:
         raise SerperError(f"Serper API error {resp.status_code}: {resp.text}")
     
@@ -53,6 +186,100 @@ def serper_program_search(
     return result
 
 
+def _batch_item_error(item: Any) -> Optional[str]:
+    """Return an error message if a batch item is not a usable search result."""
+    if not isinstance(item, dict):
+        return f"unexpected item type {type(item).__name__}"
+    if "error" in item or ("message" in item and "organic" not in item):
+        return str(item.get("error") or item.get("message"))
+    return None
+
+
+def serper_batch_search(
+    queries: List[str],
+    num_results: int = 20,
+    country: Optional[str] = None,
+    locale: str = "en",
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Run many Google searches through Serper in as few HTTP requests as possible.
+
+    Serper accepts a JSON array of query objects and answers with an array of
+    results in the same order. Items that fail inside an otherwise successful
+    batch, and every query of a batch request that fails outright, are retried
+    one by one with serper_program_search.
+
+    Under a turn deadline, requests time out with the time left before the
+    report reserve, and nothing new is sent once that is used up.
+
+    Args:
+        queries: Search query strings.
+        num_results: Approx number of organic results per query.
+        country: Optional 2-letter country code, e.g. 'us', 'ca'.
+        locale: Language code, e.g. "en".
+
+    Returns:
+        One entry per query, in input order: the raw Serper JSON for that
+        query, or None if it could not be fetched in time.
+    """
+    headers = {
+        "X-API-KEY": SERPER_API_KEY,
+        "Content-Type": "application/json",
+    }
+    results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+    retry: List[int] = []
+
+    for start in range(0, len(queries), SERPER_BATCH_MAX_QUERIES):
+        chunk = queries[start:start + SERPER_BATCH_MAX_QUERIES]
+        payload: List[Dict[str, Any]] = []
+        for q in chunk:
+            item: Dict[str, Any] = {"q": q, "num": num_results, "hl": locale}
+            if country:
+                item["gl"] = country
+            payload.append(item)
+
+        try:
+            with serper_scheduler.slot("search"):
+                timeout = stage_timeout(SERPER_BATCH_TIMEOUT_SECONDS, reserve=DEADLINE_REPORT_RESERVE_SECONDS, step="search")
+                resp = requests.post(SERPER_SEARCH_URL, headers=headers, data=json.dumps(payload), timeout=timeout)
+            record_searches(len(chunk))
+            if resp.status_code != 200:
+                raise SerperError(f"Serper API error {resp.status_code}: {resp.text}")
+            body = resp.json()
+            if not isinstance(body, list) or len(body) != len(chunk):
+                raise SerperError(
+                    f"Serper batch returned {len(body) if isinstance(body, list) else 'non-list'} "
+                    f"items for {len(chunk)} queries"
+                )
+        except TurnDeadlineExceeded as e:
+            print(f"[WARN] Skipping {len(queries) - start} batched queries: {e}")
+            break
+        except Exception as e:
+            print(f"[WARN] Serper batch request failed, retrying {len(chunk)} queries individually: {e}")
+            retry.extend(range(start, start + len(chunk)))
+            continue
+
+        print(f"[DEBUG] Serper batch returned {len(body)} results for {len(chunk)} queries")
+        for offset, item in enumerate(body):
+            error = _batch_item_error(item)
+            if error:
+                print(f"[WARN] Serper batch item failed for query '{chunk[offset]}': {error}")
+                retry.append(start + offset)
+            else:
+                results[start + offset] = item
+
+    for idx in retry:
+        try:
+            results[idx] = serper_program_search(queries[idx], num_results=num_results, country=country, locale=locale)
+        except TurnDeadlineExceeded as e:
+            print(f"[WARN] Skipping remaining search retries: {e}")
+            break
+        except Exception as e:
+            print(f"[WARN] Search error for query '{queries[idx]}': {e}")
+
+    return results
+
+
 def extract_program_candidates(serper_json: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Extract structured candidate programs from a Serper JSON response.
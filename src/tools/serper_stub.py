@@ -0,0 +1,196 @@
+"""
+Local stand-in for the Serper.dev search endpoint.
+
+Answers both single-query payloads ({"q": ...}) and batch payloads
+([{"q": ...}, ...]) with deterministic fake organic results, so the search
+layer can be exercised without an API key or network access.
+
+Usage:
+    python -m src.tools.serper_stub --port 8765
+    SERPER_SEARCH_URL=http://127.0.0.1:8765/search python -m src.main
+
+Queries containing FAIL_MARKER come back as per-item errors inside a batch
+(or as HTTP 500 for single requests) to exercise partial-failure handling.
+Queries containing EMPTY_MARKER together with a site: operator or a quoted
+phrase come back with no organic results, so the query relaxation ladder
+has something to strip.
+
+It also serves fixture program pages for the page fetcher: GET /pages/<slug>
+returns an HTML page with admissions, funding and deadline sections, and
+/robots.txt disallows /private/. With --link-pages, search results link to
+these pages instead of example*.edu.
+"""
+
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+FAIL_MARKER = "__fail__"
+EMPTY_MARKER = "__empty__"
+
+ROBOTS_TXT = "User-agent: *\nDisallow: /private/\n"
+
+FIXTURE_PAGE = """<!doctype html>
+<html><head><title>{title}</title>
+<style>body {{ font-family: sans-serif; }}</style>
+<script>var tracking = "should not appear in text";</script>
+</head><body>
+<header><nav><a href="/">Home</a> | <a href="/apply">Apply</a></nav></header>
+<main>
+<h1>{title}</h1>
+<p>The program offers a research-focused curriculum with thesis and course-based options.</p>
+<h2>Admission Requirements</h2>
+<ul>
+<li>Minimum GPA of 3.0 on a 4.0 scale in the last two years of study.</li>
+<li>GRE is optional; TOEFL 90 or IELTS 6.5 for international applicants.</li>
+<li>Three letters of recommendation and a statement of purpose.</li>
+</ul>
+<h2>Funding and Assistantships</h2>
+<p>Admitted thesis students receive a research or teaching assistantship with a stipend of
+$24,000 per year and a full tuition waiver. Fellowships are available for top applicants.</p>
+<h2>Application Deadlines</h2>
+<table><tr><td>Fall intake</td><td>December 15</td></tr><tr><td>Spring intake</td><td>September 1</td></tr></table>
+<h2>Campus Life</h2>
+<p>Students enjoy an active graduate student association and many clubs.</p>
+</main>
+<footer>Copyright Example University</footer>
+</body></html>
+"""
+
+
+def fake_search_result(query: Dict[str, Any], page_base: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build a Serper-shaped response for one query object.
+
+    With page_base (e.g. "http://127.0.0.1:8765"), links point at the stub's
+    own fixture pages.
+    """
+    q = str(query.get("q", ""))
+    num = int(query.get("num", 10) or 10)
+    if EMPTY_MARKER in q and ("site:" in q or '"' in q):
+        return {"searchParameters": {"q": q, "num": num}, "organic": []}
+    slug = "-".join(q.lower().replace('"', "").split())[:60] or "empty"
+    organic = [
+        {
+            "title": f"{q} - Result {i + 1}",
+            "link": (
+                f"{page_base}/pages/{slug}/{i + 1}"
+                if page_base
+                else f"https://example{i % 3}.edu/{slug}/{i + 1}"
+            ),
+            "snippet": f"Stub snippet {i + 1} for {q}.",
+            "position": i + 1,
+        }
+        for i in range(num)
+    ]
+    return {"searchParameters": {"q": q, "num": num}, "organic": organic}
+
+
+class SerperStubHandler(BaseHTTPRequestHandler):
+    """Request handler that mimics POST /search on google.serper.dev."""
+
+    # Shared across handler instances; read by tests or scripts via the server
+    request_log: List[Any] = []
+    link_pages = False
+
+    def _page_base(self) -> Optional[str]:
+        if not self.link_pages:
+            return None
+        return f"http://{self.headers.get('Host') or '127.0.0.1'}"
+
+    def do_GET(self) -> None:  # noqa: N802 (http.server naming)
+        self.request_log.append({"GET": self.path})
+        if self.path == "/robots.txt":
+            self._send_text(200, ROBOTS_TXT, "text/plain")
+        elif self.path.startswith("/pages/") or self.path.startswith("/private/"):
+            slug = self.path.strip("/").split("/", 1)[-1]
+            title = slug.replace("-", " ").replace("/", " ").title()
+            self._send_text(200, FIXTURE_PAGE.format(title=title), "text/html; charset=utf-8")
+        else:
+            self._send_text(404, "not found", "text/plain")
+
+    def do_POST(self) -> None:  # noqa: N802 (http.server naming)
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"null")
+        except json.JSONDecodeError:
+            self._send(400, {"message": "invalid JSON"})
+            return
+        self.request_log.append(payload)
+
+        if isinstance(payload, list):
+            body = [
+                {"message": "stub failure", "statusCode": 500}
+                if FAIL_MARKER in str(item.get("q", ""))
+                else fake_search_result(item, self._page_base())
+                for item in payload
+            ]
+            self._send(200, body)
+        elif isinstance(payload, dict):
+            if FAIL_MARKER in str(payload.get("q", "")):
+                self._send(500, {"message": "stub failure"})
+            else:
+                self._send(200, fake_search_result(payload, self._page_base()))
+        else:
+            self._send(400, {"message": "payload must be an object or array"})
+
+    def _send(self, status: int, body: Any) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_text(self, status: int, text: str, content_type: str) -> None:
+        data = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def start_stub_server(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    link_pages: bool = False,
+) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Start the stub in a daemon thread.
+
+    Returns:
+        The server (call .shutdown() when done) and its search URL.
+    """
+    SerperStubHandler.link_pages = link_pages
+    server = ThreadingHTTPServer((host, port), SerperStubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/search"
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Local Serper.dev stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--link-pages", action="store_true", help="Link results to the stub's fixture pages")
+    args = parser.parse_args(argv)
+
+    SerperStubHandler.link_pages = args.link_pages
+    server = ThreadingHTTPServer((args.host, args.port), SerperStubHandler)
+    print(f"Serper stub listening on http://{args.host}:{args.port}/search")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Per-turn context shared by every stage of the pipeline.
+
+execute_agentic_pipeline opens a TurnContext for each message; stages deep
+inside the executor can then report progress without threading extra
+arguments through every function. The context lives in a ContextVar, so
+work submitted to thread pools must go through submit_in_context to see it.
+
+A turn may carry a deadline; stage_timeout and report_timeout turn what is
+left of it into timeouts for individual upstream calls.
+"""
+
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+from .config import DEADLINE_MIN_STAGE_SECONDS, DEADLINE_REPORT_MIN_SECONDS
+
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+
+
+@dataclass
+class TurnContext:
+    """State for one user message travelling through the pipeline."""
+    session_id: str
+    on_progress: Optional[ProgressCallback] = None
+    started_at: float = field(default_factory=time.monotonic)
+    searches_done: int = 0
+    stages: List[str] = field(default_factory=list)
+    usage: Optional[Any] = None  # usage.TurnUsage for this turn
+    degraded: List[str] = field(default_factory=list)  # steps that ran in degraded mode
+    # Set by the sampling profiler: idents of pool threads currently working for this turn
+    active_threads: Optional[Set[int]] = None
+    deadline: Optional[float] = None  # time.monotonic() by which the turn should answer
+    memory: Optional[Any] = None  # memtrack.TurnMemoryTracker while memory tracing is on
+    universities: List[str] = field(default_factory=list)  # universities the message is about
+
+    def time_left(self) -> Optional[float]:
+        """Seconds until the deadline (negative once past), None without one."""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def report(self, stage: str, **info: Any) -> None:
+        self.stages.append(stage)
+        info.setdefault("elapsed", round(time.monotonic() - self.started_at, 2))
+        if self.memory is not None:
+            self.memory.mark(stage)
+        if self.on_progress is None:
+            return
+        try:
+            self.on_progress(stage, info)
+        except Exception as e:
+            # A broken UI callback must never fail the turn
+            print(f"[WARN] Progress callback failed for stage '{stage}': {e}")
+
+
+class TurnDeadlineExceeded(Exception):
+    """Too little of the turn's time budget is left to start a step."""
+
+
+_current_turn: contextvars.ContextVar[Optional[TurnContext]] = contextvars.ContextVar(
+    "gradpath_turn", default=None
+)
+
+
+def current_turn() -> Optional[TurnContext]:
+    return _current_turn.get()
+
+
+@contextmanager
+def turn_scope(ctx: TurnContext) -> Iterator[TurnContext]:
+    """Make ctx the current turn for the duration of the block."""
+    token = _current_turn.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _current_turn.reset(token)
+
+
+def report_progress(stage: str, **info: Any) -> None:
+    """Report a pipeline stage to the current turn, if there is one."""
+    ctx = _current_turn.get()
+    if ctx is not None:
+        ctx.report(stage, **info)
+
+
+def time_left() -> Optional[float]:
+    """Seconds left before the current turn's deadline (None = no deadline)."""
+    ctx = _current_turn.get()
+    return ctx.time_left() if ctx is not None else None
+
+
+def stage_timeout(default: float, reserve: float = 0.0, step: str = "step") -> float:
+    """
+    Timeout for a blocking call made before the report is written.
+
+    Returns default, cut down to the time left before the deadline after
+    setting reserve seconds aside (for the report).
+
+    Raises:
+        TurnDeadlineExceeded: if less than DEADLINE_MIN_STAGE_SECONDS would
+            remain, so the caller should take its fallback instead.
+    """
+    left = time_left()
+    if left is None:
+        return default
+    timeout = min(default, left - reserve)
+    if timeout < DEADLINE_MIN_STAGE_SECONDS:
+        raise TurnDeadlineExceeded(f"{step}: {max(0.0, left):.1f}s left of the turn's time budget")
+    return timeout
+
+
+def report_timeout(default: float) -> float:
+    """
+    Timeout for a call that must run even late (the report itself): what is
+    left of the deadline, but never less than DEADLINE_REPORT_MIN_SECONDS.
+    """
+    left = time_left()
+    if left is None:
+        return default
+    return min(default, max(DEADLINE_REPORT_MIN_SECONDS, left))
+
+
+def record_searches(count: int) -> None:
+    """
+    Count upstream searches against the current turn and report progress.
+
+    Outside a turn, searches sent by prefetch work are counted against the
+    session in the ledger's separate prefetch counter.
+    """
+    if count <= 0:
+        return
+    ctx = _current_turn.get()
+    if ctx is None:
+        # Imported here: both modules depend on this one
+        from .scheduler import background_session
+        session_id = background_session()
+        if session_id is not None:
+            from .usage import usage_ledger
+            usage_ledger.record_prefetch_searches(session_id, count)
+        return
+    ctx.searches_done += count
+    if ctx.usage is not None:
+        # Imported here: usage.py depends on this module
+        from .usage import usage_ledger
+        usage_ledger.record_searches(ctx.usage, count)
+    ctx.report("searching", searches_done=ctx.searches_done)
+
+
+def _run_tracked(threads: Set[int], fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    ident = threading.get_ident()
+    threads.add(ident)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        threads.discard(ident)
+
+
+def submit_in_context(pool: Executor, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    """Submit fn to a pool so that it runs inside the caller's turn context."""
+    ctx = contextvars.copy_context()
+    turn = _current_turn.get()
+    if turn is not None and turn.active_threads is not None:
+        # Let the profiler sample this thread while it works for the turn
+        fn = functools.partial(_run_tracked, turn.active_threads, fn)
+    return pool.submit(ctx.run, fn, *args, **kwargs)
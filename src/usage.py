@@ -0,0 +1,245 @@
+"""
+Per-session token and search accounting with budget enforcement.
+
+Every Gemini call records its usage_metadata token counts under a stage name
+(classifier, planner, writer, ...) and every upstream Serper request counts
+as one search. Records are grouped by session and turn in the global
+usage_ledger, which can be queried for a session's totals or a single
+turn's breakdown.
+
+Budgets (see config.py, 0 = unlimited) are enforced by degrading rather than
+failing: uncached searches are trimmed, long generations get a lower output
+cap, and optional calls (personalization, LLM follow-ups) are skipped.
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from .config import (
+    SESSION_SEARCH_BUDGET,
+    SESSION_TOKEN_BUDGET,
+    TURN_SEARCH_BUDGET,
+    TURN_TOKEN_BUDGET,
+    USAGE_TURNS_KEPT,
+)
+from .turn_context import current_turn
+
+# Below this many remaining tokens, optional LLM calls are skipped
+MIN_TOKENS_FOR_OPTIONAL_CALLS = 1500
+# Generations without an explicit cap are only capped below this size
+UNCAPPED_OUTPUT_TOKENS = 8192
+
+
+@dataclass
+class StageUsage:
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+@dataclass
+class TurnUsage:
+    """Usage of one turn, broken down by stage."""
+    session_id: str
+    turn_id: int
+    started_at: float = field(default_factory=time.time)
+    query_type: Optional[str] = None
+    searches: int = 0
+    stages: Dict[str, StageUsage] = field(default_factory=dict)
+    degraded: List[str] = field(default_factory=list)  # steps cut short by budgets or the deadline
+    memory: Dict[str, Any] = field(default_factory=dict)  # traced memory per stage (memtrack.py), when tracing
+
+    @property
+    def input_tokens(self) -> int:
+        return sum(s.input_tokens for s in self.stages.values())
+
+    @property
+    def output_tokens(self) -> int:
+        return sum(s.output_tokens for s in self.stages.values())
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.update(
+            input_tokens=self.input_tokens,
+            output_tokens=self.output_tokens,
+            total_tokens=self.total_tokens,
+        )
+        return data
+
+
+@dataclass
+class SessionUsage:
+    """Running totals for a session plus its most recent turns."""
+    turns_started: int = 0
+    searches: int = 0
+    prefetch_searches: int = 0  # sent by background prefetch, outside any turn
+    input_tokens: int = 0
+    output_tokens: int = 0
+    recent_turns: Deque[TurnUsage] = field(default_factory=lambda: deque(maxlen=USAGE_TURNS_KEPT))
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+
+class UsageLedger:
+    """
+    Thread-safe record of token and search usage keyed by session.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, SessionUsage] = {}
+
+    def begin_turn(self, session_id: str) -> TurnUsage:
+        with self._lock:
+            session = self._sessions.setdefault(session_id, SessionUsage())
+            session.turns_started += 1
+            turn = TurnUsage(session_id=session_id, turn_id=session.turns_started)
+            session.recent_turns.append(turn)
+            return turn
+
+    def record_llm(self, turn: TurnUsage, stage: str, input_tokens: int, output_tokens: int) -> None:
+        with self._lock:
+            stage_usage = turn.stages.setdefault(stage, StageUsage())
+            stage_usage.calls += 1
+            stage_usage.input_tokens += input_tokens
+            stage_usage.output_tokens += output_tokens
+            session = self._sessions.setdefault(turn.session_id, SessionUsage())
+            session.input_tokens += input_tokens
+            session.output_tokens += output_tokens
+
+    def record_searches(self, turn: TurnUsage, count: int) -> None:
+        with self._lock:
+            turn.searches += count
+            self._sessions.setdefault(turn.session_id, SessionUsage()).searches += count
+
+    def record_prefetch_searches(self, session_id: str, count: int) -> None:
+        with self._lock:
+            self._sessions.setdefault(session_id, SessionUsage()).prefetch_searches += count
+
+    def session_totals(self, session_id: str) -> Dict[str, Any]:
+        """Totals for a session: turns, searches and tokens."""
+        with self._lock:
+            session = self._sessions.get(session_id) or SessionUsage()
+            return {
+                "session_id": session_id,
+                "turns": session.turns_started,
+                "searches": session.searches,
+                "prefetch_searches": session.prefetch_searches,
+                "input_tokens": session.input_tokens,
+                "output_tokens": session.output_tokens,
+                "total_tokens": session.total_tokens,
+            }
+
+    def turns(self, session_id: str) -> List[Dict[str, Any]]:
+        """Per-stage breakdown of the session's most recent turns."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return [t.as_dict() for t in session.recent_turns] if session else []
+
+    def turn(self, session_id: str, turn_id: int) -> Optional[Dict[str, Any]]:
+        for t in self.turns(session_id):
+            if t["turn_id"] == turn_id:
+                return t
+        return None
+
+    def all_sessions(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            session_ids = list(self._sessions)
+        return [self.session_totals(sid) for sid in session_ids]
+
+    def forget(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+# Global ledger (one process)
+usage_ledger = UsageLedger()
+
+
+def _remaining(limit: int, used: int) -> Optional[int]:
+    return None if limit <= 0 else max(0, limit - used)
+
+
+def _min_remaining(*values: Optional[int]) -> Optional[int]:
+    bounded = [v for v in values if v is not None]
+    return min(bounded) if bounded else None
+
+
+def record_llm_response(stage: str, response: Any) -> None:
+    """Record a Gemini response's token usage against the current turn."""
+    ctx = current_turn()
+    if ctx is None or ctx.usage is None:
+        return
+    meta = getattr(response, "usage_metadata", None)
+    input_tokens = int(getattr(meta, "prompt_token_count", 0) or 0)
+    output_tokens = int(getattr(meta, "candidates_token_count", 0) or 0)
+    usage_ledger.record_llm(ctx.usage, stage, input_tokens, output_tokens)
+
+
+def remaining_tokens() -> Optional[int]:
+    """Tokens left for the current turn under turn and session budgets (None = unlimited)."""
+    ctx = current_turn()
+    if ctx is None or ctx.usage is None:
+        return None
+    session = usage_ledger.session_totals(ctx.session_id)
+    return _min_remaining(
+        _remaining(TURN_TOKEN_BUDGET, ctx.usage.total_tokens),
+        _remaining(SESSION_TOKEN_BUDGET, session["total_tokens"]),
+    )
+
+
+def remaining_searches() -> Optional[int]:
+    """Uncached searches left for the current turn (None = unlimited)."""
+    ctx = current_turn()
+    if ctx is None or ctx.usage is None:
+        return None
+    session = usage_ledger.session_totals(ctx.session_id)
+    return _min_remaining(
+        _remaining(TURN_SEARCH_BUDGET, ctx.usage.searches),
+        _remaining(SESSION_SEARCH_BUDGET, session["searches"]),
+    )
+
+
+def output_token_cap(default: Optional[int] = None) -> Optional[int]:
+    """
+    max_output_tokens to use for a generation under the current budgets.
+
+    Keeps half of what is left for the output (the prompt needs the rest),
+    so reports get shorter as the budget runs down instead of failing.
+    Returns default (possibly None = model default) when the budget does
+    not bind.
+    """
+    left = remaining_tokens()
+    if left is None:
+        return default
+    cap = max(256, left // 2)
+    limit = default if default is not None else UNCAPPED_OUTPUT_TOKENS
+    if cap >= limit:
+        return default
+    mark_degraded(f"output capped at {cap} tokens by usage budget")
+    return cap
+
+
+def can_afford_optional_call() -> bool:
+    """Whether optional LLM calls (personalization, follow-ups) fit the budget."""
+    left = remaining_tokens()
+    if left is None or left >= MIN_TOKENS_FOR_OPTIONAL_CALLS:
+        return True
+    mark_degraded("optional LLM calls skipped by usage budget")
+    return False
+
+
+def mark_degraded(reason: str) -> None:
+    """Note on the current turn that a step ran in degraded mode."""
+    ctx = current_turn()
+    if ctx is not None and reason not in ctx.degraded:
+        ctx.degraded.append(reason)
@@ -0,0 +1,413 @@
+"""
+Multi-process worker pool with session-affinity sharding.
+
+Each worker process runs the pipeline with its own process-local
+profile_store and usage_ledger. The dispatcher maps every session_id to a
+worker with a consistent-hash ring, so all turns of a session land on the
+same process (in order, through that worker's own queue) and its profile
+memory never has to leave it.
+
+When a worker dies its unfinished requests are re-dispatched. With
+WORKER_RESTART the replacement takes over the dead worker's id and ring
+points, so exactly its sessions move and no live worker gives any up;
+without, the dead worker's points leave the ring and its sessions spread
+over the others, which again moves nothing off a live worker. Each moved
+session's next turn carries the last session snapshot the dispatcher saw for it (profile,
+last plan and candidates, and the search results behind them; see
+snapshot.py), so the new owner starts from where the old one left off
+without re-running searches. Delivery is at-least-once: a turn
+that was running when its worker died is run again, at most
+MAX_ATTEMPTS times.
+
+Usage:
+    with WorkerPool(num_workers=4) as pool:
+        result = pool.submit(session_id, "I want a funded MS in CS").result()
+        print(result["response"], pool.stats())
+"""
+
+import bisect
+import hashlib
+import itertools
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from multiprocessing.connection import Connection, wait
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from .config import WORKER_PROCESSES, WORKER_RESTART
+from .memory import profile_store
+from .snapshot import capture_session, decode_snapshot, encode_snapshot, restore_session
+from .usage import usage_ledger
+
+# Points per worker on the hash ring; more points = more even shards
+HASH_REPLICAS = 64
+# A turn is retried on another worker at most this many times in total
+MAX_ATTEMPTS = 2
+MONITOR_INTERVAL_SECONDS = 0.5
+
+
+class WorkerCrashedError(Exception):
+    """A turn's worker died on every attempt to run it."""
+
+
+def run_turn(session_id: str, message: str, with_snapshot: bool = False) -> Dict[str, Any]:
+    """
+    Run one turn in the current process and describe the outcome.
+
+    Returns:
+        Dict with response, error, elapsed_seconds, usage (this turn's
+        breakdown), profile (the session's profile after the turn) and,
+        with with_snapshot, snapshot (the encoded session after the turn).
+    """
+    # Imported here: the dispatcher process never runs the pipeline itself
+    from .executor import execute_agentic_pipeline
+
+    started = time.perf_counter()
+    result: Dict[str, Any] = {"response": None, "error": None}
+    try:
+        result["response"] = execute_agentic_pipeline(message, session_id, profile_store)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    turns = usage_ledger.turns(session_id)
+    result["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    result["usage"] = turns[-1] if turns else None
+    result["profile"] = profile_store.as_dict(session_id)
+    if with_snapshot:
+        result["snapshot"] = encode_snapshot(capture_session(session_id))
+    return result
+
+
+TurnRunner = Callable[..., Dict[str, Any]]
+
+
+def _worker_main(worker_id: int, tasks: "mp.Queue", results: Connection, runner: TurnRunner = run_turn) -> None:
+    # Ctrl+C goes to the dispatcher, which shuts workers down in order
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    print(f"[INFO] Worker {worker_id} started (pid {os.getpid()})")
+    while True:
+        item = tasks.get()
+        if item is None:
+            break
+        kind, request_id, session_id, payload = item
+        if kind == "forget":
+            profile_store.forget(session_id)
+            usage_ledger.forget(session_id)
+            continue
+        if payload.get("snapshot"):
+            # The session moved here from a dead worker
+            restore_session(decode_snapshot(payload["snapshot"]))
+        results.send((worker_id, request_id, runner(session_id, payload["message"], with_snapshot=True)))
+    print(f"[INFO] Worker {worker_id} stopped")
+
+
+class HashRing:
+    """Consistent-hash ring mapping string keys to integer node ids."""
+
+    def __init__(self, replicas: int = HASH_REPLICAS) -> None:
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: Dict[int, int] = {}
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def add(self, node: int) -> None:
+        for i in range(self.replicas):
+            point = self._hash(f"worker-{node}#{i}")
+            if point not in self._owners:
+                bisect.insort(self._points, point)
+            self._owners[point] = node
+
+    def remove(self, node: int) -> None:
+        points = [p for p, owner in self._owners.items() if owner == node]
+        for point in points:
+            del self._owners[point]
+        removed = set(points)
+        self._points = [p for p in self._points if p not in removed]
+
+    def node_for(self, key: str) -> Optional[int]:
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+
+@dataclass
+class _Request:
+    request_id: int
+    session_id: str
+    message: str
+    future: Future
+    attempts: int = 0
+
+
+@dataclass
+class _Worker:
+    worker_id: int
+    process: Any  # multiprocessing Process
+    tasks: Any  # multiprocessing Queue, this worker's own
+    # Read end of this worker's own result pipe. Not a Queue shared by all
+    # workers: a worker killed while holding a shared queue's write lock
+    # would block every other worker's results forever.
+    results: Connection
+    results_open: bool = True
+    in_flight: Dict[int, _Request] = field(default_factory=dict)
+    sessions: Set[str] = field(default_factory=set)
+    completed: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+
+
+class WorkerPool:
+    """
+    Dispatches turns to worker processes by session affinity.
+
+    submit() returns a Future resolving to run_turn's result dict; pipeline
+    errors are reported in its "error" field, while a worker crashing on
+    every attempt fails the future with WorkerCrashedError. runner replaces
+    run_turn in the workers (same signature and result); it must be a
+    module-level function so spawned workers can import it.
+    """
+
+    def __init__(
+        self,
+        num_workers: int = WORKER_PROCESSES,
+        restart_dead: bool = WORKER_RESTART,
+        replicas: int = HASH_REPLICAS,
+        runner: TurnRunner = run_turn,
+    ) -> None:
+        self.restart_dead = restart_dead
+        self._runner = runner
+        self.restarts = 0
+        self.rebalanced_sessions = 0
+
+        # spawn: workers must not inherit the dispatcher's threads and locks
+        self._ctx = mp.get_context("spawn")
+        self._lock = threading.RLock()
+        self._ring = HashRing(replicas)
+        self._workers: Dict[int, _Worker] = {}
+        self._worker_ids = itertools.count()
+        self._request_ids = itertools.count()
+        # Owning worker instance: a replacement shares its predecessor's id
+        # but not its memory, so sessions compare by instance
+        self._session_owner: Dict[str, _Worker] = {}
+        self._session_snapshots: Dict[str, bytes] = {}
+        self._stopping = False
+        self._closed = threading.Event()
+
+        for _ in range(max(1, num_workers)):
+            self._spawn_worker()
+
+        self._collector = threading.Thread(target=self._collect_results, name="worker-pool-results", daemon=True)
+        self._monitor = threading.Thread(target=self._monitor_workers, name="worker-pool-monitor", daemon=True)
+        self._collector.start()
+        self._monitor.start()
+
+    def __enter__(self) -> "WorkerPool":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.shutdown()
+
+    def _spawn_worker(self, worker_id: Optional[int] = None) -> _Worker:
+        """Start a worker; reusing a dead worker's id keeps its ring points."""
+        replacing = worker_id is not None
+        if worker_id is None:
+            worker_id = next(self._worker_ids)
+        tasks = self._ctx.Queue()
+        results, results_writer = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, tasks, results_writer, self._runner),
+            name=f"gradpath-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        # Only the worker writes; closing our copy lets its exit show up as EOF
+        results_writer.close()
+        worker = _Worker(worker_id=worker_id, process=process, tasks=tasks, results=results)
+        self._workers[worker_id] = worker
+        if not replacing:
+            self._ring.add(worker_id)
+        return worker
+
+    def worker_for(self, session_id: str) -> Optional[int]:
+        """Id of the worker that currently owns session_id."""
+        with self._lock:
+            return self._ring.node_for(session_id)
+
+    def submit(self, session_id: str, message: str) -> Future:
+        """Queue a turn on the session's worker."""
+        future: Future = Future()
+        with self._lock:
+            if self._stopping:
+                raise RuntimeError("WorkerPool has been shut down")
+            self._dispatch(_Request(next(self._request_ids), session_id, message, future))
+        return future
+
+    def _dispatch(self, request: _Request) -> None:
+        # Caller holds self._lock
+        worker_id = self._ring.node_for(request.session_id)
+        if worker_id is None:
+            request.future.set_exception(WorkerCrashedError("No live workers left in the pool"))
+            return
+
+        worker = self._workers[worker_id]
+        payload: Dict[str, Any] = {"message": request.message}
+        owner = self._session_owner.get(request.session_id)
+        if owner is not None and owner is not worker:
+            payload["snapshot"] = self._session_snapshots.get(request.session_id)
+            self.rebalanced_sessions += 1
+            owner.sessions.discard(request.session_id)
+            if self._workers.get(owner.worker_id) is owner:
+                # Still alive: drop its copy once its queued turns are done
+                owner.tasks.put(("forget", -1, request.session_id, {}))
+        self._session_owner[request.session_id] = worker
+
+        request.attempts += 1
+        worker.in_flight[request.request_id] = request
+        worker.sessions.add(request.session_id)
+        worker.tasks.put(("turn", request.request_id, request.session_id, payload))
+
+    def _collect_results(self) -> None:
+        watched: Dict[Connection, _Worker] = {}
+        while True:
+            with self._lock:
+                current = {w.results: w for w in self._workers.values() if w.results_open}
+            # Pipes of workers that were replaced or have exited
+            for reader in watched.keys() - current.keys():
+                reader.close()
+            watched = current
+
+            ready = wait(list(watched), timeout=0.5)
+            if not ready:
+                if self._closed.is_set():
+                    break
+                continue
+            for reader in ready:
+                try:
+                    _, request_id, result = reader.recv()
+                except (EOFError, OSError):
+                    # The worker exited; the monitor takes care of its requests
+                    with self._lock:
+                        watched[reader].results_open = False
+                    continue
+                self._complete(watched[reader], request_id, result)
+
+        for reader in watched:
+            reader.close()
+
+    def _complete(self, worker: _Worker, request_id: int, result: Dict[str, Any]) -> None:
+        with self._lock:
+            if self._workers.get(worker.worker_id) is not worker:
+                # The worker was declared dead and the turn re-dispatched
+                return
+            request = worker.in_flight.pop(request_id, None)
+            if request is None:
+                return
+            worker.completed += 1
+            worker.failed += 1 if result["error"] else 0
+            worker.busy_seconds += result["elapsed_seconds"]
+            self._session_snapshots[request.session_id] = result.pop("snapshot")
+        request.future.set_result(result)
+
+    def _monitor_workers(self) -> None:
+        while not self._closed.wait(MONITOR_INTERVAL_SECONDS):
+            with self._lock:
+                if self._stopping:
+                    return
+                dead = [w for w in self._workers.values() if not w.process.is_alive()]
+                for worker in dead:
+                    self._replace_dead_worker(worker)
+
+    def _replace_dead_worker(self, worker: _Worker) -> None:
+        # Caller holds self._lock
+        print(
+            f"[WARN] Worker {worker.worker_id} (pid {worker.process.pid}) exited with code "
+            f"{worker.process.exitcode}; rebalancing {len(worker.sessions)} sessions"
+        )
+        if self.restart_dead:
+            # Same id, same ring points: only this worker's sessions move
+            self._spawn_worker(worker.worker_id)
+            self.restarts += 1
+        else:
+            self._ring.remove(worker.worker_id)
+            del self._workers[worker.worker_id]
+
+        for request in sorted(worker.in_flight.values(), key=lambda r: r.request_id):
+            if request.attempts >= MAX_ATTEMPTS:
+                request.future.set_exception(WorkerCrashedError(
+                    f"Worker died {request.attempts} times while running a turn for session {request.session_id}"
+                ))
+                continue
+            self._dispatch(request)
+
+    def forget(self, session_id: str) -> None:
+        """Drop a finished session's state from the dispatcher and its worker."""
+        with self._lock:
+            owner = self._session_owner.pop(session_id, None)
+            self._session_snapshots.pop(session_id, None)
+            if owner is not None and self._workers.get(owner.worker_id) is owner:
+                owner.sessions.discard(session_id)
+                owner.tasks.put(("forget", -1, session_id, {}))
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-worker load plus pool-wide counters."""
+        with self._lock:
+            workers = [
+                {
+                    "worker_id": w.worker_id,
+                    "pid": w.process.pid,
+                    "alive": w.process.is_alive(),
+                    "queued": len(w.in_flight),
+                    "sessions": len(w.sessions),
+                    "completed": w.completed,
+                    "failed": w.failed,
+                    "busy_seconds": round(w.busy_seconds, 2),
+                    "avg_turn_seconds": round(w.busy_seconds / w.completed, 3) if w.completed else None,
+                }
+                for w in self._workers.values()
+            ]
+            return {
+                "workers": workers,
+                "sessions": len(self._session_owner),
+                "queued": sum(w["queued"] for w in workers),
+                "restarts": self.restarts,
+                "rebalanced_sessions": self.rebalanced_sessions,
+                # Held by the dispatcher for moving sessions between workers
+                "snapshot_bytes": sum(len(s) for s in self._session_snapshots.values()),
+            }
+
+    def shutdown(self, timeout: float = 30.0) -> None:
+        """Let workers finish their queues, then stop them."""
+        with self._lock:
+            if self._stopping:
+                return
+            # Stop the monitor before it mistakes the stopping workers for crashes
+            self._stopping = True
+            workers = list(self._workers.values())
+            for worker in workers:
+                worker.tasks.put(None)
+
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            worker.process.join(max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                print(f"[WARN] Worker {worker.worker_id} did not stop in time; terminating")
+                worker.process.terminate()
+                worker.process.join(1.0)
+
+        self._closed.set()
+        self._monitor.join()
+        self._collector.join()
+        with self._lock:
+            for worker in self._workers.values():
+                for request in worker.in_flight.values():
+                    if not request.future.done():
+                        request.future.set_exception(RuntimeError("WorkerPool shut down before the turn ran"))
+                worker.in_flight.clear()
@@ -4,10 +4,14 @@ With Multi-Session Chat History Management
 """
 
 import streamlit as st
+import time
 import uuid
-from datetime import datetime
-from src.root_agent import handle_message
+from concurrent.futures import ThreadPoolExecutor
+from src.chat_history import ChatHistoryStore, DEFAULT_TITLE
+from src.config import CHAT_HISTORY_DB_PATH, CHAT_RESIDENT_MESSAGES, CHAT_SESSIONS_PAGE_SIZE
+from src.jobs import describe_stage, start_pipeline_job
 from src.memory import profile_store
+from src.prefetch import prefetcher
 
 # Page configuration
 st.set_page_config(
@@ -16,21 +20,10 @@ st.set_page_config(
     layout="wide"
 )
 
-# Initialize session storage for chat history
-if "chat_sessions" not in st.session_state:
-    st.session_state.chat_sessions = {}
+# Seconds between progress polls while a response is being generated
+POLL_INTERVAL_SECONDS = 0.25
 
-if "current_session_id" not in st.session_state:
-    # Create first session
-    first_session_id = str(uuid.uuid4())
-    st.session_state.current_session_id = first_session_id
-    st.session_state.chat_sessions[first_session_id] = {
-        "id": first_session_id,
-        "title": "New Chat",
-        "created_at": datetime.now().isoformat(),
-        "messages": [{
-            "role": "assistant",
-            "content": """Welcome to GradPath! 👋
+WELCOME_MESSAGE = """Welcome to GradPath! 👋
 
 I'm here to help you find the perfect graduate program. Tell me about:
 - Your academic background (GPA, test scores)
@@ -40,71 +33,122 @@ I'm here to help you find the perfect graduate program. Tell me about:
 - Any other preferences (GRE waiver, specific intake terms, etc.)
 
 What graduate programs are you looking for?"""
-        }]
-    }
+
+
+@st.cache_resource
+def get_pipeline_pool():
+    """Worker threads that run the pipeline outside the script run (shared by all browser sessions)"""
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="pipeline")
+
+
+@st.cache_resource
+def get_history_store():
+    """SQLite chat history shared by all browser sessions"""
+    return ChatHistoryStore(CHAT_HISTORY_DB_PATH)
+
+
+@st.cache_resource
+def get_pending_jobs():
+    """Pipeline jobs still running, by chat session id (survives browser refreshes)"""
+    return {}
+
+
+history_store = get_history_store()
+pending_jobs = get_pending_jobs()
+
+# Each browser gets its own owner id, kept in the URL so it survives a
+# refresh; chat history only ever lists this owner's sessions
+if "owner" not in st.query_params:
+    st.query_params["owner"] = uuid.uuid4().hex
+owner_id = st.query_params["owner"]
+
+# Sidebar page and how many of the current chat's messages to load
+if "sessions_page" not in st.session_state:
+    st.session_state.sessions_page = 0
+if "resident_messages" not in st.session_state:
+    st.session_state.resident_messages = CHAT_RESIDENT_MESSAGES
 
 # Helper functions for session management
 def create_new_session():
     """Create a new chat session"""
     new_session_id = str(uuid.uuid4())
-    st.session_state.chat_sessions[new_session_id] = {
-        "id": new_session_id,
-        "title": "New Chat",
-        "created_at": datetime.now().isoformat(),
-        "messages": [{
-            "role": "assistant",
-            "content": """Welcome to GradPath! 👋
-
-I'm here to help you find the perfect graduate program. Tell me about:
-- Your academic background (GPA, test scores)
-- Field of study and degree level (MS/PhD)
-- Preferred countries or cities
-- Funding requirements
-- Any other preferences (GRE waiver, specific intake terms, etc.)
-
-What graduate programs are you looking for?"""
-        }]
-    }
+    history_store.create_session(new_session_id, owner=owner_id)
+    history_store.append_message(new_session_id, "assistant", WELCOME_MESSAGE)
     st.session_state.current_session_id = new_session_id
+    st.session_state.sessions_page = 0
+    st.session_state.resident_messages = CHAT_RESIDENT_MESSAGES
     return new_session_id
 
 def switch_session(session_id):
     """Switch to a different chat session"""
     st.session_state.current_session_id = session_id
+    st.session_state.resident_messages = CHAT_RESIDENT_MESSAGES
 
 def delete_session(session_id):
     """Delete a chat session"""
-    if len(st.session_state.chat_sessions) > 1:
-        del st.session_state.chat_sessions[session_id]
+    if history_store.count_sessions(owner_id) > 1:
+        if not history_store.delete_session(session_id, owner_id):
+            return
+        job = pending_jobs.pop(session_id, None)
+        if job is not None:
+            job.cancel()
         # Clean up profile data
-        profile_store._profiles.pop(session_id, None)
+        profile_store.forget(session_id)
+        prefetcher.forget(session_id)
         # Switch to most recent session
-        remaining_sessions = sorted(
-            st.session_state.chat_sessions.items(),
-            key=lambda x: x[1]["created_at"],
-            reverse=True
-        )
-        st.session_state.current_session_id = remaining_sessions[0][0]
+        if session_id == st.session_state.current_session_id:
+            switch_session(history_store.most_recent_session_id(owner_id))
     else:
         st.warning("Cannot delete the last chat session!")
 
-def update_session_title(session_id, messages):
+def update_session_title(session_id, first_user_message):
     """Auto-generate session title from first user message"""
-    session = st.session_state.chat_sessions[session_id]
-    if session["title"] == "New Chat" and len(messages) > 1:
-        # Find first user message
-        for msg in messages:
-            if msg["role"] == "user":
-                # Use first 40 chars of first user message as title
-                title = msg["content"][:40]
-                if len(msg["content"]) > 40:
-                    title += "..."
-                session["title"] = title
-                break
-
-def get_current_session():
-    """Get current session data"""
-    return st.session_state.chat_sessions[st.session_state.current_session_id]
+    session = history_store.get_session(session_id)
+    if session and session["title"] == DEFAULT_TITLE:
+        # Use first 40 chars of first user message as title
+        title = first_user_message[:40]
+        if len(first_user_message) > 40:
+            title += "..."
+        history_store.set_title(session_id, title)
+
+def store_job_result(job):
+    """Persist a finished job's response (runs on the worker thread)"""
+    # The script treats "no longer pending" as "persisted", so only stop
+    # tracking the job once its response is stored
+    try:
+        try:
+            response = job.result()
+        except Exception as e:
+            response = f"⚠️ An error occurred: {str(e)}"
+        if history_store.get_session(job.session_id):
+            history_store.append_message(job.session_id, "assistant", response)
+    finally:
+        pending_jobs.pop(job.session_id, None)
+
+def render_response(response):
+    """Render an assistant response, giving markdown tables their own block"""
+    if "|" in response and "---" in response:
+        # Split response into parts so tables render properly
+        for part in response.split("\n\n"):
+            if part.strip():
+                st.markdown(part)
+    else:
+        # No table, just render as markdown
+        st.markdown(response)
+
+def render_progress(status, job):
+    """Write any new pipeline stages into the status box"""
+    for stage, info in job.poll_events():
+        status.write(f"✅ {describe_stage(stage, info)}")
+        status.update(label=f"{describe_stage(stage, info)}...")
+
+# Resume this browser's most recent chat after a refresh, or start its first one
+if "current_session_id" not in st.session_state:
+    most_recent = history_store.most_recent_session_id(owner_id)
+    if most_recent:
+        st.session_state.current_session_id = most_recent
+    else:
+        create_new_session()
 
 # Title and description
 st.title("🎓 GradPath")
@@ -122,16 +166,18 @@ with st.sidebar:
     
     st.markdown("---")
     
-    # Display all chat sessions
+    # Display one page of chat sessions
     current_session_id = st.session_state.current_session_id
-    sessions_sorted = sorted(
-        st.session_state.chat_sessions.items(),
-        key=lambda x: x[1]["created_at"],
-        reverse=True
+    total_sessions = history_store.count_sessions(owner_id)
+    page_count = max(1, -(-total_sessions // CHAT_SESSIONS_PAGE_SIZE))
+    page = min(st.session_state.sessions_page, page_count - 1)
+    sessions_page = history_store.list_sessions(
+        owner_id, limit=CHAT_SESSIONS_PAGE_SIZE, offset=page * CHAT_SESSIONS_PAGE_SIZE
     )
-    
+
     st.subheader("Your Chats")
-    for session_id, session_data in sessions_sorted:
+    for session_data in sessions_page:
+        session_id = session_data["id"]
         is_current = session_id == current_session_id
         
         # Create container for each session
@@ -146,18 +192,31 @@ with st.sidebar:
                     st.rerun()
         
         with col2:
-            # Delete button (only show if not current or if multiple sessions exist)
-            if len(st.session_state.chat_sessions) > 1:
+            # Delete button (only show if multiple sessions exist)
+            if total_sessions > 1:
                 if st.button("🗑️", key=f"delete_{session_id}"):
                     delete_session(session_id)
                     st.rerun()
+
+    if page_count > 1:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("◀", key="sessions_prev", disabled=page == 0):
+                st.session_state.sessions_page = page - 1
+                st.rerun()
+        with col2:
+            st.caption(f"Page {page + 1} of {page_count}")
+        with col3:
+            if st.button("▶", key="sessions_next", disabled=page >= page_count - 1):
+                st.session_state.sessions_page = page + 1
+                st.rerun()
     
     st.markdown("---")
     
     # Current session info
-    current_session = get_current_session()
+    message_count = history_store.count_messages(current_session_id)
     st.caption(f"Session: {current_session_id[:8]}...")
-    st.caption(f"Messages: {len(current_session['messages'])}")
+    st.caption(f"Messages: {message_count}")
     
     # Display current profile with refresh button
     col1, col2 = st.columns([3, 1])
@@ -184,62 +243,41 @@ with st.sidebar:
     4. Start new chats for different searches
     """)
 
-# Get current session messages
-current_session = get_current_session()
-current_messages = current_session["messages"]
+# Load only the most recent messages of the current session
+current_session_id = st.session_state.current_session_id
+current_messages = history_store.get_messages(
+    current_session_id, limit=st.session_state.resident_messages
+)
+
+if message_count > len(current_messages):
+    if st.button(f"Load earlier messages ({message_count - len(current_messages)} more)"):
+        st.session_state.resident_messages += CHAT_RESIDENT_MESSAGES
+        st.rerun()
 
 # Display chat history for current session
 for message in current_messages:
     with st.chat_message(message["role"]):
-        content = message["content"]
-        st.markdown(content, unsafe_allow_html=False)
+        render_response(message["content"])
 
 # Chat input
 if prompt := st.chat_input("Tell me about your graduate school preferences..."):
-    # Add user message to current session
-    current_messages.append({"role": "user", "content": prompt})
-    
-    # Update session title if this is the first user message
-    update_session_title(st.session_state.current_session_id, current_messages)
-    
-    # Display user message
-    with st.chat_message("user"):
-        st.markdown(prompt)
-    
-    # Get bot response
-    with st.chat_message("assistant"):
-        with st.spinner("Searching for programs..."):
-            try:
-                response = handle_message(prompt, st.session_state.current_session_id)
-                
-                # Check if response contains a markdown table
-                if "|" in response and "---" in response:
-                    # Split response into parts
-                    parts = response.split("\n\n")
-                    
-                    for part in parts:
-                        if "|" in part and "---" in part:
-                            # This is a table - render it properly
-                            st.markdown(part)
-                        elif part.strip().startswith("#"):
-                            # This is a heading
-                            st.markdown(part)
-                        elif part.strip().startswith("*") or part.strip().startswith("-"):
-                            # This is a list
-                            st.markdown(part)
-                        elif part.strip():
-                            # Regular text
-                            st.markdown(part)
-                else:
-                    # No table, just render as markdown
-                    st.markdown(response)
-                
-                # Add assistant response to current session
-                current_messages.append({"role": "assistant", "content": response})
-            except Exception as e:
-                error_msg = f"⚠️ An error occurred: {str(e)}"
-                st.error(error_msg)
-                current_messages.append({"role": "assistant", "content": error_msg})
+    if current_session_id in pending_jobs:
+        st.warning("Still working on your previous message - please wait a moment.")
+    else:
+        # Add user message to current session
+        history_store.append_message(current_session_id, "user", prompt)
+
+        # Update session title if this is the first user message
+        update_session_title(current_session_id, prompt)
+
+        # Display user message
+        with st.chat_message("user"):
+            st.markdown(prompt)
+
+        # Run the pipeline on a worker thread; this script run only polls it
+        job = start_pipeline_job(get_pipeline_pool(), prompt, current_session_id, profile_store)
+        pending_jobs[current_session_id] = job
+        job.add_done_callback(store_job_result)
 
 # Footer
 st.markdown("---")
@@ -247,3 +285,25 @@ st.markdown(
     "<div style='text-align: center; color: gray;'>Powered by Google Gemini & Serper API | 💾 Chat history preserved across sessions</div>",
     unsafe_allow_html=True
 )
+
+# Stream progress for a response that is still being generated. Any widget
+# interaction interrupts this loop with a rerun, but the job keeps running on
+# its worker, stores its own result, and is picked up again here next run.
+job = pending_jobs.get(current_session_id)
+if job is not None:
+    with st.chat_message("assistant"):
+        with st.status("Searching for programs...", expanded=True) as status:
+            for stage, info in job.history:
+                status.write(f"✅ {describe_stage(stage, info)}")
+            while not job.done():
+                render_progress(status, job)
+                time.sleep(POLL_INTERVAL_SECONDS)
+            render_progress(status, job)
+            status.update(label="Done", state="complete", expanded=False)
+
+    # Give the done-callback a moment to persist the response
+    for _ in range(20):
+        if current_session_id not in pending_jobs:
+            break
+        time.sleep(0.05)
+    st.rerun()
@@ -0,0 +1,77 @@
+"""
+Shared fixtures: dummy API keys and a local Serper stub (src/tools/serper_stub.py).
+
+No test here talks to Gemini or the real Serper API.
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# src.config refuses to import without keys; the stub doesn't check them
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("SERPER_API_KEY", "test-key")
+os.environ.setdefault("PAGE_FETCH_ENABLED", "false")
+os.environ.setdefault("PREFETCH_ENABLED", "false")
+
+
+def _install_gemini_stand_in() -> None:
+    """
+    Let src.llm import without google-generativeai installed.
+
+    Tests never reach the model: any call through this stand-in fails, and
+    tests that need a model answer patch the generate_* function they use.
+    """
+    import types
+
+    class GenerativeModel:
+        def __init__(self, model_name: str) -> None:
+            self.model_name = model_name
+
+        def generate_content(self, *args, **kwargs):
+            raise RuntimeError("Gemini is not available in tests")
+
+    genai = types.ModuleType("google.generativeai")
+    genai.configure = lambda **kwargs: None
+    genai.GenerativeModel = GenerativeModel
+    google = sys.modules.get("google") or types.ModuleType("google")
+    google.__path__ = getattr(google, "__path__", [])
+    google.generativeai = genai
+    sys.modules["google"] = google
+    sys.modules["google.generativeai"] = genai
+
+
+try:
+    import google.generativeai  # noqa: F401
+except ImportError:
+    _install_gemini_stand_in()
+
+from src.tools import search  # noqa: E402
+from src.tools.serper_stub import SerperStubHandler, start_stub_server  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def stub_server():
+    """The Serper stub on a free port, with results linking to its fixture pages."""
+    server, url = start_stub_server(link_pages=True)
+    yield server, url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def serper_stub(stub_server, monkeypatch):
+    """Point the search layer at the stub, with empty caches and request log."""
+    server, url = stub_server
+    monkeypatch.setattr(search, "SERPER_SEARCH_URL", url)
+    search.search_cache.clear()
+    search.zero_result_cache.clear()
+    SerperStubHandler.request_log.clear()
+    yield SerperStubHandler.request_log
+    search.search_cache.clear()
+    search.zero_result_cache.clear()
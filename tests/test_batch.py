@@ -0,0 +1,90 @@
+"""
+Batch mode: sessions run their turns in order, and the output file is the
+checkpoint an interrupted run resumes from.
+"""
+
+import json
+
+import pytest
+
+from src import batch
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Replace the in-process turn runner; "boom" makes a session crash."""
+    calls = []
+
+    def run_turn(session_id, message, with_snapshot=False):
+        if message == "boom":
+            raise RuntimeError("worker crashed")
+        calls.append((session_id, message))
+        return {
+            "response": f"answer to {message}",
+            "error": None,
+            "elapsed_seconds": 0.0,
+            "usage": {"searches": 1, "total_tokens": 10},
+            "profile": {"field_of_study": session_id},
+        }
+
+    monkeypatch.setattr(batch, "run_turn", run_turn)
+    return calls
+
+
+def _write_input(path, sessions):
+    with open(path, "w", encoding="utf-8") as f:
+        for session_id, messages in sessions.items():
+            for message in messages:
+                f.write(json.dumps({"session_id": session_id, "message": message}) + "\n")
+
+
+def _read_output(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_turns_of_a_session_run_in_order(tmp_path, calls):
+    intake, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_input(intake, {"a": ["one", "two", "three"], "b": ["hello"]})
+
+    summary = batch.run_batch(str(intake), str(out), concurrency=2)
+
+    assert [m for sid, m in calls if sid == "a"] == ["one", "two", "three"]
+    records = _read_output(out)
+    assert [r["turn_index"] for r in records if r["session_id"] == "a"] == [0, 1, 2]
+    assert all(r["final_profile"] == {"field_of_study": r["session_id"]} for r in records)
+    assert summary["sessions"] == 2 and summary["turns"] == 4 and summary["searches"] == 4
+
+
+def test_interrupted_batch_resumes_without_rerunning_finished_sessions(tmp_path, calls):
+    intake, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_input(intake, {"a": ["a1", "a2"], "b": ["b1"], "c": ["c1", "c2"], "d": ["d1"]})
+
+    # First run stops after two sessions; the process then dies mid-write
+    batch.run_batch(str(intake), str(out), concurrency=1, limit=2)
+    with open(out, "a", encoding="utf-8") as f:
+        f.write('{"session_id": "c", "turn_ind')
+    assert batch.load_completed_sessions(str(out)) == {"a", "b"}
+    first_run = list(calls)
+    calls.clear()
+
+    summary = batch.run_batch(str(intake), str(out), concurrency=1)
+
+    assert {sid for sid, _ in first_run} == {"a", "b"}
+    assert calls == [("c", "c1"), ("c", "c2"), ("d", "d1")]
+    assert summary["sessions"] == 2
+    # The torn line is cut before appending, so every line parses
+    records = _read_output(out)
+    assert sorted({r["session_id"] for r in records}) == ["a", "b", "c", "d"]
+    assert len(records) == 6
+
+
+def test_crashed_session_is_not_checkpointed(tmp_path, calls):
+    intake, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_input(intake, {"a": ["a1"], "b": ["boom"]})
+
+    summary = batch.run_batch(str(intake), str(out), concurrency=1)
+
+    assert summary["errors"] == 1
+    assert batch.load_completed_sessions(str(out)) == {"a"}
+
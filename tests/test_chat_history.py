@@ -0,0 +1,70 @@
+"""
+ChatHistoryStore: each browser (owner) only sees and deletes its own chats.
+"""
+
+import sqlite3
+
+import pytest
+
+from src.chat_history import ChatHistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ChatHistoryStore(str(tmp_path / "history.db"))
+    yield store
+    store.close()
+
+
+def test_sessions_are_listed_per_owner(store):
+    store.create_session("a1", "Alice's first", owner="alice")
+    store.create_session("b1", "Bob's chat", owner="bob")
+    store.create_session("a2", "Alice's second", owner="alice")
+    store.append_message("a1", "user", "newest activity")
+
+    assert [s["id"] for s in store.list_sessions("alice", limit=10)] == ["a1", "a2"]
+    assert [s["id"] for s in store.list_sessions("bob", limit=10)] == ["b1"]
+    assert store.list_sessions("carol", limit=10) == []
+    assert store.count_sessions("alice") == 2
+    assert store.count_sessions("bob") == 1
+
+
+def test_a_new_browser_does_not_resume_someone_elses_chat(store):
+    store.create_session("a1", owner="alice")
+
+    assert store.most_recent_session_id("alice") == "a1"
+    assert store.most_recent_session_id("bob") is None
+
+
+def test_only_the_owner_can_delete_a_session(store):
+    store.create_session("a1", owner="alice")
+    store.append_message("a1", "user", "hello")
+
+    assert not store.delete_session("a1", "bob")
+    assert store.get_session("a1") is not None
+    assert store.count_messages("a1") == 1
+
+    assert store.delete_session("a1", "alice")
+    assert store.get_session("a1") is None
+    assert store.count_messages("a1") == 0
+
+
+def test_sessions_from_before_owners_belong_to_nobody(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE sessions (id TEXT PRIMARY KEY, title TEXT NOT NULL,
+                               created_at TEXT NOT NULL, updated_at TEXT NOT NULL);
+        INSERT INTO sessions VALUES ('old', 'Old chat', '2024-01-01', '2024-01-01');
+    """)
+    conn.commit()
+    conn.close()
+
+    store = ChatHistoryStore(path)
+    try:
+        assert store.get_session("old")["owner"] == ""
+        assert store.count_sessions("alice") == 0
+        store.create_session("a1", owner="alice")
+        assert store.most_recent_session_id("alice") == "a1"
+    finally:
+        store.close()
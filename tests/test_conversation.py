@@ -0,0 +1,124 @@
+"""
+ConversationContext: the token bound on render(), the rolling summary, and
+resolving "the second one" / "it" against earlier turns.
+"""
+
+import pytest
+
+from src import conversation
+from src.conversation import ConversationContext, estimate_tokens, listed_universities
+
+TABLE = """Here are some options:
+
+| # | Program | University | Deadline |
+|---|---------|------------|----------|
+| 1 | MSc Computer Science | University of Toronto | Jan 15 |
+| 2 | MSc Data Science | **McGill University** | Feb 1 |
+| 3 | MEng Software | [University of Waterloo](https://uwaterloo.ca) | Mar 1 |
+"""
+
+
+def _long_session(turns: int) -> ConversationContext:
+    context = ConversationContext()
+    for i in range(turns):
+        context.add_turn(
+            f"turn {i}: I want a funded masters in data science in Canada " * 3,
+            TABLE.replace("Toronto", f"Toronto {i}"),
+            "new_search",
+            [f"University {i}"],
+        )
+    return context
+
+
+def test_listed_universities_reads_the_table_column():
+    assert listed_universities(TABLE) == ["University of Toronto", "McGill University", "University of Waterloo"]
+    assert listed_universities("No table here.") == []
+
+
+def test_render_is_empty_before_the_first_turn():
+    assert ConversationContext().render() == ""
+
+
+@pytest.mark.parametrize("budget", [20, 40, 80, 150, 400])
+@pytest.mark.parametrize("turns", [1, 3, 12, 40])
+def test_render_stays_within_the_token_budget(turns, budget):
+    rendered = _long_session(turns).render(max_tokens=budget)
+    assert rendered
+    assert estimate_tokens(rendered) <= budget
+
+
+def test_render_gives_up_summary_before_recent_turns_and_entities():
+    context = _long_session(12)
+    full = context.render(max_tokens=2000)
+    tight = context.render(max_tokens=150)
+
+    assert "Turn 9 " in full and "Turn 12 " in full
+    assert "Turn 12 " in tight
+    assert "Turn 9 " not in tight
+    assert "(11 earlier turns not shown)" in tight
+    assert "Last list shown: 1. University of Toronto 11" in tight
+    assert "Universities mentioned (most recent last):" in tight
+
+
+def test_summary_drops_its_oldest_lines(monkeypatch):
+    monkeypatch.setattr(conversation, "CONVERSATION_RECENT_TURNS", 2)
+    monkeypatch.setattr(conversation, "CONVERSATION_SUMMARY_TOKENS", 60)
+    context = _long_session(10)
+
+    assert [t.number for t in context.recent] == [9, 10]
+    assert context.omitted > 0
+    assert len(context.summary) + context.omitted == 8
+    assert context.summary[-1].startswith("Turn 8 ")
+    assert not any(line.startswith("Turn 1 ") for line in context.summary)
+    assert estimate_tokens("\n".join(context.summary)) <= 60
+    assert f"({context.omitted} earlier turns not shown)" in context.render(max_tokens=2000)
+
+
+def test_round_trips_through_a_dict():
+    from dataclasses import asdict
+
+    context = _long_session(5)
+    assert ConversationContext.from_dict(asdict(context)) == context
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("tell me more about the second school", ["McGill University"]),
+    ("What about the 3rd one?", ["University of Waterloo"]),
+    ("compare #1 and number 3", ["University of Toronto", "University of Waterloo"]),
+    ("I like the last option", ["University of Waterloo"]),
+    ("deep dive into the first", ["University of Toronto"]),
+    ("the fifth program please", []),  # past the end of the list
+])
+def test_ordinals_resolve_against_the_last_list(message, expected):
+    context = ConversationContext()
+    context.add_turn("find programs", TABLE, "new_search")
+    assert context.resolve_references(message) == expected
+
+
+@pytest.mark.parametrize("message", [
+    "Can I start in the first intake of 2026?",
+    "what is the last deadline for fall",
+    "is funding guaranteed in the second year",
+    "I only care about the first semester courses",
+])
+def test_ordinals_in_ordinary_phrases_are_not_references(message):
+    context = ConversationContext()
+    context.add_turn("find programs", TABLE, "new_search")
+    assert context.resolve_references(message) == []
+
+
+def test_pronouns_resolve_to_the_most_recent_university():
+    context = ConversationContext()
+    context.add_turn("find programs", TABLE, "new_search")
+    context.add_turn("tell me about ETH", "ETH Zurich is ...", "deep_dive", ["ETH Zurich"])
+
+    assert context.resolve_references("how much does it cost?") == ["ETH Zurich"]
+    assert context.resolve_references("is that program taught in English") == ["ETH Zurich"]
+    # An explicit position wins over the pronoun
+    assert context.resolve_references("is it cheaper than the second one") == ["McGill University"]
+
+
+def test_nothing_resolves_without_earlier_turns():
+    context = ConversationContext()
+    assert context.resolve_references("tell me about the second school") == []
+    assert context.resolve_references("how much does it cost?") == []
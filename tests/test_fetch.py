@@ -0,0 +1,61 @@
+"""
+Page fetcher against the stub's fixture pages: text extraction, section
+targeting and robots.txt handling.
+"""
+
+import pytest
+
+from src.tools.fetch import PageCache, PageFetcher, html_to_text, target_sections
+
+
+@pytest.fixture
+def page_base(stub_server):
+    _, url = stub_server
+    return url.rsplit("/", 1)[0]
+
+
+def test_html_to_text_skips_scripts_and_chrome():
+    title, text = html_to_text(
+        "<html><head><title>T</title><script>var x = 1;</script></head>"
+        "<body><nav>Home</nav><h2>Funding</h2><p>Full stipend.</p></body></html>"
+    )
+    assert title == "T"
+    assert "Full stipend." in text
+    assert "var x" not in text and "Home" not in text
+
+
+def test_page_fetch_extracts_sections(page_base):
+    fetcher = PageFetcher(max_workers=2, domain_delay_seconds=0)
+
+    page = fetcher.fetch(f"{page_base}/pages/ms-computer-science/1")
+
+    assert page is not None
+    assert "should not appear" not in page.text
+    sections = target_sections(page.text)
+    assert "Minimum GPA of 3.0" in sections
+    assert "December 15" in sections
+    assert "Campus Life" not in sections
+
+
+def test_page_fetch_respects_robots(page_base, serper_stub):
+    fetcher = PageFetcher(max_workers=2, domain_delay_seconds=0)
+
+    pages = fetcher.fetch_many([f"{page_base}/private/report", f"{page_base}/pages/allowed"], timeout_seconds=10)
+
+    assert pages[0] is None and pages[1] is not None
+    fetched = [r["GET"] for r in serper_stub if "GET" in r]
+    assert fetched.count("/robots.txt") == 1
+    assert not any(path.startswith("/private/") for path in fetched)
+
+
+def test_cached_pages_are_not_fetched_again(page_base, serper_stub, tmp_path):
+    fetcher = PageFetcher(max_workers=2, domain_delay_seconds=0, cache=PageCache(str(tmp_path), ttl_seconds=60))
+    url = f"{page_base}/pages/cached"
+
+    first = fetcher.fetch(url)
+    requests_after_first = len(serper_stub)
+    second = fetcher.fetch(url)
+
+    assert first is not None and not first.from_cache
+    assert second is not None and second.from_cache and second.text == first.text
+    assert len(serper_stub) == requests_after_first
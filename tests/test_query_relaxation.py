@@ -0,0 +1,53 @@
+"""
+Zero-result handling: the local relaxation ladder, the terms it never
+drops, and the negative cache that remembers its outcome.
+"""
+
+from src.executor import search_many
+from src.tools.search import relax_query, zero_result_cache, zero_result_key
+from src.tools.serper_stub import EMPTY_MARKER
+
+KEEP = ["MS", "Computer Science", "Canada"]
+
+
+def _posts(request_log):
+    return [r for r in request_log if "GET" not in r]
+
+
+def test_ladder_strips_operators_then_quotes_then_filler():
+    ladder = relax_query('"MIT" Computer Science MS program overview site:mit.edu', ["MIT", "Computer Science", "MS"])
+
+    assert ladder == [
+        '"MIT" Computer Science MS program overview',
+        "MIT Computer Science MS program overview",
+        "MIT Computer Science MS overview",
+        "MIT Computer Science MS",
+    ]
+
+
+def test_relaxation_keeps_profile_terms():
+    ladder = relax_query("MS Computer Science fully funded Canada", KEEP)
+
+    assert ladder
+    for query in ladder:
+        assert all(word in query.split() for word in ("MS", "Computer", "Science", "Canada"))
+    assert relax_query("PhD Machine Learning Canada", ["PhD", "Machine Learning", "Canada"]) == []
+
+
+def test_degree_words_are_kept_without_a_profile():
+    assert all("PhD" in q.split() for q in relax_query("PhD Machine Learning funding Canada"))
+
+
+def test_zero_result_query_is_relaxed_and_remembered(serper_stub):
+    query = f'"MS Computer Science" {EMPTY_MARKER} site:example.edu funding'
+
+    results = search_many([query], num_results=3, keep_terms=KEEP)
+
+    assert len(results[0]) == 3
+    relaxed = zero_result_cache.get(zero_result_key(query))
+    assert relaxed and "site:" not in relaxed and '"' not in relaxed
+
+    sent = len(_posts(serper_stub))
+    assert len(search_many([query], num_results=3, keep_terms=KEEP)[0]) == 3
+    # Straight to the remembered relaxed form, whose results are cached too
+    assert len(_posts(serper_stub)) == sent
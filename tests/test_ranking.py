@@ -0,0 +1,49 @@
+"""
+Domain priors and profile ranking: university pages outrank aggregators and
+listicles, for .edu and non-.edu universities alike.
+"""
+
+from src.memory import StudentProfile
+from src.ranking import domain_prior, rank_candidates
+
+PROFILE = StudentProfile(
+    degree_level="MS",
+    field_of_study="Computer Science",
+    preferred_countries="Canada",
+)
+
+
+def _candidate(source, title="MS in Computer Science", snippet="Graduate program in computer science."):
+    return {"title": title, "snippet": snippet, "url": f"https://{source}/cs/ms", "source": source}
+
+
+def test_university_domains_get_the_prior():
+    for source in ("cs.example.edu", "www.ox.ac.uk", "unimelb.edu.au", "informatik.uni-hamburg.de",
+                   "www.tu-berlin.de", "utoronto.ca", "www.cs.ubc.ca", "tum.de", "tudelft.nl", "ethz.ch"):
+        assert domain_prior(_candidate(source)) > 0, source
+
+
+def test_lookalike_commercial_domains_get_no_prior():
+    for source in ("topuniversity-rankings.com", "universityguru.com", "myedu.com", "notutoronto.ca"):
+        assert domain_prior(_candidate(source)) == 0, source
+
+
+def test_aggregators_and_listicles_are_penalised():
+    assert domain_prior(_candidate("www.mastersportal.com")) < 0
+    assert domain_prior(_candidate("cs.example.edu", title="Top 10 MS programs in Canada")) < domain_prior(
+        _candidate("cs.example.edu")
+    )
+
+
+def test_non_edu_university_ranks_with_edu_pages():
+    candidates = [
+        _candidate("www.mastersportal.com", title="MS Computer Science programs in Canada"),
+        _candidate("www.utoronto.ca", title="MS Computer Science - Canada"),
+        _candidate("blog.example.com", title="MS Computer Science in Canada"),
+        _candidate("cs.example.edu", title="MS Computer Science - Canada"),
+    ]
+
+    ranked = [c["source"] for c in rank_candidates(candidates, PROFILE, top_k=4)]
+
+    assert set(ranked[:2]) == {"www.utoronto.ca", "cs.example.edu"}
+    assert ranked[-1] == "www.mastersportal.com"
@@ -0,0 +1,83 @@
+"""
+Structured program facts and the profile filter: what counts as a stated
+minimum, GRE policy, degree level, and which candidates a profile drops.
+"""
+
+import datetime as dt
+
+from src.executor import run_search_queries
+from src.memory import StudentProfile
+from src.records import ProgramBatch, ProgramFilter, constraints_from_profile, filter_candidates, parse_candidate
+
+PROFILE = StudentProfile(
+    gpa="3.4",
+    gre="no GRE",
+    degree_level="MS",
+    field_of_study="Computer Science",
+    preferred_countries="Canada",
+)
+
+
+def _candidate(snippet, title="Program", url="https://example.edu/p"):
+    return {"title": title, "snippet": snippet, "url": url, "source": "example.edu"}
+
+
+def test_gpa_is_a_minimum_only_with_cutoff_wording():
+    assert parse_candidate(_candidate("Average GPA 3.7 for admitted students")).min_gpa is None
+    assert parse_candidate(_candidate("Median GPA of 3.8")).min_gpa is None
+    assert parse_candidate(_candidate("Minimum GPA of 3.0 required")).min_gpa == 3.0
+    assert parse_candidate(_candidate("GPA of at least 3.2")).min_gpa == 3.2
+
+
+def test_gre_negation_is_not_required():
+    assert parse_candidate(_candidate("GRE is no longer required")).gre != "required"
+    assert parse_candidate(_candidate("The program does not require the GRE")).gre != "required"
+    assert parse_candidate(_candidate("GRE scores are required for all applicants")).gre == "required"
+
+
+def test_several_degrees_mean_unknown_degree():
+    assert parse_candidate(_candidate("Apply to our PhD and MS programs", title="Graduate CS")).degree is None
+    assert parse_candidate(_candidate("MS in Computer Science", title="MS CS")).degree == "masters"
+
+
+def test_profile_filter_keeps_realistic_candidates():
+    candidates = [
+        _candidate(
+            "Average GPA 3.7. GRE is no longer required. Application deadline December 15, 2024.",
+            title="MS and PhD in Computer Science", url="https://a.example.edu",
+        ),
+        _candidate("Deadline: Jan 10, 2023. Median GPA of admitted students 3.8", title="MSc CS", url="https://b.example.ca"),
+        _candidate("Minimum GPA of 3.7 required", title="MS CS", url="https://c.example.edu"),
+        _candidate("GRE required for all applicants", title="MS CS", url="https://d.example.edu"),
+        _candidate("Our PhD in Computer Science", title="PhD CS", url="https://e.example.edu"),
+    ]
+
+    kept = [c["url"] for c in filter_candidates(candidates, PROFILE)]
+
+    assert kept == ["https://a.example.edu", "https://b.example.ca"]
+
+
+def test_filter_keeps_everything_below_min_keep():
+    candidates = [_candidate("Minimum GPA of 3.9 required", url=f"https://{i}.example.edu") for i in range(3)]
+
+    assert filter_candidates(candidates, PROFILE) == []
+    assert len(filter_candidates(candidates, PROFILE, min_keep=1)) == 3
+
+
+def test_profile_constraints_do_not_filter_on_deadlines():
+    constraints = constraints_from_profile(PROFILE)
+    assert constraints.deadline_after is None
+
+    batch = ProgramBatch([parse_candidate(_candidate("Deadline: January 10, 2020"), today=dt.date(2026, 1, 1))])
+    assert batch.mask(constraints).all()
+    assert not batch.mask(ProgramFilter(deadline_after=dt.date(2026, 1, 1))).any()
+
+
+def test_new_search_retrieval_and_filter(serper_stub):
+    plan = {"search_queries": ["MS Computer Science Canada", "MS Computer Science funding Canada"]}
+
+    candidates = run_search_queries(plan, PROFILE)
+    kept = filter_candidates(candidates, PROFILE, min_keep=1)
+
+    assert len(candidates) >= 2
+    assert kept
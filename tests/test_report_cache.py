@@ -0,0 +1,121 @@
+"""
+Shared report cache: key normalization, TTL and LRU eviction, targeted
+invalidation, and reuse of base reports across profiles.
+"""
+
+import time
+
+import pytest
+
+from src import executor
+from src.memory import InMemoryProfileStore
+from src.report_cache import ReportCache, make_report_key, report_cache
+
+
+def test_key_is_stable_across_spelling_and_order():
+    a = make_report_key("compare", ["MIT", "Stanford University"], "Computer Science", "MS", ["Funding", "cost"])
+    b = make_report_key("compare", ["stanford", "Massachusetts Institute of Technology"], "computer  science!", "M.S.",
+                        ["cost", "funding"])
+
+    assert a == b
+    assert hash(a) == hash(b)
+
+
+def test_key_separates_kind_field_and_degree():
+    base = make_report_key("deep_dive", ["MIT"], "Computer Science", "MS")
+
+    assert make_report_key("compare", ["MIT"], "Computer Science", "MS") != base
+    assert make_report_key("deep_dive", ["MIT"], "Data Science", "MS") != base
+    assert make_report_key("deep_dive", ["MIT"], "Computer Science", "PhD") != base
+    assert make_report_key("deep_dive", ["MIT"], "Computer Science", "MSc") == base
+
+
+def test_reports_expire_after_ttl():
+    cache = ReportCache(maxsize=4, ttl_seconds=0.05)
+    key = make_report_key("deep_dive", ["MIT"], "CS", "MS")
+    cache.put(key, "report")
+
+    assert cache.get(key) == "report"
+    time.sleep(0.1)
+    assert cache.get(key) is None
+
+
+def test_least_recently_used_report_is_evicted():
+    cache = ReportCache(maxsize=2, ttl_seconds=60)
+    keys = [make_report_key("deep_dive", [uni], "CS", "MS") for uni in ("MIT", "CMU", "Stanford")]
+    cache.put(keys[0], "a")
+    cache.put(keys[1], "b")
+    cache.get(keys[0])
+    cache.put(keys[2], "c")
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == "a" and cache.get(keys[2]) == "c"
+
+
+def test_empty_reports_are_not_cached():
+    cache = ReportCache(maxsize=2, ttl_seconds=60)
+    key = make_report_key("deep_dive", ["MIT"], "CS", "MS")
+    cache.put(key, "")
+
+    assert cache.get(key) is None
+
+
+def test_invalidation_by_university_and_field():
+    cache = ReportCache(maxsize=8, ttl_seconds=60)
+    mit_cs = make_report_key("deep_dive", ["MIT"], "CS", "MS")
+    pair = make_report_key("compare", ["MIT", "CMU"], "CS", "MS")
+    cmu_ds = make_report_key("deep_dive", ["CMU"], "Data Science", "MS")
+    for key in (mit_cs, pair, cmu_ds):
+        cache.put(key, "report")
+
+    assert cache.invalidate_university("Massachusetts Institute of Technology") == 2
+    assert cache.keys() == [cmu_ds]
+    assert cache.invalidate_field("data science") == 1
+    assert cache.keys() == []
+
+
+@pytest.fixture
+def deep_dive_calls(monkeypatch):
+    """Count base report generations; personalization echoes the profile's GPA."""
+    calls = []
+
+    def generate_deep_dive_report(universities, field, degree):
+        calls.append((tuple(universities), field, degree))
+        return f"Base report on {field}"
+
+    def generate_text(prompt, stage, **kwargs):
+        return "For you: " + ("GPA 3.9" if "3.9" in prompt else "GPA 3.2")
+
+    monkeypatch.setattr(executor, "generate_deep_dive_report", generate_deep_dive_report)
+    monkeypatch.setattr(executor, "generate_text", generate_text)
+    report_cache.clear()
+    yield calls
+    report_cache.clear()
+
+
+def test_base_report_is_shared_and_personalized_per_profile(deep_dive_calls):
+    store = InMemoryProfileStore()
+    store.update_profile("a", field_of_study="Computer Science", degree_level="MS", gpa="3.2")
+    store.update_profile("b", field_of_study="computer science", degree_level="M.S.", gpa="3.9")
+
+    first = executor.handle_deep_dive("Tell me about MIT", ["MIT"], store, "a")
+    second = executor.handle_deep_dive("What about MIT funding?", ["MIT"], store, "b")
+
+    assert len(deep_dive_calls) == 1
+    assert first.startswith("Base report on Computer Science") and first.endswith("GPA 3.2")
+    assert second.startswith("Base report on Computer Science") and second.endswith("GPA 3.9")
+
+
+def test_profile_change_that_alters_the_key_regenerates(deep_dive_calls):
+    store = InMemoryProfileStore()
+    store.update_profile("a", field_of_study="Computer Science", degree_level="MS", gpa="3.2")
+    executor.handle_deep_dive("Tell me about MIT", ["MIT"], store, "a")
+
+    store.update_profile("a", gpa="3.9")
+    executor.handle_deep_dive("Tell me about MIT", ["MIT"], store, "a")
+    assert len(deep_dive_calls) == 1  # GPA only changes the personalization
+
+    store.update_profile("a", field_of_study="Data Science")
+    answer = executor.handle_deep_dive("Tell me about MIT", ["MIT"], store, "a")
+    assert len(deep_dive_calls) == 2
+    assert answer.startswith("Base report on Data Science")
@@ -0,0 +1,61 @@
+"""
+Deep dives and comparisons still answer, from the search results already
+gathered, when the report call fails or runs out of turn deadline.
+"""
+
+import pytest
+
+from src import executor
+from src.memory import InMemoryProfileStore
+from src.report_cache import report_cache
+from src.turn_context import TurnDeadlineExceeded
+
+
+@pytest.fixture
+def failing_writer(serper_stub, monkeypatch):
+    """Every model call fails; the classifier answers from the test's choice."""
+    classification = {}
+
+    def generate_text(prompt, stage, **kwargs):
+        raise TurnDeadlineExceeded(f"no time left for {stage}")
+
+    monkeypatch.setattr(executor, "generate_text", generate_text)
+    monkeypatch.setattr(executor, "classify_query", lambda user_input, context="": dict(classification))
+    report_cache.clear()
+    yield classification
+    report_cache.clear()
+
+
+def _store() -> InMemoryProfileStore:
+    store = InMemoryProfileStore()
+    store.update_profile("s", field_of_study="Computer Science", degree_level="MS")
+    return store
+
+
+def test_deep_dive_answers_from_search_results_when_the_report_fails(failing_writer):
+    failing_writer.update(query_type="deep_dive", universities=["University of Toronto"])
+    store = _store()
+
+    response = executor.execute_agentic_pipeline("Tell me about Toronto", "s", store, deadline_seconds=0)
+
+    assert "Here is what I found on University of Toronto" in response
+    assert "](http" in response
+    assert "report writer unavailable" in response
+    assert report_cache.keys() == []  # a degraded answer is not shared
+
+
+def test_comparison_answers_from_search_results_when_the_report_fails(failing_writer):
+    failing_writer.update(query_type="compare", universities=["MIT", "Stanford"], comparison_aspects=["funding"])
+    store = _store()
+
+    response = executor.execute_agentic_pipeline("Compare MIT and Stanford", "s", store, deadline_seconds=0)
+
+    assert "Here is what I found on MIT and Stanford" in response
+    assert "1. MIT: **[" in response
+    assert "report writer unavailable" in response
+    assert report_cache.keys() == []
+
+
+def test_fallback_without_results_says_so():
+    answer = executor.fallback_source_list(["MIT"], [])
+    assert answer.startswith("I couldn't finish the report on MIT")
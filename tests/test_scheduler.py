@@ -0,0 +1,169 @@
+"""
+FairScheduler: priority classes, round-robin between sessions, aging,
+deadline timeouts in the queue, and the must_run bypass for reports.
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.scheduler import INTERACTIVE, PREFETCH, REPORT, STANDARD, FairScheduler, background_scope
+from src.turn_context import TurnContext, TurnDeadlineExceeded, turn_scope
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for the scheduler"
+        time.sleep(0.005)
+
+
+def _queued(scheduler):
+    return sum(c["queued"] for c in scheduler.stats()["classes"].values())
+
+
+class _Queue:
+    """Waiters that record the order they are granted in, then release at once."""
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.order = []
+        self.threads = []
+
+    def add(self, label, priority, session_id):
+        queued = _queued(self.scheduler)
+
+        def run():
+            self.scheduler.acquire(priority, session_id)
+            self.order.append(label)
+            self.scheduler.release()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+        _wait_for(lambda: _queued(self.scheduler) == queued + 1)
+
+    def drain(self):
+        self.scheduler.release()
+        for thread in self.threads:
+            thread.join(2.0)
+        return self.order
+
+
+def _held(scheduler):
+    """Take the only slot so every later call queues."""
+    scheduler.acquire(STANDARD, "holder")
+    return _Queue(scheduler)
+
+
+def test_higher_priority_classes_go_first():
+    queue = _held(FairScheduler("test", max_concurrency=1, aging_seconds=0))
+    queue.add("prefetch", PREFETCH, "s1")
+    queue.add("report", REPORT, "s2")
+    queue.add("standard", STANDARD, "s3")
+    queue.add("interactive", INTERACTIVE, "s4")
+
+    assert queue.drain() == ["interactive", "standard", "report", "prefetch"]
+
+
+def test_sessions_take_turns_within_a_class():
+    queue = _held(FairScheduler("test", max_concurrency=1, aging_seconds=0))
+    for i in range(3):
+        queue.add(f"a{i}", STANDARD, "a")
+    queue.add("b0", STANDARD, "b")
+    queue.add("c0", STANDARD, "c")
+
+    assert queue.drain() == ["a0", "b0", "c0", "a1", "a2"]
+
+
+def test_waiting_calls_age_into_higher_classes_but_prefetch_does_not():
+    queue = _held(FairScheduler("test", max_concurrency=1, aging_seconds=0.05))
+    queue.add("prefetch", PREFETCH, "s1")
+    queue.add("report", REPORT, "s2")
+    time.sleep(0.15)
+    queue.add("standard", STANDARD, "s3")
+
+    assert queue.drain() == ["report", "standard", "prefetch"]
+
+
+def test_concurrency_limit_is_respected():
+    scheduler = FairScheduler("test", max_concurrency=2, aging_seconds=0)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def call(i):
+        with scheduler.slot("search"):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(2.0)
+
+    assert peak[0] == 2
+    assert scheduler.stats()["active"] == 0
+
+
+def test_waiter_gives_up_at_its_timeout():
+    scheduler = FairScheduler("test", max_concurrency=1, aging_seconds=0)
+    scheduler.acquire(STANDARD, "holder")
+
+    with pytest.raises(TurnDeadlineExceeded):
+        scheduler.acquire(STANDARD, "late", timeout=0.05)
+
+    stats = scheduler.stats()
+    assert stats["timeouts"] == 1
+    assert _queued(scheduler) == 0
+    scheduler.release()
+    scheduler.acquire(STANDARD, "next", timeout=0.05)  # the slot was not leaked
+
+
+def test_deadline_applies_in_the_queue_except_for_must_run():
+    scheduler = FairScheduler("test", max_concurrency=1, aging_seconds=0)
+    scheduler.acquire(STANDARD, "holder")
+    ctx = TurnContext(session_id="s1", deadline=time.monotonic() + 0.05)
+
+    with turn_scope(ctx):
+        with pytest.raises(TurnDeadlineExceeded):
+            with scheduler.slot("planner"):
+                pass
+
+        threading.Timer(0.15, scheduler.release).start()
+        started = time.monotonic()
+        with scheduler.slot("writer", must_run=True):
+            waited = time.monotonic() - started
+
+    assert waited >= 0.1
+    assert scheduler.stats()["active"] == 0
+
+
+def test_background_work_runs_in_the_prefetch_class():
+    queue = _held(FairScheduler("test", max_concurrency=1, aging_seconds=0))
+
+    def prefetch():
+        with background_scope("s1"):
+            with queue.scheduler.slot("search"):
+                queue.order.append("prefetch")
+
+    thread = threading.Thread(target=prefetch, daemon=True)
+    thread.start()
+    queue.threads.append(thread)
+    _wait_for(lambda: queue.scheduler.stats()["classes"]["prefetch"]["queued"] == 1)
+    queue.add("report", REPORT, "s2")
+
+    assert queue.drain() == ["report", "prefetch"]
+
+
+def test_disabled_scheduler_never_queues():
+    scheduler = FairScheduler("test", max_concurrency=0)
+    with scheduler.slot("writer"):
+        with scheduler.slot("writer"):
+            pass
+    assert scheduler.stats()["active"] == 0
@@ -0,0 +1,53 @@
+"""
+Serper batch mode against the local stub: multi-query turns go out as one
+request, failed batch items fall back to single requests, and cached
+queries are answered locally.
+"""
+
+from src.config import SERPER_BATCH_MIN_QUERIES
+from src.executor import search_many
+from src.tools.serper_stub import FAIL_MARKER
+
+
+def _posts(request_log):
+    return [r for r in request_log if "GET" not in r]
+
+
+def test_queries_go_out_as_one_batch(serper_stub):
+    queries = [f"MS Computer Science Canada {i}" for i in range(max(3, SERPER_BATCH_MIN_QUERIES))]
+
+    results = search_many(queries, num_results=4)
+
+    assert [len(r) for r in results] == [4] * len(queries)
+    posts = _posts(serper_stub)
+    assert len(posts) == 1
+    assert [item["q"] for item in posts[0]] == queries
+
+
+def test_single_query_is_not_batched(serper_stub):
+    results = search_many(["PhD Machine Learning Canada"], num_results=3)
+
+    assert len(results[0]) == 3
+    assert [type(p) for p in _posts(serper_stub)] == [dict]
+
+
+def test_failed_batch_item_is_retried_alone(serper_stub):
+    queries = ["MS Data Science Canada", f"MS Statistics Canada {FAIL_MARKER}", "MS Physics Canada"]
+
+    results = search_many(queries, num_results=2)
+
+    assert [len(r) for r in results] == [2, 0, 2]
+    posts = _posts(serper_stub)
+    assert isinstance(posts[0], list)
+    # The stub fails the single retry too, so only the batch and one retry go out
+    assert [p["q"] for p in posts[1:]] == [queries[1]]
+
+
+def test_cached_queries_are_not_sent_again(serper_stub):
+    queries = ["MS Computer Science Canada", "MS Computer Science Germany"]
+    search_many(queries, num_results=3)
+    sent = len(_posts(serper_stub))
+
+    search_many(queries, num_results=3)
+
+    assert len(_posts(serper_stub)) == sent
@@ -0,0 +1,158 @@
+"""
+Session snapshots: round trips, rejection of corrupt, truncated and newer
+snapshots, and how restored search results keep their remaining TTL.
+"""
+
+import struct
+import time
+import zlib
+
+import pytest
+
+from src import snapshot as snapshot_module
+from src.config import SEARCH_CACHE_TTL_SECONDS
+from src.conversation import ConversationContext
+from src.memory import InMemoryProfileStore
+from src.snapshot import (
+    SNAPSHOT_VERSION,
+    SessionSnapshot,
+    SnapshotError,
+    capture_session,
+    decode_snapshot,
+    encode_snapshot,
+    restore_session,
+)
+from src.tools.search import search_cache, search_cache_key
+
+QUERY = "MS Computer Science Canada"
+RESULT = {"organic": [{"title": "MS CS", "link": "https://cs.example.edu"}]}
+
+
+@pytest.fixture
+def store():
+    store = InMemoryProfileStore()
+    store.update_profile("s1", field_of_study="Computer Science", degree_level="MS")
+    store.set_last_results("s1", {"search_queries": [QUERY]}, [{"title": "MS CS", "url": "https://cs.example.edu"}])
+    conversation = ConversationContext()
+    conversation.add_turn("Find MS CS programs", "Here are some programs.", query_type="new_search")
+    store.set_conversation("s1", conversation)
+    search_cache.clear()
+    search_cache.set(search_cache_key(QUERY, 5), RESULT, ttl_seconds=600)
+    yield store
+    search_cache.clear()
+
+
+def _with_version(data, version):
+    return data[:4] + bytes([version]) + data[5:]
+
+
+def _ttls():
+    return {key[0]: search_cache.ttl_left(key) for key in search_cache.keys()}
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_round_trip_restores_the_session(store, compress):
+    data = encode_snapshot(capture_session("s1", store=store), compress=compress)
+    search_cache.clear()
+    target = InMemoryProfileStore()
+
+    session_id = restore_session(decode_snapshot(data), store=target, session_id="s2")
+
+    assert session_id == "s2"
+    assert target.get_profile("s2").field_of_study == "Computer Science"
+    assert target.last_results("s2")["candidates"] == store.last_results("s1")["candidates"]
+    assert target.conversation("s2").turns == 1
+    assert search_cache.get(search_cache_key(QUERY, 5)) == RESULT
+
+
+def test_compressed_snapshot_is_smaller(store):
+    snapshot = capture_session("s1", store=store)
+    snapshot.candidates *= 50
+    assert len(encode_snapshot(snapshot)) < len(encode_snapshot(snapshot, compress=False))
+
+
+def test_rejects_bad_magic_and_truncation(store):
+    data = encode_snapshot(capture_session("s1", store=store))
+
+    with pytest.raises(SnapshotError):
+        decode_snapshot(b"XXXX" + data[4:])
+    with pytest.raises(SnapshotError):
+        decode_snapshot(data[:10])
+    with pytest.raises(SnapshotError):
+        decode_snapshot(data[:-1])
+
+
+def test_rejects_checksum_mismatches(store):
+    data = bytearray(encode_snapshot(capture_session("s1", store=store), compress=False))
+    header_size = snapshot_module._HEADER.size
+
+    corrupt_body = bytes(data[:-2]) + bytes([data[-2] ^ 0xFF]) + bytes(data[-1:])
+    with pytest.raises(SnapshotError, match="body checksum"):
+        decode_snapshot(corrupt_body)
+
+    # A body whose own checksum was updated still fails the content check
+    body = bytearray(data[header_size:])
+    body[-2] ^= 0x01
+    struct.pack_into(">I", data, 12, zlib.crc32(bytes(body)))
+    with pytest.raises(SnapshotError, match="content checksum"):
+        decode_snapshot(bytes(data[:header_size]) + bytes(body))
+
+
+def test_rejects_newer_versions_and_reads_older_ones(store):
+    data = encode_snapshot(capture_session("s1", store=store))
+
+    with pytest.raises(SnapshotError, match="newer"):
+        decode_snapshot(_with_version(data, SNAPSHOT_VERSION + 1))
+    assert decode_snapshot(_with_version(data, SNAPSHOT_VERSION - 1)).session_id == "s1"
+
+
+def test_version_1_snapshot_restores_without_conversation():
+    target = InMemoryProfileStore()
+    snapshot = SessionSnapshot(session_id="old", profile={"field_of_study": "Physics"})
+
+    restore_session(snapshot, store=target)
+
+    assert target.get_profile("old").field_of_study == "Physics"
+    assert target.conversation("old").turns == 0
+
+
+def test_version_3_restores_each_result_with_its_own_ttl():
+    snapshot = SessionSnapshot(
+        session_id="s1",
+        created_at=time.time() - 20,
+        search_results=[
+            [["fresh", 5, None, "en"], RESULT, 600.0],
+            [["stale", 5, None, "en"], RESULT, 10.0],
+        ],
+    )
+    search_cache.clear()
+
+    restore_session(snapshot, store=InMemoryProfileStore())
+
+    ttls = _ttls()
+    assert "stale" not in ttls
+    assert 570 < ttls["fresh"] <= 580
+    search_cache.clear()
+
+
+def test_version_2_entries_fall_back_to_the_snapshot_age():
+    snapshot = SessionSnapshot(
+        session_id="s1",
+        created_at=time.time() - 100,
+        search_results=[[["old", 5, None, "en"], RESULT]],
+    )
+    search_cache.clear()
+
+    restore_session(snapshot, store=InMemoryProfileStore())
+
+    expected = SEARCH_CACHE_TTL_SECONDS - 100
+    assert expected - 10 < _ttls()["old"] <= expected
+    search_cache.clear()
+
+
+def test_capture_records_remaining_ttl(store):
+    snapshot = capture_session("s1", store=store)
+
+    [(key, raw, ttl_left)] = snapshot.search_results
+    assert key[0] == QUERY.lower() and raw == RESULT
+    assert 590 < ttl_left <= 600
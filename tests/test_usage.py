@@ -0,0 +1,63 @@
+"""
+Search accounting and budgets: only searches actually sent count against
+the turn and session, and prefetch searches have their own counter.
+"""
+
+import pytest
+
+from src import usage as usage_module
+from src.executor import search_many
+from src.scheduler import background_scope
+from src.turn_context import TurnContext, turn_scope
+from src.usage import remaining_searches, usage_ledger
+
+SESSION = "test-usage"
+
+
+@pytest.fixture(autouse=True)
+def fresh_session():
+    usage_ledger.forget(SESSION)
+    yield
+    usage_ledger.forget(SESSION)
+
+
+def test_only_sent_searches_are_counted(serper_stub):
+    usage = usage_ledger.begin_turn(SESSION)
+    with turn_scope(TurnContext(session_id=SESSION, usage=usage)):
+        search_many(["MS Computer Science Canada", "MS Computer Science Canada"], num_results=3)
+        search_many(["MS Computer Science Canada"], num_results=3)
+    assert usage.searches == 2  # one batch of two; the repeat came from the cache
+
+
+def test_searches_skipped_at_the_deadline_are_not_counted(serper_stub):
+    usage = usage_ledger.begin_turn(SESSION)
+    ctx = TurnContext(session_id=SESSION, usage=usage, deadline=0.0)
+    with turn_scope(ctx):
+        results = search_many(["MS Physics Germany", "MS Physics France"], num_results=3)
+
+    assert results == [[], []]
+    assert usage.searches == 0
+    assert ctx.degraded
+    assert not [r for r in serper_stub if "GET" not in r]
+
+
+def test_prefetch_searches_have_their_own_counter(serper_stub):
+    with background_scope(SESSION):
+        search_many(["MS Chemistry Canada", "MS Biology Canada"], num_results=3)
+
+    totals = usage_ledger.session_totals(SESSION)
+    assert totals["prefetch_searches"] == 2
+    assert totals["searches"] == 0
+
+
+def test_search_budget_trims_uncached_queries(serper_stub, monkeypatch):
+    monkeypatch.setattr(usage_module, "TURN_SEARCH_BUDGET", 1)
+    usage = usage_ledger.begin_turn(SESSION)
+    ctx = TurnContext(session_id=SESSION, usage=usage)
+    with turn_scope(ctx):
+        results = search_many(["MS Math Canada", "MS Math Germany"], num_results=3)
+        assert remaining_searches() == 0
+
+    assert [len(r) for r in results] == [3, 0]
+    assert usage.searches == 1
+    assert ctx.degraded
@@ -0,0 +1,137 @@
+"""
+Worker pool with a stub turn runner: consistent-hash placement, replacing a
+dead worker under the same ring id, and session snapshots following a
+session to its new worker.
+
+Workers are spawned processes, so the stub runner lives at module level and
+this module imports nothing that needs the model.
+"""
+
+import os
+import signal
+import time
+
+import pytest
+
+from src.memory import profile_store
+from src.snapshot import capture_session, encode_snapshot
+from src.worker_pool import HashRing, WorkerCrashedError, WorkerPool
+
+SESSIONS = [f"session-{i}" for i in range(500)]
+
+
+def counting_turn(session_id, message, with_snapshot=False):
+    """Count the session's turns in its profile; "crash" kills the worker."""
+    if message == "crash":
+        os._exit(3)
+    turns = int(profile_store.get_profile(session_id).extra_notes or 0) + 1
+    profile_store.update_profile(session_id, extra_notes=str(turns))
+    result = {"response": f"{os.getpid()}:{turns}", "error": None, "elapsed_seconds": 0.0}
+    if with_snapshot:
+        result["snapshot"] = encode_snapshot(capture_session(session_id))
+    return result
+
+
+def _turn(pool, session_id, message="hi"):
+    pid, turns = pool.submit(session_id, message).result(timeout=60)["response"].split(":")
+    return int(pid), int(turns)
+
+
+def _kill_owner(pool, session_id):
+    pid = next(w["pid"] for w in pool.stats()["workers"] if w["worker_id"] == pool.worker_for(session_id))
+    os.kill(pid, signal.SIGKILL)
+    return pid
+
+
+def _wait_for(condition, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for the pool"
+        time.sleep(0.05)
+
+
+# ---------------------------------------------------------------------------
+# Hash ring
+# ---------------------------------------------------------------------------
+
+def test_ring_placement_is_deterministic_and_spread():
+    ring, again = HashRing(), HashRing()
+    for node in range(4):
+        ring.add(node)
+        again.add(node)
+
+    owners = [ring.node_for(s) for s in SESSIONS]
+    assert owners == [again.node_for(s) for s in SESSIONS]
+    counts = [owners.count(node) for node in range(4)]
+    assert min(counts) > len(SESSIONS) / 4 * 0.5
+
+
+def test_removing_a_node_only_moves_its_keys():
+    ring = HashRing()
+    for node in range(4):
+        ring.add(node)
+    before = {s: ring.node_for(s) for s in SESSIONS}
+
+    ring.remove(2)
+    after = {s: ring.node_for(s) for s in SESSIONS}
+    assert all(after[s] == before[s] for s in SESSIONS if before[s] != 2)
+    assert 2 not in after.values()
+
+    ring.add(2)
+    assert {s: ring.node_for(s) for s in SESSIONS} == before
+
+
+def test_empty_ring_has_no_owner():
+    assert HashRing().node_for("anything") is None
+
+
+# ---------------------------------------------------------------------------
+# Pool
+# ---------------------------------------------------------------------------
+
+def test_turns_of_a_session_stay_on_one_worker():
+    with WorkerPool(num_workers=2, runner=counting_turn) as pool:
+        results = [_turn(pool, "s1") for _ in range(3)]
+
+    assert [turns for _, turns in results] == [1, 2, 3]
+    assert len({pid for pid, _ in results}) == 1
+
+
+def test_dead_worker_is_replaced_under_its_ring_id_with_session_state():
+    with WorkerPool(num_workers=2, restart_dead=True, runner=counting_turn) as pool:
+        placement = {s: pool.worker_for(s) for s in SESSIONS}
+        first_pid, _ = _turn(pool, "s1")
+        _turn(pool, "s1")
+
+        assert _kill_owner(pool, "s1") == first_pid
+        _wait_for(lambda: pool.stats()["restarts"] == 1)
+
+        assert {s: pool.worker_for(s) for s in SESSIONS} == placement
+        pid, turns = _turn(pool, "s1")
+        assert pid != first_pid
+        assert turns == 3  # restored from the snapshot of turn 2
+        assert pool.stats()["rebalanced_sessions"] == 1
+
+
+def test_without_restart_sessions_move_to_live_workers_with_their_state():
+    with WorkerPool(num_workers=2, restart_dead=False, runner=counting_turn) as pool:
+        placement = {s: pool.worker_for(s) for s in SESSIONS}
+        dead = pool.worker_for("s1")
+        first_pid, _ = _turn(pool, "s1")
+
+        _kill_owner(pool, "s1")
+        _wait_for(lambda: len(pool.stats()["workers"]) == 1)
+
+        assert all(pool.worker_for(s) == placement[s] for s in SESSIONS if placement[s] != dead)
+        pid, turns = _turn(pool, "s1")
+        assert pid != first_pid
+        assert turns == 2
+
+
+def test_turn_that_keeps_killing_workers_fails():
+    with WorkerPool(num_workers=2, restart_dead=True, runner=counting_turn) as pool:
+        future = pool.submit("s1", "crash")
+        with pytest.raises(WorkerCrashedError):
+            future.result(timeout=60)
+        _wait_for(lambda: pool.stats()["restarts"] == 2)
+        assert _turn(pool, "s1")[1] == 1